@@ -0,0 +1,123 @@
+import jwt
+import os
+import sys
+import json
+import time
+import secrets
+import argparse
+import urllib.request
+from generate_jwk import KeyPool
+from generate_signed_jwt import load_signing_key
+
+# Variants benchmarked by default: (name, algorithm, RSA key size)
+VARIANTS = [("RS256-2048", "RS256", 2048), ("RS256-3072", "RS256", 3072), ("RS256-4096", "RS256", 4096),
+            ("ES256", "ES256", None), ("HS256", "HS256", None)]
+
+HS256_KID = "hs256-benchmark"
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))] if samples else 0.0
+
+
+def measure(operation, iterations):
+    """
+    Runs operation(i) iterations times. Returns ops/s, p50/p99 latency in microseconds and the
+    CPU time per operation (process time, so it is the cost a gateway core pays, not wall time).
+    """
+    latencies = []
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    for i in range(iterations):
+        start = time.perf_counter()
+        operation(i)
+        latencies.append(time.perf_counter() - start)
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+    return {"ops_per_second": round(iterations / wall), "p50_us": round(percentile(latencies, 0.5) * 1e6, 1),
+            "p99_us": round(percentile(latencies, 0.99) * 1e6, 1), "cpu_us_per_op": round(cpu / iterations * 1e6, 1)}
+
+
+def prepare_variant(pool, algorithm, key_size, jwks_keys):
+    """
+    Returns (signing key, kid, JWKS bytes, warm verification key) for a variant. The JWKS holds
+    jwks_keys keys of the algorithm, like a real endpoint in mid-rotation; tokens use the last one.
+    """
+    if algorithm == "HS256":
+        secret = secrets.token_bytes(32)
+        jwk = {"kty": "oct", "kid": HS256_KID, "k": jwt.utils.base64url_encode(secret).decode("utf-8"), "alg": "HS256"}
+        return secret, HS256_KID, json.dumps({"keys": [jwk]}).encode("utf-8"), secret
+    kids = pool.ensure(jwks_keys, algorithm, key_size or 2048)
+    private_key, kid, _ = load_signing_key(os.path.join(pool.directory, pool.index[kids[-1]]["file"]))
+    return private_key, kid, json.dumps(pool.jwks(kids)).encode("utf-8"), private_key.public_key()
+
+
+def cold_verify(token, algorithm, jwks_bytes=None, jwks_url=None):
+    """Verifies a token with nothing cached: fetch (optional), parse the JWKS, find the kid, build the key."""
+    if jwks_url:
+        with urllib.request.urlopen(jwks_url) as response:
+            jwks_bytes = response.read()
+    kid = jwt.get_unverified_header(token)["kid"]
+    key = jwt.PyJWKSet.from_json(jwks_bytes.decode("utf-8"))[kid].key
+    return jwt.decode(token, key, algorithms=[algorithm], audience="benchmark")
+
+
+def run_variant(pool, name, algorithm, key_size, args):
+    signing_key, kid, jwks_bytes, verify_key = prepare_variant(pool, algorithm, key_size, args.jwks_keys)
+    now = int(time.time())
+    payload = lambda i: {"iss": "ExchangeTokens", "sub": f"user{i}", "aud": "benchmark", "iat": now, "exp": now + 3600,
+                         "email": f"user{i}@example.com", "orgId": f"org-{i % 100}"}
+    tokens = [jwt.encode(payload(i), signing_key, algorithm=algorithm, headers={"kid": kid})
+              for i in range(min(args.iterations, 1000))]
+    result = {"variant": name, "token_bytes": len(tokens[0]), "jwks_bytes": len(jwks_bytes)}
+    result["sign"] = measure(lambda i: jwt.encode(payload(i), signing_key, algorithm=algorithm, headers={"kid": kid}),
+                             args.iterations)
+    result["verify_warm"] = measure(lambda i: jwt.decode(tokens[i % len(tokens)], verify_key, algorithms=[algorithm],
+                                                         audience="benchmark"), args.iterations)
+    result["verify_cold"] = measure(lambda i: cold_verify(tokens[i % len(tokens)], algorithm, jwks_bytes),
+                                    args.cold_iterations)
+    if args.jwks_url:
+        # The stub server serves one JWKS file, so only the variant whose keys it holds can verify over HTTP
+        try:
+            cold_verify(tokens[0], algorithm, jwks_url=args.jwks_url)
+            result["verify_cold_http"] = measure(lambda i: cold_verify(tokens[i % len(tokens)], algorithm,
+                                                                       jwks_url=args.jwks_url), args.cold_iterations)
+        except (KeyError, jwt.PyJWKSetError, jwt.InvalidTokenError):
+            pass
+    return result
+
+
+def print_table(results):
+    print(f"{'Variant':<11} {'Token':>6} {'JWKS':>7} {'Operation':<17} {'Ops/s':>9} {'p50 us':>9} {'p99 us':>9} {'CPU us/op':>10}")
+    for result in results:
+        for operation in ("sign", "verify_warm", "verify_cold", "verify_cold_http"):
+            if operation not in result:
+                continue
+            m = result[operation]
+            print(f"{result['variant']:<11} {result['token_bytes']:>6} {result['jwks_bytes']:>7} {operation:<17} "
+                  f"{m['ops_per_second']:>9} {m['p50_us']:>9} {m['p99_us']:>9} {m['cpu_us_per_op']:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark JWT signing and verification for RS256 (2048/3072/4096), ES256 and HS256.")
+    parser.add_argument("--variants", default=",".join(name for name, _, _ in VARIANTS),
+                        help="Comma separated variants (default: all).")
+    parser.add_argument("--iterations", type=int, default=2000, help="Signs and warm verifications per variant.")
+    parser.add_argument("--cold_iterations", type=int, default=500, help="Cold verifications per variant.")
+    parser.add_argument("--jwks_keys", type=int, default=2, help="Keys in the JWKS a cold verification parses (default: 2).")
+    parser.add_argument("--key_dir", default="benchmark_keys", help="Key pool reused across runs (see generate_jwk.py).")
+    parser.add_argument("--jwks_url", help="Also time cold verification fetching the JWKS over HTTP, e.g. from stub_server.py.")
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    variants = {name: (algorithm, key_size) for name, algorithm, key_size in VARIANTS}
+    selected = [name.strip() for name in args.variants.split(",") if name.strip()]
+    if any(name not in variants for name in selected):
+        print(f"Error: unknown variant in '{args.variants}'. Valid variants: {list(variants)}")
+        sys.exit(1)
+
+    pool = KeyPool(args.key_dir)
+    results = [run_variant(pool, name, *variants[name], args) for name in selected]
+    print_table(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
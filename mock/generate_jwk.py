@@ -1,67 +1,193 @@
 import json
 from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.asymmetric import rsa, ec, ed25519
 from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.asymmetric import padding
 import uuid
 import base64
-import hashlib
 import os
+import sys
+import time
+import argparse
+import concurrent.futures
 
-def generate_rsa_key_pair():
+# Supported signing algorithms; EC and Ed25519 keys generate in well under a millisecond
+ALGORITHMS = ["RS256", "ES256", "EdDSA"]
+
+INDEX_FILE = "index.json"
+
+
+def _b64url(data):
+    return base64.urlsafe_b64encode(data).decode('utf-8').rstrip("=")
+
+
+def _int_to_b64url(value, length=None):
+    return _b64url(value.to_bytes(length or (value.bit_length() + 7) // 8, 'big'))
+
+
+def rsa_key_size(jwk):
+    """Bit length of the modulus of an RSA JWK (index entries written before key_size was recorded lack it)."""
+    n = jwk.get("n") if jwk else None
+    if not n:
+        return None
+    return int.from_bytes(base64.urlsafe_b64decode(n + "=" * (-len(n) % 4)), 'big').bit_length()
+
+
+def generate_rsa_key_pair(key_size=2048):
     """Generates an RSA key pair."""
     private_key = rsa.generate_private_key(
         public_exponent=65537,
-        key_size=2048,  # Adjust key size as needed
+        key_size=key_size,  # Adjust key size as needed
         backend=default_backend()
     )
     public_key = private_key.public_key()
     return private_key, public_key
 
 
+def generate_key_pair(algorithm="RS256", key_size=2048):
+    """Generates a key pair for RS256 (RSA), ES256 (EC P-256) or EdDSA (Ed25519)."""
+    if algorithm == "RS256":
+        return generate_rsa_key_pair(key_size)
+    if algorithm == "ES256":
+        private_key = ec.generate_private_key(ec.SECP256R1(), backend=default_backend())
+    elif algorithm == "EdDSA":
+        private_key = ed25519.Ed25519PrivateKey.generate()
+    else:
+        raise ValueError(f"Unsupported algorithm: {algorithm}")
+    return private_key, private_key.public_key()
+
+
 def public_key_to_jwk(public_key, key_id):
     """Converts a public key to JWK format."""
+    if isinstance(public_key, ec.EllipticCurvePublicKey):
+        public_numbers = public_key.public_numbers()
+        return {"kty": "EC", "kid": key_id, "crv": "P-256",
+                "x": _int_to_b64url(public_numbers.x, 32), "y": _int_to_b64url(public_numbers.y, 32),
+                "alg": "ES256", "use": "sig"}
+    if isinstance(public_key, ed25519.Ed25519PublicKey):
+        raw = public_key.public_bytes(encoding=serialization.Encoding.Raw, format=serialization.PublicFormat.Raw)
+        return {"kty": "OKP", "kid": key_id, "crv": "Ed25519", "x": _b64url(raw), "alg": "EdDSA", "use": "sig"}
     public_numbers = public_key.public_numbers()
     #print(public_numbers)
     jwk = {
         "kty": "RSA",
         "kid": key_id,
-        "n": base64.urlsafe_b64encode(public_numbers.n.to_bytes((public_numbers.n.bit_length() + 7) // 8, 'big')).decode('utf-8').rstrip("="),
-        "e": base64.urlsafe_b64encode(public_numbers.e.to_bytes((public_numbers.e.bit_length() + 7) // 8, 'big')).decode('utf-8').rstrip("="),
+        "n": _int_to_b64url(public_numbers.n),
+        "e": _int_to_b64url(public_numbers.e),
         "alg": "RS256",  # or another appropriate algorithm
         "use": "sig"
     }
     return jwk
 
 
-def generate_jwks(num_keys=1):
-    """Generates a JWKS (JSON Web Key Set)."""
-    keys = []
-    for _ in range(num_keys):
-        key_id = str(uuid.uuid4())  # Generate a unique key ID
-        private_key, public_key = generate_rsa_key_pair()
+def _generate_one(task):
+    """Worker: generates one key. Returns (key_id, private PEM, public JWK)."""
+    algorithm, key_size = task
+    key_id = str(uuid.uuid4())  # Generate a unique key ID
+    private_key, public_key = generate_key_pair(algorithm, key_size)
 
-        # Export private key to PEM format (for signing JWTs)
-        private_pem = private_key.private_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PrivateFormat.PKCS8,
-            encryption_algorithm=serialization.NoEncryption()
-        )
-        # Save private key to a file (VERY IMPORTANT: SECURE THIS FILE!)
-        with open(f"private_key_{key_id}.pem", "wb") as f:
-            f.write(private_pem)  # Corrected this line
+    # Export private key to PEM format (for signing JWTs)
+    private_pem = private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption()
+    )
+    return key_id, private_pem, public_key_to_jwk(public_key, key_id)
+
+
+class KeyPool:
+    """
+    A directory of private_key_{kid}.pem files plus an index.json mapping each kid to its
+    algorithm, file and public JWK, so keys are reused across runs instead of regenerated.
+    """
+
+    def __init__(self, directory="."):
+        self.directory = directory
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self.index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r") as f:
+                self.index = json.load(f)
+
+    def kids(self, algorithm=None, key_size=None):
+        """Key IDs in the pool, oldest first, optionally only those of one algorithm (and RSA key size)."""
+        entries = sorted(self.index.items(), key=lambda item: item[1]["created"])
+        return [kid for kid, entry in entries if (algorithm is None or entry["alg"] == algorithm)
+                and (key_size is None or entry["alg"] != "RS256"
+                     or (entry.get("key_size") or rsa_key_size(entry.get("jwk"))) == key_size)]
 
+    def generate(self, count, algorithm="RS256", key_size=2048, workers=None):
+        """Generates count new keys in parallel processes, writes them and updates the index. Returns the new kids."""
+        if count <= 0:
+            return []
+        os.makedirs(self.directory, exist_ok=True)
+        tasks = [(algorithm, key_size)] * count
+        created = time.time()
+        new_kids = []
+        # RSA generation is CPU bound and worth the processes; EC/Ed25519 keys are faster to make in-process
+        executor_class = concurrent.futures.ProcessPoolExecutor if algorithm == "RS256" and count > 1 \
+            else concurrent.futures.ThreadPoolExecutor
+        with executor_class(max_workers=workers or os.cpu_count()) as executor:
+            for i, (key_id, private_pem, jwk) in enumerate(executor.map(_generate_one, tasks, chunksize=max(1, count // 64))):
+                file_name = f"private_key_{key_id}.pem"
+                # Save private key to a file (VERY IMPORTANT: SECURE THIS FILE!)
+                with open(os.path.join(self.directory, file_name), "wb") as f:
+                    f.write(private_pem)
+                self.index[key_id] = {"alg": algorithm, "file": file_name, "created": created + i * 1e-6, "jwk": jwk}
+                if algorithm == "RS256":
+                    self.index[key_id]["key_size"] = key_size
+                new_kids.append(key_id)
+        self.save()
+        return new_kids
 
-        jwk = public_key_to_jwk(public_key, key_id)
-        keys.append(jwk)
+    def ensure(self, count, algorithm="RS256", key_size=2048, workers=None):
+        """Returns the kids of count keys of the algorithm, generating only the ones the pool lacks."""
+        existing = self.kids(algorithm, key_size)
+        self.generate(count - len(existing), algorithm, key_size, workers)
+        return self.kids(algorithm, key_size)[:count]
 
-    jwks = {"keys": keys}
-    return jwks
+    def jwks(self, kids):
+        """Builds the JWKS of the given kids from the index; no private key is read."""
+        return {"keys": [self.index[kid]["jwk"] for kid in kids]}
+
+    def save(self):
+        # Write then rename, so an interrupted run never leaves a truncated index
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.index, f, indent=4)
+        os.replace(tmp_path, self.index_path)
+
+
+def generate_jwks(num_keys=1, algorithm="RS256", key_size=2048, key_dir=".", workers=None):
+    """Generates a JWKS (JSON Web Key Set) of num_keys new keys, saved in the key_dir pool."""
+    pool = KeyPool(key_dir)
+    return pool.jwks(pool.generate(num_keys, algorithm, key_size, workers))
 
 
 if __name__ == "__main__":
-    jwks_data = generate_jwks(num_keys=2)  # Generate 2 keys in the JWKS
-    with open("jwks.json", "w") as f:
+    parser = argparse.ArgumentParser(description="Generate signing keys and their JWKS.")
+    parser.add_argument("--num_keys", type=int, default=2, help="Number of keys in the JWKS (default: 2).")
+    parser.add_argument("--alg", choices=ALGORITHMS, default="RS256", help="Key type: RS256, ES256 or EdDSA (default: RS256).")
+    parser.add_argument("--key_size", type=int, default=2048, help="RSA key size (default: 2048).")
+    parser.add_argument("--key_dir", default=".", help="Key pool directory with the private keys and index.json.")
+    parser.add_argument("--reuse", action="store_true", default=False,
+                        help="Reuse existing keys of the pool and only generate the missing ones.")
+    parser.add_argument("--workers", type=int, default=0, help="Key generation processes (default: CPU count).")
+    parser.add_argument("--output", default="jwks.json", help="JWKS output file (default: jwks.json).")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    key_pool = KeyPool(args.key_dir)
+    try:
+        if args.reuse:
+            kids = key_pool.ensure(args.num_keys, args.alg, args.key_size, args.workers or None)
+        else:
+            kids = key_pool.generate(args.num_keys, args.alg, args.key_size, args.workers or None)
+    except Exception as e:
+        print(f"Error generating keys: {e}")
+        sys.exit(1)
+
+    jwks_data = key_pool.jwks(kids)
+    with open(args.output, "w") as f:
         json.dump(jwks_data, f, indent=4)
-    print("JWKS generated and saved to jwks.json")
\ No newline at end of file
+    print(f"JWKS with {len(kids)} {args.alg} key(s) generated in {time.perf_counter() - start:.2f}s "
+          f"and saved to {args.output} (key pool: {key_pool.index_path})")
@@ -1,51 +1,261 @@
 import jwt
 import json
+import csv
+import os
+import sys
+import time
+import random
+import bisect
+import argparse
+import multiprocessing
 from datetime import datetime, timedelta
+from urllib.parse import urlsplit
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.asymmetric import padding
+from cryptography.hazmat.primitives.asymmetric import rsa, ec, ed25519
 
-def generate_jwt(payload, private_key_file, algorithm="RS256"):
-    """Generates a signed JWT."""
+# Signing algorithm for each EC curve
+EC_ALGORITHMS = {"secp256r1": "ES256", "secp384r1": "ES384", "secp521r1": "ES512"}
+
+# Columns written next to the token in bulk mode
+OUTPUT_FIELDS = ["token", "kid", "iss", "sub", "email", "orgId", "exp"]
+
+
+def key_id_from_filename(private_key_file):
+    """Returns the key ID of a "private_key_{key_id}.pem" file."""
+    name = os.path.basename(private_key_file)
+    if name.startswith("private_key_"):
+        name = name[len("private_key_"):]
+    return os.path.splitext(name)[0]
+
+
+def algorithm_for_key(private_key):
+    """Returns the JWS algorithm matching the key type (RS256, ES256/384/512 or EdDSA)."""
+    if isinstance(private_key, rsa.RSAPrivateKey):
+        return "RS256"
+    if isinstance(private_key, ec.EllipticCurvePrivateKey):
+        if private_key.curve.name not in EC_ALGORITHMS:
+            raise ValueError(f"Unsupported EC curve: {private_key.curve.name}")
+        return EC_ALGORITHMS[private_key.curve.name]
+    if isinstance(private_key, ed25519.Ed25519PrivateKey):
+        return "EdDSA"
+    raise ValueError(f"Unsupported private key type: {type(private_key).__name__}")
+
+
+def load_signing_key(private_key_file):
+    """Loads a PEM private key once. Returns (private_key, key_id, algorithm)."""
     with open(private_key_file, "rb") as key_file:
         private_key = serialization.load_pem_private_key(
             key_file.read(),
             password=None,
             backend=default_backend()
         )
+    return private_key, key_id_from_filename(private_key_file), algorithm_for_key(private_key)
+
 
-    # Get the key ID from the filename (assuming the filename is "private_key_{key_id}.pem")
-    key_id = private_key_file.split("_")[2].split(".")[0]
+def generate_jwt(payload, private_key_file, algorithm=None):
+    """Generates a signed JWT. The algorithm defaults to the one matching the key type."""
+    private_key, key_id, key_algorithm = load_signing_key(private_key_file)
 
     headers = {'kid': key_id}  # Include the key ID in the header
 
-    encoded_jwt = jwt.encode(payload, private_key, algorithm=algorithm, headers=headers)
+    encoded_jwt = jwt.encode(payload, private_key, algorithm=algorithm or key_algorithm, headers=headers)
     return encoded_jwt
 
 
+def _split_weight(item):
+    """Splits "value:weight" into (value, weight or None). A URL's port is not a weight."""
+    value, _, weight = item.rpartition(":")
+    if not value:
+        return item, None
+    if "://" in item:
+        parts = urlsplit(item)
+        # "https://idp.example.com:8443" ends in a port; "https://idp.example.com:8443:2" and "https://idp/path:2" in a weight
+        if not parts.path and parts.netloc.rsplit("]", 1)[-1].count(":") == 1 and weight.isdigit():
+            return item, None
+    try:
+        return value, float(weight)
+    except ValueError:
+        return item, None  # No weight suffix, e.g. an issuer URL such as https://idp.example.com
+
+
+def parse_weighted(spec, cast=str):
+    """
+    Parses "value:weight,value:weight" (weights default to 1). Returns (values, cumulative weights).
+    An integer right after a URL's host is its port: https://idp.example.com:8443 has weight 1,
+    https://idp.example.com:8443:2 weight 2.
+    """
+    values, cum_weights, total = [], [], 0.0
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        value, weight = _split_weight(item.strip())
+        weight = 1.0 if weight is None else weight
+        total += weight
+        values.append(cast(value))
+        cum_weights.append(total)
+    if not values or total <= 0:
+        raise ValueError(f"Invalid weighted list: '{spec}'")
+    return values, cum_weights
+
+
+def zipf_cum_weights(count, exponent):
+    """Cumulative weights of a Zipf distribution over count ranks; a few users get most of the traffic."""
+    cum_weights, total = [], 0.0
+    for rank in range(1, count + 1):
+        total += 1.0 / rank ** exponent
+        cum_weights.append(total)
+    return cum_weights
+
+
+# Per-worker state, set once by _init_worker so every task reuses the parsed keys
+_worker = {}
+
+
+def _init_worker(key_files, settings):
+    _worker["keys"] = [load_signing_key(path) for path in key_files]
+    _worker["settings"] = settings
+    _worker["issuers"] = parse_weighted(settings["issuers"])
+    _worker["expiries"] = parse_weighted(settings["expiry_minutes"], cast=float)
+    _worker["orgs"] = parse_weighted(settings["orgs"]) if not settings["orgs"].isdigit() else None
+    _worker["user_weights"] = zipf_cum_weights(settings["users"], settings["zipf_s"]) if settings["zipf_s"] else None
+
+
+def _pick(rng, values, cum_weights):
+    return values[bisect.bisect(cum_weights, rng.random() * cum_weights[-1])]
+
+
+def _mint_chunk(task):
+    """Mints tokens start..start+count-1. Claims are seeded by the token index, so a run is reproducible."""
+    start, count = task
+    settings, keys = _worker["settings"], _worker["keys"]
+    rng = random.Random(settings["seed"] * 1000003 + start)
+    rows = []
+    for index in range(start, start + count):
+        if _worker["user_weights"]:
+            user = bisect.bisect(_worker["user_weights"], rng.random() * _worker["user_weights"][-1])
+        else:
+            user = rng.randrange(settings["users"])
+        sub = f"{settings['user_prefix']}{user}"
+        if _worker["orgs"]:
+            org_id = _pick(rng, *_worker["orgs"])
+        else:
+            org_id = f"org-{user % int(settings['orgs'])}"  # Users stay in the same org across tokens
+        payload = {
+            "iss": _pick(rng, *_worker["issuers"]),
+            "sub": sub,
+            "aud": settings["aud"],
+            "iat": settings["iat"],
+            "exp": settings["iat"] + int(_pick(rng, *_worker["expiries"]) * 60),
+            "jti": f"{settings['seed']}-{index}",
+            "name": sub,
+            "email": f"{sub}@{settings['email_domain']}",
+            "orgId": org_id
+        }
+        private_key, key_id, algorithm = keys[index % len(keys)]
+        token = jwt.encode(payload, private_key, algorithm=algorithm, headers={"kid": key_id})
+        rows.append({"token": token, "kid": key_id, "iss": payload["iss"], "sub": sub,
+                     "email": payload["email"], "orgId": org_id, "exp": payload["exp"]})
+    return rows
+
+
+def mint_bulk(key_files, count, output_file, settings, workers=None, chunk_size=500, output_format=None):
+    """
+    Mints count tokens across a process pool and streams them to an NDJSON or CSV file.
+    Each worker loads the private keys once; tokens rotate over the keys by index.
+    Returns (tokens written, seconds elapsed).
+    """
+    output_format = output_format or ("csv" if output_file.endswith(".csv") else "ndjson")
+    tasks = [(start, min(chunk_size, count - start)) for start in range(0, count, chunk_size)]
+    written, start_time = 0, time.perf_counter()
+    with open(output_file, "w", newline="") as out, \
+            multiprocessing.Pool(workers or os.cpu_count(), initializer=_init_worker,
+                                 initargs=(key_files, settings)) as pool:
+        writer = csv.DictWriter(out, fieldnames=OUTPUT_FIELDS) if output_format == "csv" else None
+        if writer:
+            writer.writeheader()
+        # imap keeps the file in token order while only a few chunks are held in memory
+        for rows in pool.imap(_mint_chunk, tasks):
+            if writer:
+                writer.writerows(rows)
+            else:
+                out.writelines(json.dumps(row, separators=(",", ":")) + "\n" for row in rows)
+            written += len(rows)
+    return written, time.perf_counter() - start_time
+
+
 if __name__ == "__main__":
-    # Example Usage
-    payload = {
-        'iss': 'ExchangeTokens',
-        'sub': 'john.doe',
-        'aud': 'your-audience',
-        'iat': datetime.utcnow(),
-        'exp': datetime.utcnow() + timedelta(minutes=3600),
-        'name': 'John Doe',
-        'email': 'john.doe@example.com',
-        'orgId': 'example'
-    }
-
-    # Replace with the actual path to your private key file
-    private_key_file = "private_key_b9ed59ef-e796-4cda-9ead-1dafe16fea85.pem"  # <--- IMPORTANT: Update this!
-    # Replace YOUR_KEY_ID with a key ID generated by the generate_jwks.py script
-    # For example: private_key_a1b2c3d4-e5f6-7890-1234-567890abcdef.pem
+    parser = argparse.ArgumentParser(description="Generate one signed JWT, or mint tokens in bulk for load tests.")
+    parser.add_argument("--private_key_file", action="append", default=[],
+                        help="PEM private key (private_key_{kid}.pem). Repeat to rotate tokens over several keys.")
+    parser.add_argument("--count", type=int, default=0, help="Bulk mode: number of tokens to mint.")
+    parser.add_argument("--output", default="tokens.ndjson", help="Bulk output file; .csv writes CSV, anything else NDJSON.")
+    parser.add_argument("--format", choices=["ndjson", "csv"], help="Override the output format chosen from the extension.")
+    parser.add_argument("--workers", type=int, default=0, help="Signing processes (default: CPU count).")
+    parser.add_argument("--chunk_size", type=int, default=500, help="Tokens per worker task.")
+    parser.add_argument("--issuers", default="ExchangeTokens", help="Weighted issuers, e.g. 'ExchangeTokens:0.9,PartnerIdp:0.1'.")
+    parser.add_argument("--users", type=int, default=10000, help="Number of distinct subjects.")
+    parser.add_argument("--zipf_s", type=float, default=0.0,
+                        help="Zipf exponent of the subject distribution (default: 0, uniform).")
+    parser.add_argument("--user_prefix", default="user", help="Subjects are {prefix}{n}.")
+    parser.add_argument("--email_domain", default="example.com", help="Email domain of the subjects.")
+    parser.add_argument("--orgs", default="100",
+                        help="Number of orgs (each subject keeps its org) or weighted org IDs, e.g. 'acme:3,globex:1'.")
+    parser.add_argument("--aud", default="your-audience", help="Audience claim.")
+    parser.add_argument("--expiry_minutes", default="60",
+                        help="Weighted token lifetimes in minutes; negative values mint expired tokens, e.g. '60:0.95,-5:0.05'.")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the claim distributions.")
+    args = parser.parse_args()
+
+    if not args.count:
+        # Example Usage
+        payload = {
+            'iss': 'ExchangeTokens',
+            'sub': 'john.doe',
+            'aud': 'your-audience',
+            'iat': datetime.utcnow(),
+            'exp': datetime.utcnow() + timedelta(minutes=3600),
+            'name': 'John Doe',
+            'email': 'john.doe@example.com',
+            'orgId': 'example'
+        }
 
+        # Replace with the actual path to your private key file
+        private_key_file = "private_key_b9ed59ef-e796-4cda-9ead-1dafe16fea85.pem"  # <--- IMPORTANT: Update this!
+        # Replace YOUR_KEY_ID with a key ID generated by the generate_jwks.py script
+        # For example: private_key_a1b2c3d4-e5f6-7890-1234-567890abcdef.pem
+        private_key_file = args.private_key_file[0] if args.private_key_file else private_key_file
+
+        try:
+            jwt_token = generate_jwt(payload, private_key_file)
+            print("Generated JWT:", jwt_token)
+        except FileNotFoundError:
+            print(f"Error: Private key file not found: {private_key_file}")
+        except Exception as e:
+            print(f"Error generating JWT: {e}")
+        sys.exit(0)
+
+    if not args.private_key_file:
+        print("Error: bulk mode needs at least one --private_key_file")
+        sys.exit(1)
+    settings = {"issuers": args.issuers, "users": args.users, "zipf_s": args.zipf_s, "user_prefix": args.user_prefix,
+                "email_domain": args.email_domain, "orgs": args.orgs, "aud": args.aud,
+                "expiry_minutes": args.expiry_minutes, "seed": args.seed, "iat": int(time.time())}
     try:
-        jwt_token = generate_jwt(payload, private_key_file)
-        print("Generated JWT:", jwt_token)
-    except FileNotFoundError:
-        print(f"Error: Private key file not found: {private_key_file}")
+        # Fail fast in the parent instead of in every worker
+        for path in args.private_key_file:
+            load_signing_key(path)
+        parse_weighted(args.issuers)
+        parse_weighted(args.expiry_minutes, cast=float)
+        if not args.orgs.isdigit():
+            parse_weighted(args.orgs)
+        elif int(args.orgs) == 0:
+            raise ValueError("--orgs must be at least 1")
     except Exception as e:
-        print(f"Error generating JWT: {e}")
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    written, elapsed = mint_bulk(args.private_key_file, args.count, args.output, settings,
+                                 workers=args.workers or None, chunk_size=args.chunk_size, output_format=args.format)
+    print(f"Minted {written} tokens in {elapsed:.2f}s ({written / elapsed:.0f} tokens/s) "
+          f"with {args.workers or os.cpu_count()} worker(s) -> {args.output}")
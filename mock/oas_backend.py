@@ -0,0 +1,257 @@
+import os
+import re
+import sys
+import json
+import socket
+import signal
+import asyncio
+import argparse
+import multiprocessing
+import yaml
+from stub_server import HttpServer, Response, listen_socket, parse_latency_specs
+
+# Serves every path and verb of the OAS a proxy is built from (prepare_bundle.py --oas_file_location/--oas_file_name),
+# so the proxy's --target_url can point here and a load test measures the gateway by itself.
+
+HTTP_METHODS = ("get", "put", "post", "delete", "options", "head", "patch", "trace")
+
+# Fixed sample values, so every response of an operation is byte-identical and cacheable
+STRING_FORMATS = {"date-time": "2024-01-01T00:00:00Z", "date": "2024-01-01", "email": "user@example.com",
+                  "uuid": "00000000-0000-4000-8000-000000000000", "uri": "https://example.com",
+                  "hostname": "example.com", "ipv4": "192.0.2.1", "byte": "ZXhhbXBsZQ=="}
+
+
+def load_oas(file_path):
+    """Loads an OAS 3 (or Swagger 2) document from YAML or JSON."""
+    with open(file_path, "r") as f:
+        return yaml.safe_load(f)
+
+
+def resolve_ref(spec, node):
+    """Follows local "$ref": "#/components/schemas/X" references."""
+    seen = set()
+    while isinstance(node, dict) and "$ref" in node:
+        ref = node["$ref"]
+        if ref in seen or not ref.startswith("#/"):
+            return {}
+        seen.add(ref)
+        node = spec
+        for part in ref[2:].split("/"):
+            node = node.get(part.replace("~1", "/").replace("~0", "~"), {}) if isinstance(node, dict) else {}
+    return node
+
+
+def synthesize(spec, schema, name="value", depth=0, array_items=2, refs=frozenset()):
+    """
+    Builds a sample value from a JSON schema: example, default or enum first, then the type.
+    A $ref already being expanded (a recursive schema) yields None and optional properties that
+    are None are left out.
+    """
+    ref = schema.get("$ref") if isinstance(schema, dict) else None
+    if ref in refs:
+        return None
+    refs = refs | {ref} if ref else refs
+    schema = resolve_ref(spec, schema) or {}
+    for key in ("example", "default"):
+        if key in schema:
+            return schema[key]
+    if schema.get("enum"):
+        return schema["enum"][0]
+    if depth > 8:
+        return None  # Deeply nested schemas stop here
+    if "allOf" in schema:
+        merged = {}
+        for part in schema["allOf"]:
+            value = synthesize(spec, part, name, depth + 1, array_items, refs)
+            if isinstance(value, dict):
+                merged.update(value)
+        return merged
+    for key in ("oneOf", "anyOf"):
+        if schema.get(key):
+            return synthesize(spec, schema[key][0], name, depth + 1, array_items, refs)
+
+    schema_type = schema.get("type")
+    if isinstance(schema_type, list):  # OAS 3.1 type lists, e.g. ["string", "null"]
+        schema_type = next((t for t in schema_type if t != "null"), None)
+    if schema_type is None:
+        schema_type = "object" if "properties" in schema else "array" if "items" in schema else "string"
+    if schema_type == "object":
+        required = set(schema.get("required", []))
+        value = {}
+        for prop, prop_schema in schema.get("properties", {}).items():
+            prop_value = synthesize(spec, prop_schema, prop, depth + 1, array_items, refs)
+            if prop_value is not None or prop in required:
+                value[prop] = prop_value
+        if not value and isinstance(schema.get("additionalProperties"), dict):
+            value = {"key": synthesize(spec, schema["additionalProperties"], "key", depth + 1, array_items, refs)}
+        return value
+    if schema_type == "array":
+        count = max(schema.get("minItems", 0), min(array_items, schema.get("maxItems", array_items)))
+        items = [synthesize(spec, schema.get("items", {}), name, depth + 1, array_items, refs) for _ in range(count)]
+        return [item for item in items if item is not None]
+    if schema_type == "integer":
+        return schema.get("minimum", 1)
+    if schema_type == "number":
+        return schema.get("minimum", 1.5)
+    if schema_type == "boolean":
+        return True
+    if schema.get("format") in STRING_FORMATS:
+        return STRING_FORMATS[schema["format"]]
+    return f"{name}-example"[:schema["maxLength"]] if "maxLength" in schema else f"{name}-example"
+
+
+def pad_to_size(value, payload_bytes):
+    """Grows a response to about payload_bytes: repeats array items, or adds a "_padding" field to objects."""
+    body = json.dumps(value)
+    if not payload_bytes or len(body) >= payload_bytes:
+        return value
+    if isinstance(value, list) and value:
+        item_bytes = len(json.dumps(value[0])) + 2
+        return value + [value[i % len(value)] for i in range((payload_bytes - len(body)) // item_bytes)]
+    if isinstance(value, dict):
+        return dict(value, _padding="x" * max(0, payload_bytes - len(body) - 16))
+    return value
+
+
+def sample_response(spec, operation, array_items=2):
+    """
+    Picks the operation's success response (lowest 2xx, else "default") and returns
+    (status, content type, body value) from its example(s) or its schema.
+    """
+    responses = operation.get("responses", {})
+    codes = sorted(code for code in map(str, responses) if code.startswith("2"))
+    code = codes[0] if codes else ("default" if "default" in responses else None)
+    if code is None:
+        return 200, "application/json", {}
+    status = 200 if code == "default" or "X" in code.upper() else int(code)
+    response = resolve_ref(spec, responses.get(code) or responses.get(int(code) if code.isdigit() else code)) or {}
+
+    if "content" in response:  # OAS 3
+        content_types = list(response["content"])
+        content_type = next((t for t in content_types if "json" in t), content_types[0] if content_types else None)
+        media = response["content"].get(content_type) or {}
+        if "example" in media:
+            return status, content_type, media["example"]
+        if media.get("examples"):
+            example = resolve_ref(spec, next(iter(media["examples"].values())))
+            return status, content_type, example.get("value", example)
+        return status, content_type, synthesize(spec, media.get("schema", {}), array_items=array_items) if media else None
+    if response.get("examples"):  # Swagger 2
+        content_type, example = next(iter(response["examples"].items()))
+        return status, content_type, example
+    if "schema" in response:
+        return status, "application/json", synthesize(spec, response["schema"], array_items=array_items)
+    return status, None, None
+
+
+def path_pattern(base_path, path):
+    """Regex of an OAS path template: /users/{id} matches /users/42."""
+    def group(match):
+        name = re.sub(r"[^A-Za-z0-9_]", "_", match.group(1))
+        return f"(?P<{name}>[^/]+)" if name.isidentifier() else "([^/]+)"
+    pattern = re.sub(r"\\{([^}]+)\\}", group, re.escape(path))
+    return re.escape(base_path.rstrip("/")) + pattern
+
+
+def build_operations(spec, array_items=2, payload_bytes=0):
+    """Returns [(method, path, endpoint, status, content type, body bytes)] for every operation of the OAS."""
+    operations = []
+    for path, path_item in (spec.get("paths") or {}).items():
+        path_item = resolve_ref(spec, path_item)
+        for method in HTTP_METHODS:
+            operation = path_item.get(method)
+            if not isinstance(operation, dict):
+                continue
+            status, content_type, value = sample_response(spec, operation, array_items)
+            if value is None or status == 204:
+                body = b""
+            elif isinstance(value, (dict, list)) or "json" in (content_type or ""):
+                body = json.dumps(pad_to_size(value, payload_bytes)).encode("utf-8")
+                if not content_type or "*" in content_type:
+                    content_type = "application/json"  # e.g. springdoc's '*/*' response content
+            else:
+                body = str(value).encode("utf-8")
+            endpoint = operation.get("operationId") or f"{method.upper()} {path}"
+            operations.append((method.upper(), path, endpoint, status, content_type, body))
+    return operations
+
+
+def build_server(operations, base_path="", latency=None, error_rate=0.0, seed=None):
+    server = HttpServer(latency=latency, error_rate=error_rate, seed=seed)
+    # Literal paths win over templates, and templates with fewer parameters over those with more
+    for method, path, endpoint, status, content_type, body in sorted(operations, key=lambda op: op[1].count("{")):
+        async def handler(request, status=status, content_type=content_type, body=body):
+            return Response(status, body, content_type=content_type)
+        if "{" in path:
+            server.route_pattern(method, path_pattern(base_path, path), endpoint, handler)
+        else:
+            server.route(method, base_path.rstrip("/") + path, endpoint, handler)
+    return server
+
+
+def serve_process(operations, args, reuse_port, sock=None):
+    """Runs one server process; with SO_REUSEPORT every process binds the port itself."""
+    server = build_server(operations, args.base_path, parse_latency_specs(args.latency), args.error_rate,
+                          None if args.seed is None else args.seed + os.getpid())
+    if sock is None:
+        sock = listen_socket(args.host, args.port, reuse_port)
+    try:
+        asyncio.run(server.serve(args.host, args.port, sock=sock))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock backend serving every operation of an OAS with example or synthesized responses.")
+    parser.add_argument("--oas_file_location", required=True, help="OAS file location (as given to prepare_bundle.py)")
+    parser.add_argument("--oas_file_name", required=True, help="OAS file name (as given to prepare_bundle.py)")
+    parser.add_argument("--host", default="127.0.0.1", help="Listen address (default: 127.0.0.1).")
+    parser.add_argument("--port", type=int, default=8080, help="Listen port (default: 8080).")
+    parser.add_argument("--base_path", default="", help="Path prefix of the proxy's --target_url, if any.")
+    parser.add_argument("--latency", action="append", default=[],
+                        help="Latency as [operationId=]spec, e.g. 'getUser=lognormal:20:0.3' or 'fixed:5' (see stub_server.py).")
+    parser.add_argument("--error_rate", type=float, default=0.0, help="Fraction of requests answered with 503.")
+    parser.add_argument("--payload_bytes", type=int, default=0, help="Pad JSON responses to about this many bytes.")
+    parser.add_argument("--array_items", type=int, default=2, help="Items in synthesized arrays (default: 2).")
+    parser.add_argument("--processes", type=int, default=1, help="Server processes sharing the port (default: 1; 0 = CPU count).")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the latency and error sampling.")
+    parser.add_argument("--list", action="store_true", default=False, help="Print the operations and their response sizes, then exit.")
+    args = parser.parse_args()
+
+    try:
+        spec = load_oas(os.path.join(args.oas_file_location, args.oas_file_name))
+        operations = build_operations(spec, args.array_items, args.payload_bytes)
+        parse_latency_specs(args.latency)
+    except (OSError, yaml.YAMLError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if not operations:
+        print(f"Error: no operations found in {args.oas_file_name}")
+        sys.exit(1)
+    if args.list:
+        for method, path, endpoint, status, content_type, body in operations:
+            print(f"{method:<7} {args.base_path.rstrip('/')}{path:<40} {status} {len(body):>8} bytes  {endpoint}")
+        sys.exit(0)
+
+    processes = args.processes or os.cpu_count()
+    print(f"Serving {len(operations)} operation(s) of {args.oas_file_name} on http://{args.host}:{args.port}{args.base_path} "
+          f"with {processes} process(es); counters at /stats (per process)")
+    if processes == 1:
+        serve_process(operations, args, reuse_port=False)
+        sys.exit(0)
+
+    # Without SO_REUSEPORT the children share one inherited listening socket instead
+    reuse_port = hasattr(socket, "SO_REUSEPORT")
+    shared_sock = None if reuse_port else listen_socket(args.host, args.port)
+    children = [multiprocessing.Process(target=serve_process, args=(operations, args, reuse_port, shared_sock), daemon=True)
+                for _ in range(processes)]
+    for child in children:
+        child.start()
+    # Stopping the parent (Ctrl-C or SIGTERM) stops the children too
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        for child in children:
+            child.join()
+    except (KeyboardInterrupt, SystemExit):
+        for child in children:
+            child.terminate()
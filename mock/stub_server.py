@@ -0,0 +1,412 @@
+import os
+import re
+import sys
+import json
+import time
+import base64
+import random
+import socket
+import asyncio
+import hashlib
+import argparse
+import itertools
+import collections
+from email.utils import formatdate
+from urllib.parse import urlsplit, parse_qs
+
+# Local stand-in for the backends SF-spitfire-pre calls:
+#   GET  /jwks, /.well-known/jwks.json      openid_config KVM url (JWKS)
+#   GET  /spitfire_user_crud?email=&externalOrganizationId=   user-manager-user-query
+#   PUT  /spitfire_user_crud                user-manager-user-create
+#   POST /spitfire_validate_token           auth-manager-token-introspect
+#   GET  /stats, POST /stats/reset          request counters and latencies
+
+REASONS = {200: "OK", 201: "Created", 204: "No Content", 304: "Not Modified", 400: "Bad Request", 401: "Unauthorized",
+           404: "Not Found", 405: "Method Not Allowed", 411: "Length Required", 413: "Payload Too Large",
+           500: "Internal Server Error", 503: "Service Unavailable"}
+
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+
+class Request:
+    def __init__(self, method, target, headers, body):
+        self.method = method
+        parts = urlsplit(target)
+        self.path = parts.path
+        self.query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        self.headers = headers  # lower-cased names
+        self.body = body
+        self.path_params = {}
+
+    def json(self):
+        """Parses the body as JSON; tolerates the trailing commas Apigee message templates tend to leave."""
+        text = self.body.decode("utf-8")
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            return json.loads(re.sub(r",\s*([}\]])", r"\1", text))
+
+
+class Response:
+    def __init__(self, status=200, body=b"", headers=None, content_type="application/json"):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode("utf-8")
+        elif isinstance(body, str):
+            body = body.encode("utf-8")
+        self.status = status
+        self.body = body
+        self.headers = dict(headers or {})
+        if body and content_type:
+            self.headers.setdefault("Content-Type", content_type)
+
+
+class LatencyDistribution:
+    """
+    Response delay in milliseconds, parsed from a spec:
+    "fixed:20", "uniform:10:50", "normal:30:5", "lognormal:MEDIAN_MS:SIGMA" or "exp:MEAN_MS".
+    """
+
+    def __init__(self, spec="fixed:0"):
+        self.spec = spec
+        kind, *params = spec.split(":")
+        try:
+            params = [float(p) for p in params]
+        except ValueError:
+            raise ValueError(f"Invalid latency spec: '{spec}'")
+        samplers = {
+            "fixed": (1, lambda rng, ms: ms),
+            "uniform": (2, lambda rng, low, high: rng.uniform(low, high)),
+            "normal": (2, lambda rng, mean, stddev: rng.gauss(mean, stddev)),
+            "lognormal": (2, lambda rng, median, sigma: median * rng.lognormvariate(0, sigma)),
+            "exp": (1, lambda rng, mean: rng.expovariate(1 / mean) if mean else 0.0),
+        }
+        if kind not in samplers or len(params) != samplers[kind][0]:
+            raise ValueError(f"Invalid latency spec: '{spec}'")
+        self._sampler, self._params = samplers[kind][1], params
+
+    def sample(self, rng):
+        return max(0.0, self._sampler(rng, *self._params)) / 1000
+
+    def __repr__(self):
+        return self.spec
+
+
+class Stats:
+    """Request counters per endpoint and status, with latency percentiles of the last responses."""
+
+    def __init__(self, window=10000):
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self.started = time.time()
+        self.counts = collections.Counter()
+        self.statuses = collections.defaultdict(collections.Counter)
+        self.latencies = collections.defaultdict(lambda: collections.deque(maxlen=self.window))
+
+    def record(self, endpoint, status, seconds):
+        self.counts[endpoint] += 1
+        self.statuses[endpoint][status] += 1
+        self.latencies[endpoint].append(seconds)
+
+    def snapshot(self):
+        elapsed = time.time() - self.started
+        endpoints = {}
+        for endpoint, count in sorted(self.counts.items()):
+            samples = sorted(self.latencies[endpoint])
+            pick = lambda q: round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1000, 2)
+            endpoints[endpoint] = {"requests": count, "per_second": round(count / elapsed, 2) if elapsed else None,
+                                   "statuses": {str(s): n for s, n in sorted(self.statuses[endpoint].items())},
+                                   "latency_ms": {"p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99)}}
+        return {"uptime_seconds": round(elapsed, 1), "total_requests": sum(self.counts.values()), "endpoints": endpoints}
+
+
+class HttpServer:
+    """
+    Minimal asyncio HTTP/1.1 server with keep-alive. Routes map (method, path) to
+    "async def handler(request) -> Response"; each route is an endpoint in the stats.
+    Pattern routes match the path with a regex and pass its named groups as request.path_params.
+    """
+
+    def __init__(self, latency=None, error_rate=0.0, seed=None):
+        self.routes = {}
+        self.pattern_routes = []
+        self.latency = latency or {}  # endpoint -> LatencyDistribution; "*" applies to the rest
+        self.error_rate = error_rate
+        self.stats = Stats()
+        self.rng = random.Random(seed)
+        self.route("GET", "/stats", "stats", self._get_stats, instrumented=False)
+        self.route("POST", "/stats/reset", "stats", self._reset_stats, instrumented=False)
+
+    def route(self, method, path, endpoint, handler, instrumented=True):
+        self.routes[(method, path)] = (endpoint, handler, instrumented)
+
+    def route_pattern(self, method, pattern, endpoint, handler):
+        self.pattern_routes.append((method, re.compile(pattern), (endpoint, handler, True)))
+
+    def _match(self, request):
+        route = self.routes.get((request.method, request.path))
+        if route is not None:
+            return route, []
+        allowed = [method for method, path in self.routes if path == request.path]
+        for method, pattern, pattern_route in self.pattern_routes:
+            match = pattern.fullmatch(request.path)
+            if match is None:
+                continue
+            if method == request.method:
+                request.path_params = match.groupdict()
+                return pattern_route, []
+            allowed.append(method)
+        return None, allowed
+
+    async def _get_stats(self, request):
+        return Response(200, self.stats.snapshot())
+
+    async def _reset_stats(self, request):
+        self.stats.reset()
+        return Response(204)
+
+    async def dispatch(self, request):
+        route, allowed = self._match(request)
+        if route is None:
+            if allowed:
+                return Response(405, {"error": "method not allowed"}, {"Allow": ", ".join(allowed)})
+            return Response(404, {"error": f"no route for {request.path}"})
+        endpoint, handler, instrumented = route
+        if not instrumented:
+            return await handler(request)
+        start = time.perf_counter()
+        delay = self.latency.get(endpoint, self.latency.get("*"))
+        if delay:
+            await asyncio.sleep(delay.sample(self.rng))
+        if self.error_rate and self.rng.random() < self.error_rate:
+            response = Response(503, {"error": "injected failure"})
+        else:
+            try:
+                response = await handler(request)
+            except Exception as e:
+                response = Response(500, {"error": str(e)})
+        self.stats.record(endpoint, response.status, time.perf_counter() - start)
+        return response
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    break  # Client closed the connection between requests
+                except asyncio.LimitOverrunError:
+                    await self._write(writer, Response(413, {"error": "headers too large"}), close=True)
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    await self._write(writer, Response(400, {"error": "bad request line"}), close=True)
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                if "chunked" in headers.get("transfer-encoding", "").lower():
+                    await self._write(writer, Response(411, {"error": "chunked bodies are not supported"}), close=True)
+                    break
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_BODY_BYTES:
+                    await self._write(writer, Response(413, {"error": "body too large"}), close=True)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                response = await self.dispatch(Request(method, target, headers, body))
+                connection = headers.get("connection", "").lower()
+                close = connection == "close" or (version == "HTTP/1.0" and connection != "keep-alive")
+                await self._write(writer, response, close, head_only=method == "HEAD")
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _write(self, writer, response, close=False, head_only=False):
+        headers = {"Date": formatdate(usegmt=True), "Content-Length": str(len(response.body)),
+                   "Connection": "close" if close else "keep-alive"}
+        headers.update(response.headers)
+        head = f"HTTP/1.1 {response.status} {REASONS.get(response.status, 'Unknown')}\r\n"
+        head += "".join(f"{name}: {value}\r\n" for name, value in headers.items()) + "\r\n"
+        writer.write(head.encode("latin-1") + (b"" if head_only else response.body))
+        await writer.drain()
+
+    async def serve(self, host, port, sock=None):
+        if sock is not None:
+            server = await asyncio.start_server(self.handle_connection, sock=sock, limit=MAX_HEADER_BYTES)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_HEADER_BYTES)
+        async with server:
+            await server.serve_forever()
+
+
+def listen_socket(host, port, reuse_port=False):
+    """
+    Returns a bound, listening TCP socket. With reuse_port, several processes can each bind the
+    same port (SO_REUSEPORT) and the kernel spreads the connections over them.
+    """
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(1024)
+    sock.setblocking(False)
+    return sock
+
+
+def parse_latency_specs(specs):
+    """Parses repeated "endpoint=spec" options (a bare spec applies to every endpoint)."""
+    latency = {}
+    for item in specs:
+        endpoint, _, spec = item.rpartition("=")
+        latency[endpoint or "*"] = LatencyDistribution(spec)
+    return latency
+
+
+def decode_jwt_claims(token):
+    """Returns the unverified claims of a compact JWT, or None if it is malformed."""
+    try:
+        payload = token.split(".")[1]
+        return json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    except (IndexError, ValueError):
+        return None
+
+
+class JwksFile:
+    """Serves a JWKS file with a content ETag; the file is re-read when its mtime changes, so keys can rotate live."""
+
+    def __init__(self, path, max_age=300):
+        self.path = path
+        self.max_age = max_age
+        self._mtime = None
+        self.body = b""
+        self.etag = None
+
+    def current(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime != self._mtime:
+            with open(self.path, "rb") as f:
+                self.body = f.read()
+            self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:32] + '"'
+            self._mtime = mtime
+        return self.body, self.etag
+
+
+class SpitfireStubs:
+    """In-memory user manager, token introspection and JWKS endpoints."""
+
+    def __init__(self, server, jwks_path, jwks_max_age=300, introspect_issuers=None, require_org_type=False):
+        self.users = {}  # (email, externalOrganizationId) -> user
+        self.user_ids = itertools.count(1)
+        self.jwks = JwksFile(jwks_path, jwks_max_age)
+        self.introspect_issuers = introspect_issuers
+        self.require_org_type = require_org_type
+        for path in ("/jwks", "/.well-known/jwks.json"):
+            server.route("GET", path, "jwks", self.get_jwks)
+        server.route("GET", "/spitfire_user_crud", "user_lookup", self.lookup_user)
+        server.route("PUT", "/spitfire_user_crud", "user_create", self.create_user)
+        server.route("POST", "/spitfire_validate_token", "token_introspect", self.introspect)
+
+    def preload(self, count, email_domain="example.com", orgs=100, user_prefix="user"):
+        """Registers {prefix}{n}@{domain} users in org-{n % orgs}, matching generate_signed_jwt.py bulk claims."""
+        for n in range(count):
+            self._add_user(f"{user_prefix}{n}@{email_domain}", f"org-{n % orgs}")
+
+    def _add_user(self, email, org_id):
+        user_id = next(self.user_ids)
+        user = {"userId": f"u-{user_id:08d}", "customerId": f"c-{org_id}", "email": email,
+                "externalOrganizationId": org_id, "externalOrganizationType": "UNITY"}
+        self.users[(email, org_id)] = user
+        return user
+
+    async def get_jwks(self, request):
+        try:
+            body, etag = self.jwks.current()
+        except OSError as e:
+            return Response(500, {"error": f"cannot read JWKS: {e}"})
+        headers = {"ETag": etag, "Cache-Control": f"public, max-age={self.jwks.max_age}"}
+        if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+            return Response(304, headers=headers)
+        return Response(200, body, headers)
+
+    async def lookup_user(self, request):
+        email, org_id = request.query.get("email"), request.query.get("externalOrganizationId")
+        if not email:
+            return Response(400, {"error": "email is required"})
+        if self.require_org_type and not request.headers.get("external-organization-type"):
+            return Response(400, {"error": "external-organization-type header is required"})
+        user = self.users.get((email, org_id or ""))
+        return Response(200, user) if user else Response(404, {"error": "user not found"})
+
+    async def create_user(self, request):
+        try:
+            data = request.json()
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            return Response(400, {"error": f"invalid JSON: {e}"})
+        email, org_id = data.get("email"), data.get("externalOrganizationId") or ""
+        if not email:
+            return Response(400, {"error": "email is required"})
+        user = self.users.get((email, org_id))
+        if user:
+            return Response(200, user)
+        return Response(201, self._add_user(email, org_id))
+
+    async def introspect(self, request):
+        try:
+            token = request.json().get("token", "")
+        except (UnicodeDecodeError, json.JSONDecodeError, AttributeError):
+            return Response(400, {"error": "invalid JSON"})
+        claims = decode_jwt_claims(token)
+        if (claims is None or claims.get("exp", 0) < time.time()
+                or (self.introspect_issuers and claims.get("iss") not in self.introspect_issuers)):
+            return Response(401, {"active": False})
+        return Response(200, dict(claims, active=True))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the JWKS, user manager and token introspection backends.")
+    parser.add_argument("--host", default="127.0.0.1", help="Listen address (default: 127.0.0.1).")
+    parser.add_argument("--port", type=int, default=8080, help="Listen port (default: 8080).")
+    parser.add_argument("--jwks", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "jwks.json"),
+                        help="JWKS file to serve (default: mock/jwks.json); changes are picked up without a restart.")
+    parser.add_argument("--jwks_max_age", type=int, default=300, help="Cache-Control max-age of the JWKS (default: 300).")
+    parser.add_argument("--latency", action="append", default=[],
+                        help="Latency as [endpoint=]spec, e.g. 'user_lookup=lognormal:25:0.4' or 'fixed:5'. "
+                             "Endpoints: jwks, user_lookup, user_create, token_introspect.")
+    parser.add_argument("--error_rate", type=float, default=0.0, help="Fraction of requests answered with 503.")
+    parser.add_argument("--preload_users", type=int, default=0,
+                        help="Register this many user{n}@example.com users up front (default: 0, every first lookup is a 404).")
+    parser.add_argument("--orgs", type=int, default=100, help="Orgs of the preloaded users (org-{n %% orgs}).")
+    parser.add_argument("--introspect_issuers", default="",
+                        help="Comma separated issuers accepted by introspection (default: any unexpired token).")
+    parser.add_argument("--require_org_type", action="store_true", default=False,
+                        help="Reject lookups without the external-organization-type header.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the latency and error sampling.")
+    args = parser.parse_args()
+
+    try:
+        server = HttpServer(latency=parse_latency_specs(args.latency), error_rate=args.error_rate, seed=args.seed)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    issuers = {issuer.strip() for issuer in args.introspect_issuers.split(",") if issuer.strip()}
+    stubs = SpitfireStubs(server, args.jwks, args.jwks_max_age, issuers or None, args.require_org_type)
+    stubs.preload(args.preload_users, orgs=args.orgs)
+
+    print(f"Stub server listening on http://{args.host}:{args.port} (latency: {server.latency or 'none'}, "
+          f"{len(stubs.users)} preloaded user(s)); counters at /stats")
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
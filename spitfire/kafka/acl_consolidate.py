@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+import logging
+import json
+import argparse
+import bisect
+
+from acl_snapshot import read_snapshot
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Bindings can only be merged when everything but the resource name is equal
+GROUP_FIELDS = ('resource_type', 'principal', 'host', 'operation', 'permission_type')
+
+
+def load_acl_input(file_path):
+    """
+    Reads an acls.json list or a JSON lines snapshot (acl_snapshot.py) and returns the definitions.
+    Snapshot entries have no action and are read as CREATE.
+    """
+    if file_path.endswith('.jsonl'):
+        return [dict(entry, action='CREATE') for entry in read_snapshot(file_path)]
+    with open(file_path, 'r') as f:
+        acl_definitions = json.load(f)
+    if not isinstance(acl_definitions, list): raise ValueError(f"JSON content in '{file_path}' must be a list of ACL objects.")
+    return acl_definitions
+
+
+def load_resource_inventory(file_path):
+    """Reads {"TOPIC": [names], "GROUP": [names], ...}, the resources that exist or are planned."""
+    with open(file_path, 'r') as f:
+        inventory = json.load(f)
+    if not isinstance(inventory, dict): raise ValueError(f"Resource inventory '{file_path}' must map resource types to name lists.")
+    return {resource_type.upper(): set(names) for resource_type, names in inventory.items()}
+
+
+class _SortedNames:
+    """Sorted resource names answering 'how many names start with p' with two bisections."""
+
+    def __init__(self, names):
+        self.names = sorted(names)
+
+    def count_prefix(self, prefix):
+        return bisect.bisect_left(self.names, prefix + '\U0010ffff') - bisect.bisect_left(self.names, prefix)
+
+
+def _is_literal_candidate(acl_data):
+    return (acl_data.get('action', 'CREATE') == 'CREATE' and acl_data.get('resource_pattern_type') == 'LITERAL'
+            and acl_data.get('resource_name') not in (None, '*') and acl_data.get('resource_type') in ('TOPIC', 'GROUP', 'TRANSACTIONAL_ID'))
+
+
+class AclConsolidator:
+    """
+    Finds groups of LITERAL bindings that differ only in the resource name and proposes
+    equivalent PREFIXED bindings.
+
+    A prefix is only proposed when every resource of that type in the inventory starting with
+    it is already granted by the group, so the rewrite gives access to no resource that exists
+    (or is planned) today. The inventory defaults to every LITERAL name in the input.
+    Resources created later under the prefix are covered too; keep inventories complete.
+
+    Names the input DELETEs anywhere are never merged nor covered by a proposed prefix, so a
+    DELETE keeps revoking what it revoked before the rewrite.
+    """
+
+    def __init__(self, inventory=None, min_group_size=2, min_prefix_length=3):
+        self.inventory = inventory
+        self.min_group_size = min_group_size
+        self.min_prefix_length = min_prefix_length
+
+    def consolidate(self, acl_definitions):
+        """
+        Returns (rewritten_definitions, proposals). Each proposal has the group 'key', the 'prefix',
+        the LITERAL names it 'replaces' and a 'reason': 'merged' (with the new PREFIXED 'binding')
+        or 'redundant' (already covered by an existing PREFIXED binding).
+        """
+        inventory = {resource_type: set(names) for resource_type, names in (self.inventory or {}).items()}
+        deleted = {}
+        for acl_data in acl_definitions:
+            if not isinstance(acl_data, dict): continue
+            if _is_literal_candidate(acl_data):
+                inventory.setdefault(acl_data['resource_type'], set()).add(acl_data['resource_name'])
+            elif acl_data.get('action') == 'DELETE' and acl_data.get('resource_name') not in (None, '*'):
+                # A deleted name counts as an existing resource no group grants, so no prefix covers it
+                inventory.setdefault(acl_data.get('resource_type'), set()).add(acl_data['resource_name'])
+                key = tuple(acl_data.get(field) for field in GROUP_FIELDS)
+                deleted.setdefault(key, set()).add(acl_data['resource_name'])
+        sorted_inventory = {resource_type: _SortedNames(names) for resource_type, names in inventory.items()}
+
+        groups, existing_prefixes = {}, {}
+        for i, acl_data in enumerate(acl_definitions):
+            if not isinstance(acl_data, dict) or acl_data.get('action', 'CREATE') != 'CREATE': continue
+            key = tuple(acl_data.get(field) for field in GROUP_FIELDS)
+            if _is_literal_candidate(acl_data):
+                if acl_data['resource_name'] in deleted.get(key, ()): continue
+                groups.setdefault(key, {}).setdefault(acl_data['resource_name'], []).append(i)
+            elif acl_data.get('resource_pattern_type') == 'PREFIXED':
+                existing_prefixes.setdefault(key, []).append(acl_data.get('resource_name') or '')
+
+        proposals, replaced, replacement_at = [], set(), {}
+        for key, names in groups.items():
+            remaining = dict(names)
+            # LITERALs already covered by a PREFIXED binding of the same group are redundant
+            for prefix in existing_prefixes.get(key, ()):
+                covered = sorted(name for name in remaining if name.startswith(prefix))
+                if covered:
+                    proposals.append({'prefix': prefix, 'key': key, 'replaces': covered, 'reason': 'redundant'})
+                    for name in covered: replaced.update(remaining.pop(name))
+            for prefix, covered in self._merge_prefixes(sorted(remaining), sorted_inventory[key[0]]):
+                binding = dict(zip(GROUP_FIELDS, key), action='CREATE', resource_name=prefix, resource_pattern_type='PREFIXED',
+                               description=f"Consolidated from {len(covered)} LITERAL bindings: {', '.join(covered)}")
+                proposals.append({'binding': binding, 'prefix': prefix, 'key': key, 'replaces': covered, 'reason': 'merged'})
+                indexes = [i for name in covered for i in remaining[name]]
+                replaced.update(indexes)
+                replacement_at[min(indexes)] = binding
+
+        rewritten = []
+        for i, acl_data in enumerate(acl_definitions):
+            if i in replacement_at: rewritten.append(replacement_at[i])
+            elif i not in replaced: rewritten.append(acl_data)
+        return rewritten, proposals
+
+    def _merge_prefixes(self, names, inventory):
+        """
+        Walks a trie of the group's names top-down and yields (prefix, covered_names) for the
+        shortest safe prefix of each branch, narrowed to the longest common prefix of what it covers.
+        """
+        trie = {}
+        for name in names:
+            node = trie
+            for char in name:
+                node = node.setdefault(char, {})
+            node[None] = name
+
+        def walk(node, prefix):
+            covered = _names_below(node)
+            safe = (len(covered) >= self.min_group_size and inventory.count_prefix(prefix) == len(covered))
+            if safe:
+                # Narrow the prefix as far as it still covers the same names
+                while None not in node and len(node) == 1:
+                    char, node = next(iter(node.items()))
+                    prefix += char
+                if len(prefix) >= self.min_prefix_length:
+                    yield prefix, covered
+                    return
+            for char, child in sorted((c, n) for c, n in node.items() if c is not None):
+                yield from walk(child, prefix + char)
+
+        yield from walk(trie, '')
+
+
+def _names_below(node):
+    names, stack = [], [node]
+    while stack:
+        current = stack.pop()
+        for char, child in current.items():
+            if char is None: names.append(child)
+            else: stack.append(child)
+    return sorted(names)
+
+
+# --- Main Execution ---
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Collapse LITERAL Kafka ACLs into equivalent PREFIXED ACLs.")
+    parser.add_argument("--acl_file", required=True, help="ACL definitions (acls.json) or a JSON lines snapshot (.jsonl).")
+    parser.add_argument("--output", help="Write the rewritten ACL definitions to this JSON file (default: only report).")
+    parser.add_argument("--resource_inventory",
+                        help="JSON file mapping resource types to every existing or planned resource name, e.g. "
+                             "{\"TOPIC\": [...], \"GROUP\": [...]}. Defaults to the names in --acl_file.")
+    parser.add_argument("--min_group_size", type=int, default=2, help="Minimum LITERAL bindings merged into one PREFIXED binding (default: 2).")
+    parser.add_argument("--min_prefix_length", type=int, default=3, help="Shortest prefix proposed (default: 3).")
+
+    args = parser.parse_args()
+
+    try:
+        acl_definitions = load_acl_input(args.acl_file)
+        inventory = load_resource_inventory(args.resource_inventory) if args.resource_inventory else None
+    except (OSError, ValueError) as e:
+        logger.error(f"Error reading input: {e}")
+        sys.exit(1)
+    if inventory is None:
+        logger.warning("No --resource_inventory given; only the resource names in the ACL file are checked.")
+
+    consolidator = AclConsolidator(inventory, min_group_size=args.min_group_size, min_prefix_length=args.min_prefix_length)
+    rewritten, proposals = consolidator.consolidate(acl_definitions)
+
+    for proposal in proposals:
+        resource_type, principal, host, operation, permission_type = proposal['key']
+        print(f"  {proposal['reason']:<9} {permission_type} {principal} {operation} {resource_type}:{proposal['prefix']}* (PREFIXED) "
+              f"host={host} <- {len(proposal['replaces'])} LITERAL: {', '.join(proposal['replaces'])}")
+    logger.info(f"{len(acl_definitions)} definition(s) -> {len(rewritten)} after consolidation ({len(proposals)} proposal(s)).")
+
+    if args.output:
+        try:
+            with open(args.output, 'w') as f: json.dump(rewritten, f, indent=2)
+            logger.info(f"Wrote rewritten ACL definitions to '{args.output}'.")
+        except OSError as e:
+            logger.error(f"Error writing '{args.output}': {e}")
+            sys.exit(1)
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+import logging
+import json
+import argparse
+import concurrent.futures
+import threading
+import time
+
+from kafka_acls import (GcpOAuthTokenProvider, KafkaACLManager, build_admin_config, expand_templates,
+                        iter_acl_definitions, load_acl_definitions, process_acls_batched, reconcile_acls)
+
+logger = logging.getLogger(__name__)
+
+# Example inventory:
+# [
+#   {"name": "europe-west1", "bootstrap_servers": "bootstrap.eu.example.com:9092",
+#    "config": ["ssl.ca.location=/etc/kafka/eu-ca.pem"]},
+#   {"name": "us-central1", "bootstrap_servers": "bootstrap.us.example.com:9092",
+#    "config": {"request.timeout.ms": "30000"}}
+# ]
+
+
+def load_cluster_inventory(file_path):
+    """
+    Reads the cluster inventory: a list of {"name", "bootstrap_servers", "config"} objects, where
+    "config" holds per-cluster 'prop=val' overrides as a list or a dict. Raises ValueError if invalid.
+    """
+    with open(file_path, 'r') as f:
+        inventory = json.load(f)
+    if not isinstance(inventory, list) or not inventory: raise ValueError(f"Cluster inventory '{file_path}' must be a non-empty list.")
+    clusters, names = [], set()
+    for i, cluster in enumerate(inventory):
+        if not isinstance(cluster, dict) or not cluster.get('name') or not cluster.get('bootstrap_servers'):
+            raise ValueError(f"Cluster #{i+1} in '{file_path}' needs 'name' and 'bootstrap_servers'.")
+        if cluster['name'] in names: raise ValueError(f"Duplicate cluster name '{cluster['name']}' in '{file_path}'.")
+        names.add(cluster['name'])
+        config = cluster.get('config', [])
+        if isinstance(config, dict): config = [f"{key}={value}" for key, value in config.items()]
+        clusters.append({'name': cluster['name'], 'bootstrap_servers': cluster['bootstrap_servers'], 'config': list(config)})
+    return clusters
+
+
+class ClusterPool:
+    """
+    One long-lived KafkaACLManager (and AdminClient) per cluster, sharing one OAUTHBEARER
+    token provider so a single cached token serves every cluster of the same identity.
+    """
+
+    def __init__(self, clusters, common_config=(), token_provider=None):
+        self.token_provider = token_provider or GcpOAuthTokenProvider()
+        self.managers = {}
+        self.errors = {}
+        for cluster in clusters:
+            try:
+                # Per-cluster overrides come last and win over the common -X settings
+                admin_conf = build_admin_config(cluster['bootstrap_servers'], list(common_config) + cluster['config'])
+                self.managers[cluster['name']] = KafkaACLManager(admin_conf, token_provider=self.token_provider)
+            except Exception as e:
+                logger.error(f"[{cluster['name']}] AdminClient initialization failed: {e}")
+                self.errors[cluster['name']] = str(e)
+
+    def run(self, apply_fn, max_workers=None):
+        """
+        Runs apply_fn(name, manager) -> bool for every cluster concurrently.
+        Returns {name: {'success', 'elapsed_seconds', 'error'}} including clusters that failed to initialize.
+        """
+        report = {name: {'success': False, 'elapsed_seconds': 0.0, 'error': error} for name, error in self.errors.items()}
+
+        def task(name, manager):
+            threading.current_thread().name = name
+            start = time.monotonic()
+            try:
+                ok, error = bool(apply_fn(name, manager)), None
+            except Exception as e:
+                logger.exception(f"Unexpected error while applying ACLs")
+                ok, error = False, str(e)
+            return {'success': ok, 'elapsed_seconds': round(time.monotonic() - start, 2),
+                    'error': error if error or ok else 'Some operations failed; see the log.'}
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers or max(len(self.managers), 1)) as executor:
+            futures = {executor.submit(task, name, manager): name for name, manager in self.managers.items()}
+            for future in concurrent.futures.as_completed(futures):
+                report[futures[future]] = future.result()
+        return dict(sorted(report.items()))
+
+
+def print_report(report, elapsed):
+    print(f"\n{'Cluster':<30} {'Result':<8} {'Seconds':>8}  Error")
+    for name, result in report.items():
+        print(f"{name:<30} {'OK' if result['success'] else 'FAILED':<8} {result['elapsed_seconds']:>8.1f}  {result['error'] or ''}")
+    slowest = max((r['elapsed_seconds'] for r in report.values()), default=0.0)
+    print(f"\n{sum(r['success'] for r in report.values())}/{len(report)} cluster(s) succeeded in {elapsed:.1f}s "
+          f"(slowest cluster {slowest:.1f}s, serial sum {sum(r['elapsed_seconds'] for r in report.values()):.1f}s).")
+
+
+# --- Main Execution ---
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Apply the same Kafka ACL definitions to several clusters concurrently.")
+    parser.add_argument("--clusters", required=True, help="JSON cluster inventory (name, bootstrap_servers, config overrides).")
+    parser.add_argument("--acl_file", help="Path to the JSON file containing ACL definitions.")
+    parser.add_argument("--acl_template", help="Path to a file of ACL matrix templates, instead of --acl_file.")
+    parser.add_argument("--only", default="", help="Comma separated list of cluster names to target (default: all).")
+    parser.add_argument("-X", "--config", action='append', default=[],
+                        help="Client configuration properties ('prop=val') applied to every cluster before its own overrides.")
+    parser.add_argument("--batch_size", type=int, default=500, help="Bindings per create_acls/delete_acls request (default: 500).")
+    parser.add_argument("--max_parallel", type=int, default=0, help="Clusters processed at once (default: all).")
+    parser.add_argument("--reconcile", action='store_true', default=False,
+                        help="Reconcile every cluster to the CREATE definitions (see kafka_acls.py --reconcile).")
+    parser.add_argument("--prune_all", action='store_true', default=False, help="With --reconcile, prune extra ACLs of every principal.")
+    parser.add_argument("--dry_run", action='store_true', default=False, help="With --reconcile, only print the planned changes.")
+    parser.add_argument("--token_refresh_margin", type=int, default=300,
+                        help="Refresh the shared GCP OAuth token this many seconds before it expires (default: 300).")
+    parser.add_argument("--report", help="Write the per-cluster results as JSON to this file.")
+
+    args = parser.parse_args()
+    # Prefix every log line with the cluster (thread) it belongs to
+    for handler in logging.getLogger().handlers:
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - [%(threadName)s] %(message)s'))
+
+    if bool(args.acl_file) == bool(args.acl_template):
+        logger.error("Provide exactly one of --acl_file or --acl_template.")
+        sys.exit(1)
+    try:
+        clusters = load_cluster_inventory(args.clusters)
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not load cluster inventory: {e}")
+        sys.exit(1)
+    only = {name.strip() for name in args.only.split(',') if name.strip()}
+    unknown = only - {cluster['name'] for cluster in clusters}
+    if unknown:
+        logger.error(f"Unknown cluster(s) in --only: {sorted(unknown)}")
+        sys.exit(1)
+    clusters = [cluster for cluster in clusters if not only or cluster['name'] in only]
+
+    # Parse once; every cluster reads the same definitions
+    if args.acl_template:
+        try:
+            acl_definitions = list(expand_templates(iter_acl_definitions(args.acl_template)))
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not expand ACL templates from '{args.acl_template}': {e}")
+            sys.exit(1)
+    else:
+        acl_definitions = load_acl_definitions(args.acl_file)
+        if acl_definitions is None: sys.exit(1)
+    logger.info(f"Applying {len(acl_definitions)} ACL definition(s) to {len(clusters)} cluster(s).")
+
+    def apply(name, manager):
+        if args.reconcile:
+            return reconcile_acls(manager, acl_definitions, dry_run=args.dry_run, prune_all=args.prune_all, batch_size=args.batch_size)
+        return process_acls_batched(manager, acl_definitions, args.batch_size)
+
+    start = time.monotonic()
+    pool = ClusterPool(clusters, common_config=args.config,
+                       token_provider=GcpOAuthTokenProvider(refresh_margin_seconds=args.token_refresh_margin))
+    report = pool.run(apply, max_workers=args.max_parallel or None)
+    elapsed = time.monotonic() - start
+
+    print_report(report, elapsed)
+    logger.info(f"OAUTHBEARER token provider: {pool.token_provider.stats()}")
+    if args.report:
+        try:
+            with open(args.report, 'w') as f: json.dump({'elapsed_seconds': round(elapsed, 2), 'clusters': report}, f, indent=2)
+        except OSError as e:
+            logger.error(f"Could not write report '{args.report}': {e}")
+    sys.exit(0 if all(result['success'] for result in report.values()) else 1)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import logging
+import json
+import hashlib
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Fields that identify what a definition does; the description is free text and not part of it
+HASHED_FIELDS = ('action', 'resource_type', 'resource_name', 'resource_pattern_type',
+                 'principal', 'host', 'operation', 'permission_type')
+
+
+def definition_hash(acl_data):
+    """Content hash of an ACL definition: SHA-256 of its canonical JSON, description excluded."""
+    canonical = json.dumps([acl_data.get(field) for field in HASHED_FIELDS], separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def file_digest(file_path, read_size=1 << 20):
+    """SHA-256 of a file's content, read in blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(read_size), b''): digest.update(block)
+    return digest.hexdigest()
+
+
+class AclJournal:
+    """
+    Append-only journal of applied ACL definitions, one 'source digest:position:content hash'
+    entry per line.
+
+    Entries are appended and fsynced when a batch completes, which is the checkpoint a rerun
+    resumes from. Only a rerun of the file the journal last recorded skips work: a definition is
+    skipped when that run recorded it at the same position of a file with the same digest. A
+    definition repeated in the file (CREATE X, DELETE X, CREATE X), or applied again by a later
+    file after another file ran in between, is applied again. Delete the journal to apply the
+    same file again from the top.
+    """
+
+    def __init__(self, file_path, source_digest):
+        self.file_path = file_path
+        self.source_digest = source_digest
+        # Entries of earlier runs; those recorded by this run are never consulted
+        self.applied = frozenset()
+        self._file = None
+        self._lock = threading.Lock()
+
+    def open(self):
+        """Loads the existing entries and opens the journal for appending. Returns self."""
+        if os.path.exists(self.file_path):
+            # Only the trailing entries of the last recorded source file are a checkpoint
+            block_digest, block = None, set()
+            with open(self.file_path, 'r') as f:
+                for line in f:
+                    parts = line.strip().split(':')
+                    # A run killed mid-write can leave a torn last line; it is simply not a checkpoint
+                    if not (len(parts) == 3 and len(parts[0]) == 64 and parts[1].isdigit() and len(parts[2]) == 64): continue
+                    if parts[0] != block_digest: block_digest, block = parts[0], set()
+                    block.add(line.strip())
+            self.applied = frozenset(block) if block_digest == self.source_digest else frozenset()
+            logger.info(f"Journal '{self.file_path}': {len(self.applied)} definition(s) of this file already applied will be skipped.")
+        self._file = open(self.file_path, 'a')
+        return self
+
+    def key(self, position, acl_data):
+        """Journal entry of the definition at a position (0-based) of the source file."""
+        return f"{self.source_digest}:{position}:{definition_hash(acl_data)}"
+
+    def is_applied(self, key):
+        return key in self.applied
+
+    def record(self, keys):
+        """Appends the entries of successfully applied definitions and makes them durable."""
+        if not keys: return
+        with self._lock:
+            self._file.write(''.join(k + '\n' for k in keys))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file: self._file.close(); self._file = None
+
+
+class RateLimiter:
+    """Token bucket limiting ACL operations per second; acquire(n) blocks until n operations may start."""
+
+    def __init__(self, ops_per_second):
+        self.ops_per_second = float(ops_per_second)
+        self._tokens = self.ops_per_second
+        self._last = time.monotonic()
+
+    def acquire(self, count=1):
+        # A batch larger than one second of budget waits for the whole batch's worth of tokens
+        capacity = max(self.ops_per_second, count)
+        while True:
+            now = time.monotonic()
+            self._tokens = min(capacity, self._tokens + (now - self._last) * self.ops_per_second)
+            self._last = now
+            if self._tokens >= count:
+                self._tokens -= count
+                return
+            time.sleep((count - self._tokens) / self.ops_per_second)
+
+
+class ProgressReporter:
+    """Logs progress and throughput at most every interval_seconds."""
+
+    def __init__(self, interval_seconds=30, total=None):
+        self.interval_seconds = interval_seconds
+        self.total = total
+        self.start = time.monotonic()
+        self._last_report = self.start
+        self._last_done = 0
+
+    def maybe_report(self, counts, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_report < self.interval_seconds: return
+        done = counts.get('succeeded', 0) + counts.get('failed', 0) + counts.get('skipped', 0)
+        elapsed = now - self.start
+        window_rate = (done - self._last_done) / (now - self._last_report) if now > self._last_report else 0.0
+        overall_rate = done / elapsed if elapsed > 0 else 0.0
+        progress = f"{done}/{self.total}" if self.total else f"{done}"
+        logger.info(f"Progress: {progress} definition(s) in {elapsed:.0f}s ({counts.get('succeeded', 0)} succeeded, "
+                    f"{counts.get('failed', 0)} failed, {counts.get('skipped', 0)} skipped from journal); "
+                    f"{window_rate:.0f} ops/s now, {overall_rate:.0f} ops/s overall.")
+        self._last_report, self._last_done = now, done
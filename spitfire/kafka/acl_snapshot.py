@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+import logging
+import json
+import argparse
+import time
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Fields of one snapshot line, same names as the acls.json definitions
+SNAPSHOT_FIELDS = ('resource_type', 'resource_name', 'resource_pattern_type', 'principal', 'host', 'operation', 'permission_type')
+
+# Operations that also grant other operations (Kafka authorizer semantics)
+IMPLIED_OPERATIONS = {
+    'DESCRIBE': {'READ', 'WRITE', 'DELETE', 'ALTER'},
+    'DESCRIBE_CONFIGS': {'ALTER_CONFIGS'},
+}
+
+
+def write_snapshot(acl_definitions, file_path):
+    """
+    Writes ACL definitions to a JSON lines snapshot, one compact object per line.
+    Returns the number of ACLs written, or None on failure.
+    """
+    try:
+        count = 0
+        with open(file_path, 'w') as f:
+            for acl_data in acl_definitions:
+                f.write(json.dumps({field: acl_data.get(field) for field in SNAPSHOT_FIELDS}, separators=(',', ':')) + '\n')
+                count += 1
+        logger.info(f"Wrote {count} ACL(s) to snapshot '{file_path}'.")
+        return count
+    except Exception as e:
+        logger.error(f"Error writing snapshot '{file_path}': {e}")
+        return None
+
+
+def read_snapshot(file_path):
+    """Yields the ACL entries of a snapshot file."""
+    with open(file_path, 'r') as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line: continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid snapshot line {line_number} in '{file_path}': {e}")
+
+
+class _PrefixTrie:
+    """Character trie of PREFIXED resource names; a lookup walks the name once."""
+
+    def __init__(self):
+        self.root = {}
+
+    def add(self, prefix, entry_id):
+        node = self.root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node.setdefault(None, []).append(entry_id)
+
+    def matching(self, name):
+        """Returns the ids stored under every prefix of name."""
+        ids = []
+        node = self.root
+        ids.extend(node.get(None, ()))
+        for char in name:
+            node = node.get(char)
+            if node is None: break
+            ids.extend(node.get(None, ()))
+        return ids
+
+
+class AclSnapshotIndex:
+    """
+    In-memory index of an ACL snapshot for offline audits.
+
+    ACLs are indexed by principal and operation, LITERAL names (including '*') by a hash
+    lookup on (resource_type, name) and PREFIXED names by one prefix trie per resource type,
+    so resource queries cost O(len(name)) instead of a scan of every ACL.
+    """
+
+    def __init__(self, entries=()):
+        self.entries = []
+        self.by_principal = {}
+        self.by_operation = {}
+        self.literal = {}
+        self.prefixed = {}
+        for entry in entries: self.add(entry)
+
+    @classmethod
+    def load(cls, file_path):
+        start = time.perf_counter()
+        index = cls(read_snapshot(file_path))
+        logger.info(f"Indexed {len(index.entries)} ACL(s) from '{file_path}' in {(time.perf_counter() - start) * 1000:.1f} ms.")
+        return index
+
+    def add(self, entry):
+        entry_id = len(self.entries)
+        self.entries.append(entry)
+        self.by_principal.setdefault(entry['principal'], []).append(entry_id)
+        self.by_operation.setdefault(entry['operation'], []).append(entry_id)
+        resource_type, name = entry['resource_type'], entry['resource_name'] or ''
+        if entry['resource_pattern_type'] == 'PREFIXED':
+            self.prefixed.setdefault(resource_type, _PrefixTrie()).add(name, entry_id)
+        else:
+            self.literal.setdefault((resource_type, name), []).append(entry_id)
+
+    def for_principal(self, principal, operation=None):
+        """
+        Returns the ACLs granted or denied to a principal (including 'User:*' wildcard ACLs),
+        optionally only those for an operation (or ALL).
+        """
+        ids = set(self.by_principal.get(principal, ()))
+        if principal != 'User:*': ids.update(self.by_principal.get('User:*', ()))
+        if operation:
+            ids &= set(self.by_operation.get(operation, ())) | set(self.by_operation.get('ALL', ()))
+        return [self.entries[i] for i in sorted(ids)]
+
+    def for_resource(self, resource_type, resource_name):
+        """Returns the ACLs whose pattern matches a concrete resource: exact and '*' LITERALs and matching PREFIXED."""
+        return [self.entries[i] for i in sorted(self._resource_ids(resource_type, resource_name))]
+
+    def who_can(self, operation, resource_type, resource_name):
+        """
+        Returns {principal: [ALLOW entries]} of the principals allowed to run an operation on a resource.
+        ALL and implying operations grant too; a DENY of the operation or ALL for the principal (or 'User:*')
+        wins. As in Kafka's authorizer, implication only applies to ALLOW.
+        """
+        deny_operations = {operation, 'ALL'}
+        allow_operations = deny_operations | IMPLIED_OPERATIONS.get(operation, set())
+        allowed, denied = {}, set()
+        for i in self._resource_ids(resource_type, resource_name):
+            entry = self.entries[i]
+            if entry['permission_type'] == 'DENY' and entry['operation'] in deny_operations: denied.add(entry['principal'])
+            elif entry['permission_type'] == 'ALLOW' and entry['operation'] in allow_operations:
+                allowed.setdefault(entry['principal'], []).append(entry)
+        if 'User:*' in denied: return {}
+        return {principal: entries for principal, entries in sorted(allowed.items()) if principal not in denied}
+
+    def _resource_ids(self, resource_type, resource_name):
+        ids = set()
+        # ANY queries every resource type, as in a describe_acls filter
+        for res_type in (self._resource_types() if resource_type == 'ANY' else (resource_type,)):
+            ids.update(self.literal.get((res_type, resource_name), ()))
+            if resource_name != '*': ids.update(self.literal.get((res_type, '*'), ()))
+            trie = self.prefixed.get(res_type)
+            if trie is not None: ids.update(trie.matching(resource_name))
+        return ids
+
+    def _resource_types(self):
+        return {res_type for res_type, _ in self.literal} | set(self.prefixed)
+
+
+def _print_entries(entries):
+    if not entries: print("  No ACLs found."); return
+    for entry in entries:
+        print(f"  {entry['permission_type']:<5} {entry['principal']} {entry['operation']} {entry['resource_type']}:"
+              f"{entry['resource_name']} ({entry['resource_pattern_type']}) host={entry['host']}")
+
+
+# --- Main Execution ---
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Query a Kafka ACL snapshot offline (see kafka_acls.py --export_snapshot).")
+    parser.add_argument("--snapshot", required=True, help="Path to the JSON lines ACL snapshot.")
+    parser.add_argument("--principal", help="List the ACLs of this principal (e.g. 'User:testuser1').")
+    parser.add_argument("--operation", help="With --principal, only list the ACLs for this operation (or ALL).")
+    parser.add_argument("--resource_type", help="Resource type of the resource query (e.g. TOPIC, GROUP).")
+    parser.add_argument("--resource_name", help="Resource name of the resource query.")
+    parser.add_argument("--who_can", metavar="OPERATION", help="List the principals allowed to run OPERATION on the resource.")
+
+    args = parser.parse_args()
+    if not (args.principal or (args.resource_type and args.resource_name)):
+        logger.error("Provide --principal or --resource_type and --resource_name.")
+        sys.exit(1)
+
+    try:
+        index = AclSnapshotIndex.load(args.snapshot)
+    except (OSError, ValueError, KeyError) as e:
+        logger.error(f"Could not load snapshot '{args.snapshot}': {e}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    if args.principal:
+        print(f"ACLs of {args.principal}:")
+        _print_entries(index.for_principal(args.principal, args.operation.upper() if args.operation else None))
+    if args.resource_type and args.resource_name:
+        resource_type = args.resource_type.upper()
+        if args.who_can:
+            allowed = index.who_can(args.who_can.upper(), resource_type, args.resource_name)
+            print(f"Principals allowed to {args.who_can.upper()} {resource_type}:{args.resource_name}:")
+            if not allowed: print("  None.")
+            for principal, entries in allowed.items():
+                print(f"  {principal} via {', '.join(e['operation'] + ' ' + e['resource_name'] + ' (' + e['resource_pattern_type'] + ')' for e in entries)}")
+        else:
+            print(f"ACLs matching {resource_type}:{args.resource_name}:")
+            _print_entries(index.for_resource(resource_type, args.resource_name))
+    logger.info(f"Query answered in {(time.perf_counter() - start) * 1000:.2f} ms.")
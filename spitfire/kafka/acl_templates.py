@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+import logging
+import json
+import argparse
+import itertools
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Example template (a file holds a JSON list or NDJSON of these):
+# {
+#   "description": "Order service",
+#   "action": "CREATE",
+#   "principals": ["User:orders-api", "User:orders-worker"],
+#   "resources": [
+#     {"resource_type": "TOPIC", "resource_name": "orders-", "resource_pattern_type": "PREFIXED"},
+#     {"resource_type": "GROUP", "resource_name": "order-consumers", "resource_pattern_type": "LITERAL"}
+#   ],
+#   "operations": ["READ", "DESCRIBE"],
+#   "hosts": ["*"],
+#   "permission_type": "ALLOW"
+# }
+REQUIRED_TEMPLATE_FIELDS = ('principals', 'resources', 'operations')
+
+
+def _as_list(value):
+    return value if isinstance(value, list) else [value]
+
+
+def expand_template(template, index=0):
+    """
+    Lazily yields the acls.json definitions of one template: principals x resources x operations x hosts.
+    Raises ValueError if the template is incomplete.
+    """
+    if not isinstance(template, dict): raise ValueError(f"Template #{index+1} is not a JSON object.")
+    missing = [field for field in REQUIRED_TEMPLATE_FIELDS if not template.get(field)]
+    if missing: raise ValueError(f"Template #{index+1} ({template.get('description', '')}) is missing {missing}.")
+    action = template.get('action', 'CREATE')
+    if action not in ('CREATE', 'DELETE'): raise ValueError(f"Template #{index+1} action must be CREATE or DELETE, got '{action}'.")
+    resources = _as_list(template['resources'])
+    for resource in resources:
+        if not isinstance(resource, dict) or not resource.get('resource_type'):
+            raise ValueError(f"Template #{index+1} has a resource without 'resource_type': {resource}")
+    description = template.get('description', f'Template #{index+1}')
+    permission_type = template.get('permission_type', 'ALLOW')
+    hosts = _as_list(template.get('hosts', template.get('host', '*')))
+
+    for principal, resource, operation, host in itertools.product(_as_list(template['principals']), resources,
+                                                                  _as_list(template['operations']), hosts):
+        resource_name = resource.get('resource_name')
+        yield {'action': action,
+               'description': f"{description} [{principal} {operation} {resource['resource_type']}:{resource_name}]",
+               'resource_type': resource['resource_type'], 'resource_name': resource_name,
+               'resource_pattern_type': resource.get('resource_pattern_type', 'LITERAL'),
+               'principal': principal, 'host': host, 'operation': operation, 'permission_type': permission_type}
+
+
+def expand_templates(templates, stats=None):
+    """
+    Lazily expands an iterable of templates into definitions for the batch/streaming path.
+    Duplicates (same action and binding, within or across templates) are yielded once; only
+    the keys of the bindings already yielded are kept in memory.
+    """
+    seen = set()
+    stats = stats if stats is not None else {}
+    stats.update(templates=0, expanded=0, duplicates=0)
+    for index, template in enumerate(templates):
+        stats['templates'] += 1
+        for acl_data in expand_template(template, index):
+            key = (acl_data['action'], acl_data['resource_type'], acl_data['resource_name'], acl_data['resource_pattern_type'],
+                   acl_data['principal'], acl_data['host'], acl_data['operation'], acl_data['permission_type'])
+            if key in seen: stats['duplicates'] += 1; continue
+            seen.add(key)
+            stats['expanded'] += 1
+            yield acl_data
+
+
+# --- Main Execution ---
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Expand Kafka ACL matrix templates into ACL definitions (see kafka_acls.py --acl_template).")
+    parser.add_argument("--template", required=True, help="JSON file with a list of ACL templates.")
+    parser.add_argument("--output", help="Write the expanded definitions as NDJSON to this file (default: only count them).")
+
+    args = parser.parse_args()
+    try:
+        with open(args.template, 'r') as f: templates = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.error(f"Error reading template file '{args.template}': {e}")
+        sys.exit(1)
+
+    stats = {}
+    try:
+        out = open(args.output, 'w') if args.output else None
+        for acl_data in expand_templates(_as_list(templates), stats):
+            if out: out.write(json.dumps(acl_data, separators=(',', ':')) + '\n')
+        if out: out.close()
+    except (OSError, ValueError) as e:
+        logger.error(f"Template expansion failed: {e}")
+        sys.exit(1)
+    logger.info(f"{stats['templates']} template(s) expanded to {stats['expanded']} ACL definition(s), "
+                f"{stats['duplicates']} duplicate(s) dropped.")
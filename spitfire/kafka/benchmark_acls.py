@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+import logging
+import json
+import argparse
+import time
+
+from fake_admin import FakeAdminClient
+from kafka_acls import (KafkaACLManager, process_acls_batched, process_acls_serial, process_acls_streaming,
+                        reconcile_acls)
+
+logger = logging.getLogger(__name__)
+
+MODES = ('serial', 'batched', 'streaming', 'reconcile')
+
+
+def generate_definitions(count, principals=50):
+    """Generates count distinct CREATE definitions spread over topics and groups."""
+    for i in range(count):
+        resource_type = 'TOPIC' if i % 4 else 'GROUP'
+        yield {'action': 'CREATE', 'description': f'bench #{i}', 'resource_type': resource_type,
+               'resource_name': f'bench-{resource_type.lower()}-{i}', 'resource_pattern_type': 'LITERAL',
+               'principal': f'User:bench-{i % principals}', 'host': '*',
+               'operation': 'READ' if i % 2 else 'WRITE', 'permission_type': 'ALLOW'}
+
+
+def run_mode(mode, count, args):
+    """Applies count definitions in one mode against a fresh FakeAdminClient. Returns the result row."""
+    admin = FakeAdminClient(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, per_item_us=args.per_item_us,
+                            failure_rate=args.failure_rate, item_failure_rate=args.item_failure_rate, seed=args.seed)
+    manager = KafkaACLManager(None, admin_client=admin)
+    definitions = list(generate_definitions(count)) if mode != 'streaming' else generate_definitions(count)
+    start = time.perf_counter()
+    if mode == 'serial': ok = process_acls_serial(manager, definitions)
+    elif mode == 'batched': ok = process_acls_batched(manager, definitions, args.batch_size)
+    elif mode == 'streaming': ok = process_acls_streaming(manager, definitions, batch_size=args.batch_size,
+                                                          max_in_flight=args.max_in_flight, progress_interval=3600)
+    else:
+        # Converge first, then time the rerun that should find nothing to do
+        reconcile_acls(manager, definitions, batch_size=args.batch_size)
+        admin.requests = dict.fromkeys(admin.requests, 0)
+        start = time.perf_counter()
+        ok = reconcile_acls(manager, definitions, batch_size=args.batch_size)
+    elapsed = time.perf_counter() - start
+    admin.shutdown()
+    return {'mode': mode, 'definitions': count, 'seconds': round(elapsed, 3),
+            'ops_per_second': round(count / elapsed) if elapsed else None, 'requests': sum(admin.requests.values()),
+            'acls_stored': len(admin.acls), 'success': ok}
+
+
+# --- Main Execution ---
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark KafkaACLManager throughput against an in-memory fake AdminClient.")
+    parser.add_argument("--sizes", default="100,1000,10000,100000", help="Comma separated numbers of ACL definitions.")
+    parser.add_argument("--modes", default=",".join(MODES), help=f"Comma separated modes out of {MODES}.")
+    parser.add_argument("--latency_ms", type=float, default=2.0, help="Round-trip latency of one admin request (default: 2).")
+    parser.add_argument("--jitter_ms", type=float, default=0.0, help="Random extra latency per request.")
+    parser.add_argument("--per_item_us", type=float, default=5.0, help="Broker cost per binding in a request (default: 5us).")
+    parser.add_argument("--failure_rate", type=float, default=0.0, help="Fraction of requests failing with a timeout.")
+    parser.add_argument("--item_failure_rate", type=float, default=0.0, help="Fraction of single bindings failing.")
+    parser.add_argument("--batch_size", type=int, default=500, help="Bindings per request in the batched modes.")
+    parser.add_argument("--max_in_flight", type=int, default=4, help="Outstanding batches in streaming mode.")
+    parser.add_argument("--serial_max", type=int, default=10000, help="Skip the serial mode above this many definitions.")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the latency jitter and failure injection.")
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+
+    args = parser.parse_args()
+    # Per-definition logs (and injected failures) would dominate the measurement and the output
+    logging.getLogger('kafka_acls').setLevel(logging.CRITICAL)
+    logging.getLogger('acl_journal').setLevel(logging.CRITICAL)
+
+    try:
+        sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    except ValueError:
+        logger.error(f"Invalid --sizes: {args.sizes}")
+        sys.exit(1)
+    modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+    if any(mode not in MODES for mode in modes):
+        logger.error(f"Invalid --modes: {args.modes}. Valid modes: {MODES}")
+        sys.exit(1)
+
+    results = []
+    print(f"{'Mode':<10} {'Definitions':>11} {'Seconds':>9} {'Ops/s':>9} {'Requests':>9}  OK")
+    for count in sizes:
+        for mode in modes:
+            if mode == 'serial' and count > args.serial_max: continue
+            row = run_mode(mode, count, args)
+            results.append(row)
+            print(f"{row['mode']:<10} {row['definitions']:>11} {row['seconds']:>9.2f} {row['ops_per_second'] or 0:>9} "
+                  f"{row['requests']:>9}  {row['success']}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'settings': vars(args), 'results': results}, f, indent=2)
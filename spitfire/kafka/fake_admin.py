@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import random
+import threading
+import time
+import concurrent.futures
+
+from confluent_kafka import KafkaException, KafkaError
+from confluent_kafka.admin import (AclBinding, AclBindingFilter, ResourceType, ResourcePatternType,
+                                   AclOperation, AclPermissionType)
+
+
+def binding_matches(binding, acl_filter):
+    """
+    Returns True if an AclBinding matches an AclBindingFilter, following the broker's rules:
+    ANY/None match everything; MATCH matches the LITERAL name, LITERAL '*' and every PREFIXED
+    pattern that is a prefix of the name; ANY pattern type with a name matches that exact name
+    under any pattern type.
+    """
+    if acl_filter.restype != ResourceType.ANY and binding.restype != acl_filter.restype: return False
+    if acl_filter.principal is not None and binding.principal != acl_filter.principal: return False
+    if acl_filter.host is not None and binding.host != acl_filter.host: return False
+    if acl_filter.operation != AclOperation.ANY and binding.operation != acl_filter.operation: return False
+    if acl_filter.permission_type != AclPermissionType.ANY and binding.permission_type != acl_filter.permission_type: return False
+
+    pattern_type, name = acl_filter.resource_pattern_type, acl_filter.name
+    if pattern_type == ResourcePatternType.MATCH:
+        if name is None: return True
+        if binding.resource_pattern_type == ResourcePatternType.LITERAL: return binding.name in (name, '*')
+        if binding.resource_pattern_type == ResourcePatternType.PREFIXED: return name.startswith(binding.name)
+        return False
+    if pattern_type != ResourcePatternType.ANY and binding.resource_pattern_type != pattern_type: return False
+    return name is None or binding.name == name
+
+
+def _exact_binding(acl_filter):
+    """The only binding a fully specified LITERAL/PREFIXED filter can match, so deletes skip the scan; None otherwise."""
+    if (acl_filter.restype == ResourceType.ANY or acl_filter.name is None or acl_filter.principal is None or acl_filter.host is None
+            or acl_filter.resource_pattern_type not in (ResourcePatternType.LITERAL, ResourcePatternType.PREFIXED)
+            or acl_filter.operation == AclOperation.ANY or acl_filter.permission_type == AclPermissionType.ANY):
+        return None
+    return AclBinding(acl_filter.restype, acl_filter.name, acl_filter.resource_pattern_type, acl_filter.principal,
+                      acl_filter.host, acl_filter.operation, acl_filter.permission_type)
+
+
+class FakeAdminClient:
+    """
+    In-memory stand-in for confluent_kafka.admin.AdminClient's ACL API, for offline tests and benchmarks.
+
+    create_acls/delete_acls return {binding_or_filter: Future} and describe_acls returns a Future,
+    like the real client. Each request completes on a worker thread after latency_ms (plus
+    per_item_us per binding and random jitter). failure_rate fails whole requests with a timeout;
+    item_failure_rate fails single bindings as a broker-side policy violation would.
+    """
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, per_item_us=0.0, failure_rate=0.0, item_failure_rate=0.0,
+                 max_workers=16, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.per_item_us = per_item_us
+        self.failure_rate = failure_rate
+        self.item_failure_rate = item_failure_rate
+        self.acls = set()
+        self.requests = {'create_acls': 0, 'describe_acls': 0, 'delete_acls': 0}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fake-broker")
+
+    def create_acls(self, acls, request_timeout=None, **kwargs):
+        self._check_list(acls, AclBinding)
+        futures = {binding: concurrent.futures.Future() for binding in acls}
+
+        def run():
+            for binding, future in futures.items():
+                if self._item_fails(): future.set_exception(KafkaException(KafkaError(KafkaError.POLICY_VIOLATION, "Injected failure")))
+                else:
+                    with self._lock: self.acls.add(binding)
+                    future.set_result(None)
+
+        self._submit('create_acls', len(acls), futures.values(), run)
+        return futures
+
+    def describe_acls(self, acl_binding_filter, request_timeout=None, **kwargs):
+        if not isinstance(acl_binding_filter, AclBindingFilter): raise TypeError("Expected an AclBindingFilter")
+        future = concurrent.futures.Future()
+
+        def run():
+            with self._lock: matched = [b for b in self.acls if binding_matches(b, acl_binding_filter)]
+            future.set_result(matched)
+
+        self._submit('describe_acls', 1, [future], run)
+        return future
+
+    def delete_acls(self, acl_binding_filters, request_timeout=None, **kwargs):
+        self._check_list(acl_binding_filters, AclBindingFilter)
+        futures = {acl_filter: concurrent.futures.Future() for acl_filter in acl_binding_filters}
+
+        def run():
+            for acl_filter, future in futures.items():
+                if self._item_fails(): future.set_exception(KafkaException(KafkaError(KafkaError.POLICY_VIOLATION, "Injected failure"))); continue
+                with self._lock:
+                    exact = _exact_binding(acl_filter)
+                    if exact is not None: matched = [exact] if exact in self.acls else []
+                    else: matched = [b for b in self.acls if binding_matches(b, acl_filter)]
+                    self.acls.difference_update(matched)
+                future.set_result(matched)
+
+        self._submit('delete_acls', len(acl_binding_filters), futures.values(), run)
+        return futures
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    def _check_list(self, items, item_type):
+        # Same argument checks as the real client
+        if not isinstance(items, list) or not items: raise ValueError("Expected a non-empty list")
+        if any(not isinstance(item, item_type) for item in items): raise TypeError(f"Expected a list of {item_type.__name__}")
+        if len(set(items)) != len(items): raise ValueError("Duplicate entries are not allowed in one request")
+
+    def _item_fails(self):
+        return self.item_failure_rate and self._random.random() < self.item_failure_rate
+
+    def _submit(self, method, items, futures, run):
+        with self._lock:
+            self.requests[method] += 1
+            delay = (self.latency_ms + self._random.uniform(0, self.jitter_ms)) / 1000 + items * self.per_item_us / 1e6
+            request_fails = self.failure_rate and self._random.random() < self.failure_rate
+        futures = list(futures)
+
+        def request():
+            if delay: time.sleep(delay)
+            if request_fails:
+                error = KafkaException(KafkaError(KafkaError._TIMED_OUT, "Injected request timeout"))
+                for future in futures: future.set_exception(error)
+                return
+            run()
+
+        self._executor.submit(request)
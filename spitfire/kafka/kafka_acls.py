@@ -5,8 +5,11 @@ import sys
 import logging
 import json
 import argparse
+import collections
+import concurrent.futures
 from datetime import timezone # Needed for expiry calculation
 import time # Needed for expiry calculation
+import threading
 
 # --- GCP Specific Imports ---
 try:
@@ -18,6 +21,9 @@ except ImportError:
     sys.exit(1)
 # --- End GCP Specific Imports ---
 
+from acl_journal import AclJournal, ProgressReporter, RateLimiter, file_digest
+from acl_snapshot import write_snapshot
+from acl_templates import expand_templates
 from confluent_kafka import KafkaException, KafkaError
 from confluent_kafka.admin import (AdminClient, AclBinding, AclBindingFilter,
                                    ResourceType, ResourcePatternType,
@@ -26,41 +32,105 @@ from confluent_kafka.admin import (AdminClient, AclBinding, AclBindingFilter,
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Name of the single cluster resource (resource type BROKER, called CLUSTER in the Java tooling)
+CLUSTER_RESOURCE_NAME = "kafka-cluster"
+
+# Java tooling names accepted for confluent-kafka enum members
+ENUM_ALIASES = {ResourceType: {'CLUSTER': 'BROKER'}}
+
 # --- OAUTHBEARER Token Refresh Callback for GCP ---
+class GcpOAuthTokenProvider:
+    """
+    OAUTHBEARER token callback backed by Google Application Default Credentials (ADC).
+
+    The credentials object and the last token are cached; ADC discovery runs once and the token
+    is only refreshed when it is within refresh_margin_seconds of its expiry. Concurrent callbacks
+    (one per client, many clients per process) share a single refresh. One instance can be
+    passed as 'oauth_cb' to any number of clients.
+    """
+
+    def __init__(self, refresh_margin_seconds=300, scopes=None):
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.scopes = scopes
+        self.hits = 0
+        self.refreshes = 0
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._credentials = None
+        self._token = None
+        self._expiry_ms = 0
+
+    def __call__(self, oauthbearer_config):
+        """
+        Called by confluent-kafka-python to retrieve an OAuth token.
+        Returns (token, expiry_timestamp_ms) or raises KafkaException.
+        """
+        cached = self._cached_token()
+        if cached: return cached
+        with self._lock:
+            # Another callback may have refreshed while this one waited for the lock
+            cached = self._cached_token()
+            if cached: return cached
+            return self._refresh()
+
+    def stats(self):
+        """Returns the cache hit and refresh counters."""
+        return {'hits': self.hits, 'refreshes': self.refreshes, 'expires_at_ms': self._expiry_ms}
+
+    def _cached_token(self):
+        token, expiry_ms = self._token, self._expiry_ms
+        if token and time.time() * 1000 < expiry_ms - self.refresh_margin_seconds * 1000:
+            with self._stats_lock: self.hits += 1
+            return token, expiry_ms
+        return None
+
+    def _refresh(self):
+        try:
+            if self._credentials is None:
+                # Scopes might be needed depending on the Kafka service, but often default scopes are sufficient
+                self._credentials, project = google.auth.default(scopes=self.scopes)
+
+            # Create an authenticated session to refresh the token
+            auth_req = google.auth.transport.requests.Request()
+            self._credentials.refresh(auth_req) # Get/refresh the access token
+            credentials = self._credentials
+
+            expiry = credentials.expiry
+            # Must be UTC epoch ms; credentials without an expiry are assumed valid for the usual hour
+            expiry_timestamp_ms = int(expiry.replace(tzinfo=timezone.utc).timestamp() * 1000) if expiry else int((time.time() + 3600) * 1000)
+            principal = credentials.service_account_email if hasattr(credentials, 'service_account_email') else "gcp-adc-user" # Principal associated with the token
+
+            self._token, self._expiry_ms = credentials.token, expiry_timestamp_ms
+            self.refreshes += 1
+            logger.debug(f"Refreshed GCP OAuth token for principal '{principal}', expires at {expiry} (refresh #{self.refreshes})")
+            # Note: confluent_kafka takes expiry_timestamp_ms and principal, but they might not be used
+            # by all brokers. The token itself is the critical part.
+            return self._token, self._expiry_ms
+
+        except DefaultCredentialsError as e:
+            self._credentials = None
+            logger.error(f"GCP Default Credentials Error: {e}. Ensure ADC is configured "
+                         "(run 'gcloud auth application-default login', use a service account, "
+                         "or set GOOGLE_APPLICATION_CREDENTIALS).")
+            # Signal failure to librdkafka
+            raise KafkaException(KafkaError._AUTHENTICATION, f"GCP ADC Error: {e}")
+        except Exception as e:
+            logger.error(f"Failed to get GCP OAuth token: {e}")
+            # Signal failure to librdkafka
+            raise KafkaException(KafkaError._AUTHENTICATION, f"GCP Token Error: {e}")
+
+
+# Process-wide provider shared by every client that does not bring its own
+default_token_provider = GcpOAuthTokenProvider()
+
+
 def gcp_oauth_token_provider(oauthbearer_config):
     """
     Called by confluent-kafka-python to retrieve an OAuth token using
-    Google Application Default Credentials (ADC).
+    Google Application Default Credentials (ADC). Kept for compatibility;
+    delegates to the shared cached GcpOAuthTokenProvider.
     """
-    try:
-        # Fetch credentials using ADC strategy
-        # Scopes might be needed depending on the Kafka service, but often default scopes are sufficient
-        # credentials, project = google.auth.default(scopes=['https://www.googleapis.com/auth/cloud-platform']) # Example scope
-        credentials, project = google.auth.default()
-
-        # Create an authenticated session to refresh the token
-        auth_req = google.auth.transport.requests.Request()
-        credentials.refresh(auth_req) # Get/refresh the access token
-
-        token = credentials.token
-        expiry_timestamp_ms = int(credentials.expiry.replace(tzinfo=timezone.utc).timestamp() * 1000) # Must be UTC epoch ms
-        principal = credentials.service_account_email if hasattr(credentials, 'service_account_email') else "gcp-adc-user" # Principal associated with the token
-
-        logger.debug(f"Successfully obtained GCP OAuth token for principal '{principal}', expires at {credentials.expiry}")
-        # Note: confluent_kafka takes expiry_timestamp_ms and principal, but they might not be used
-        # by all brokers. The token itself is the critical part.
-        return token, expiry_timestamp_ms
-
-    except DefaultCredentialsError as e:
-        logger.error(f"GCP Default Credentials Error: {e}. Ensure ADC is configured "
-                     "(run 'gcloud auth application-default login', use a service account, "
-                     "or set GOOGLE_APPLICATION_CREDENTIALS).")
-        # Signal failure to librdkafka
-        raise KafkaException(KafkaError._AUTHENTICATION, f"GCP ADC Error: {e}")
-    except Exception as e:
-        logger.error(f"Failed to get GCP OAuth token: {e}")
-        # Signal failure to librdkafka
-        raise KafkaException(KafkaError._AUTHENTICATION, f"GCP Token Error: {e}")
+    return default_token_provider(oauthbearer_config)
 
 # --- End OAUTHBEARER Callback ---
 
@@ -72,9 +142,67 @@ def parse_nullable_string(s):
     else:
         return str(s)
 
+def missing_create_fields(acl_data):
+    """Returns the required CREATE fields that are missing or null in an ACL definition."""
+    required_create = ['resource_type', 'resource_pattern_type', 'principal', 'host', 'operation', 'permission_type']
+    if acl_data.get('resource_type') not in ('CLUSTER', 'BROKER') and 'resource_name' not in acl_data: required_create.append('resource_name')
+    return [field for field in required_create if field not in acl_data or acl_data.get(field) is None]
+
+def acl_binding_key(binding):
+    """Hashable identity of an ACL binding: every field, enums by name."""
+    return (binding.restype.name, binding.name, binding.resource_pattern_type.name,
+            binding.principal, binding.host, binding.operation.name, binding.permission_type.name)
+
+def binding_to_definition(binding, action="CREATE"):
+    """Converts an AclBinding into an acls.json style definition."""
+    restype, name, pattern_type, principal, host, operation, permission_type = acl_binding_key(binding)
+    return {'action': action, 'resource_type': restype, 'resource_name': name, 'resource_pattern_type': pattern_type,
+            'principal': principal, 'host': host, 'operation': operation, 'permission_type': permission_type}
+
+def build_admin_config(bootstrap_servers, config_items=()):
+    """
+    Builds the AdminClient configuration: the OAUTHBEARER core settings plus 'prop=val'
+    overrides (the -X arguments). Raises ValueError on a malformed item.
+    """
+    # --- Core OAUTHBEARER Configuration ---
+    admin_conf = {
+        'bootstrap.servers': bootstrap_servers,
+        'security.protocol': 'SASL_SSL', # Required for OAUTHBEARER typically
+        'sasl.mechanism': 'OAUTHBEARER',
+        # 'debug': 'security,broker,protocol' # Optional: Enable verbose debugging if needed
+    }
+    # --- End Core OAUTHBEARER Configuration ---
+
+    # Parse and add additional configuration properties (-X args)
+    # Useful for SSL CA location, timeouts, etc.
+    for conf_item in config_items:
+        try:
+            key, value = conf_item.split('=', 1)
+        except ValueError:
+            raise ValueError(f"Invalid configuration item: '{conf_item}'. Expected format 'prop=val'.")
+        conf_key = key.strip()
+        conf_value = value.strip()
+        # Avoid overriding core OAUTHBEARER settings unless explicitly intended
+        if conf_key in ['security.protocol', 'sasl.mechanism', 'oauth_cb']:
+             logger.warning(f"Attempting to override core auth setting '{conf_key}' via -X. Ensure this is intended.")
+        # Reject incompatible Java settings
+        if conf_key in ['sasl.login.callback.handler.class', 'sasl.jaas.config']:
+             logger.error(f"Ignoring incompatible Java configuration key '{conf_key}' from -X arguments. Use the Python OAUTHBEARER callback.")
+             continue # Skip adding this key
+
+        admin_conf[conf_key] = conf_value
+        logger.info(f"Adding config from -X: {conf_key} = {conf_value}")
+    return admin_conf
+
+
 # KafkaACLManager Class (no significant changes needed inside the class methods)
 class KafkaACLManager:
-    def __init__(self, admin_config):
+    def __init__(self, admin_config, token_provider=None, admin_client=None):
+        # An injected admin client (e.g. fake_admin.FakeAdminClient) replaces the AdminClient; admin_config is then unused
+        if admin_client is not None:
+            self.admin_client = admin_client
+            logger.info(f"Using injected admin client {type(admin_client).__name__}")
+            return
         if not isinstance(admin_config, dict) or 'bootstrap.servers' not in admin_config:
             raise ValueError("admin_config must be a dict containing 'bootstrap.servers'")
 
@@ -84,7 +212,7 @@ class KafkaACLManager:
             # The callback function itself is assigned here.
             # The 'sasl.oauthbearer.config' is passed *to* the callback if set,
             # but we don't need it for the GCP ADC approach.
-            admin_config['oauth_cb'] = gcp_oauth_token_provider
+            admin_config['oauth_cb'] = token_provider or default_token_provider
             logger.info("GCP OAUTHBEARER token provider callback configured.")
             # Remove incompatible Java config keys if they were accidentally passed
             admin_config.pop('sasl.login.callback.handler.class', None)
@@ -106,26 +234,47 @@ class KafkaACLManager:
              if isinstance(value_str, enum_type): return value_str
              raise ValueError(f"Invalid input type for {enum_type.__name__}: {type(value_str)}. Expected string.")
         try:
-            return enum_type[value_str.upper()]
+            return enum_type[ENUM_ALIASES.get(enum_type, {}).get(value_str.upper(), value_str.upper())]
         except KeyError:
             valid_values = [e.name for e in enum_type]
             raise ValueError(f"Invalid value '{value_str}' for {enum_type.__name__}. Valid values: {valid_values}{' (or ANY)' if allow_any else ''}")
 
+    def _is_cluster_resource(self, res_type):
+        # confluent-kafka names the cluster resource BROKER ('CLUSTER' is mapped to it by _to_enum)
+        return res_type == ResourceType.BROKER
+
+    def _build_acl_binding(self, resource_type_str, resource_name, resource_pattern_type_str,
+                           principal, host, operation_str, permission_type_str):
+        """Validates the inputs of a CREATE and returns the AclBinding. Raises ValueError on invalid input."""
+        res_type = self._to_enum(ResourceType, resource_type_str, allow_any=False)
+        res_pattern_type = self._to_enum(ResourcePatternType, resource_pattern_type_str, allow_any=False)
+        op = self._to_enum(AclOperation, operation_str, allow_any=False)
+        perm_type = self._to_enum(AclPermissionType, permission_type_str, allow_any=False)
+        res_name = parse_nullable_string(resource_name)
+        if not self._is_cluster_resource(res_type) and res_name is None: raise ValueError("resource_name cannot be None/null for non-CLUSTER resource types")
+        # The broker API requires a name for the cluster resource too; Kafka always names it 'kafka-cluster'
+        if self._is_cluster_resource(res_type) and res_name != CLUSTER_RESOURCE_NAME:
+            if res_name is not None: logger.warning(f"resource_name '{res_name}' provided for CLUSTER resource type will be replaced by '{CLUSTER_RESOURCE_NAME}'.")
+            res_name = CLUSTER_RESOURCE_NAME
+        if principal is None or host is None: raise ValueError("Principal and host cannot be None/null for ACL creation.")
+        return AclBinding(res_type, res_name, res_pattern_type, str(principal), str(host), op, perm_type)
+
+    def _build_acl_filter(self, resource_type_str=None, resource_name=None, resource_pattern_type_str=None,
+                          principal=None, host=None, operation_str=None, permission_type_str=None):
+        """Returns the AclBindingFilter for a DESCRIBE/DELETE. Missing values match anything. Raises ValueError on invalid input."""
+        res_type = self._to_enum(ResourceType, resource_type_str, allow_any=True)
+        res_pattern_type = self._to_enum(ResourcePatternType, resource_pattern_type_str, allow_any=True)
+        op = self._to_enum(AclOperation, operation_str, allow_any=True)
+        perm_type = self._to_enum(AclPermissionType, permission_type_str, allow_any=True)
+        res_name = parse_nullable_string(resource_name); filt_principal = parse_nullable_string(principal); filt_host = parse_nullable_string(host)
+        return AclBindingFilter(res_type, res_name, res_pattern_type, filt_principal, filt_host, op, perm_type)
+
     def create_acl(self, resource_type_str, resource_name, resource_pattern_type_str,
                    principal, host, operation_str, permission_type_str, request_timeout=15.0):
-        # (Content largely unchanged)
         acl_binding = None
         try:
-            res_type = self._to_enum(ResourceType, resource_type_str, allow_any=False)
-            res_pattern_type = self._to_enum(ResourcePatternType, resource_pattern_type_str, allow_any=False)
-            op = self._to_enum(AclOperation, operation_str, allow_any=False)
-            perm_type = self._to_enum(AclPermissionType, permission_type_str, allow_any=False)
-            res_name = parse_nullable_string(resource_name)
-            if res_type != ResourceType.CLUSTER and res_name is None: raise ValueError("resource_name cannot be None/null for non-CLUSTER resource types")
-            if res_type == ResourceType.CLUSTER and res_name is not None: logger.warning(f"resource_name '{res_name}' provided for CLUSTER resource type will be ignored."); res_name = None
-            if principal is None or host is None: raise ValueError("Principal and host cannot be None/null for ACL creation.")
-            principal = str(principal); host = str(host)
-            acl_binding = AclBinding(res_type, res_name, res_pattern_type, principal, host, op, perm_type)
+            acl_binding = self._build_acl_binding(resource_type_str, resource_name, resource_pattern_type_str,
+                                                  principal, host, operation_str, permission_type_str)
             logger.info(f"Attempting to create ACL: {acl_binding}")
             fs = self.admin_client.create_acls([acl_binding], request_timeout=request_timeout)
             future = fs[acl_binding]; future.result(); logger.info(f"Successfully requested creation of ACL: {acl_binding}")
@@ -136,6 +285,102 @@ class KafkaACLManager:
         except KafkaException as e: log_msg = f"Failed to create ACL"; log_msg += f" {acl_binding}" if acl_binding else ""; log_msg += f": {e}"; logger.error(log_msg); return False
         except Exception as e: logger.error(f"An unexpected error occurred during ACL creation: {e}"); return False
 
+    # --- Batch operations ---
+    # One create_acls/delete_acls request carries up to batch_size bindings/filters. All chunks
+    # are submitted before waiting, so the broker round-trips overlap instead of running serially.
+
+    def _submit_batch(self, acl_definitions, build, submit, batch_size, request_timeout):
+        """
+        Builds bindings/filters for the definitions and submits them in chunks without waiting.
+        Returns (results, pending): results is aligned with acl_definitions (None = in flight),
+        pending is a list of (future, [definition indexes]) to pass to _collect_batch.
+        """
+        results = [None] * len(acl_definitions)
+        indexes_by_key = {}
+        for i, acl_data in enumerate(acl_definitions):
+            description = acl_data.get('description', f'ACL definition #{i+1}')
+            try:
+                key = build(acl_data)
+            except (KeyError, ValueError) as e:
+                logger.error(f"Input validation error for '{description}': {e}")
+                results[i] = {'description': description, 'success': False, 'error': str(e)}
+                continue
+            # create_acls/delete_acls reject duplicates within a request; send each key once
+            indexes_by_key.setdefault(key, []).append(i)
+
+        pending = []
+        keys = list(indexes_by_key)
+        for start in range(0, len(keys), batch_size):
+            chunk = keys[start:start + batch_size]
+            try:
+                fs = submit(chunk, request_timeout=request_timeout)
+                pending.extend((fs[key], indexes_by_key[key]) for key in chunk)
+            except Exception as e:
+                logger.error(f"Failed to submit batch of {len(chunk)} ACL request(s): {e}")
+                for key in chunk:
+                    for i in indexes_by_key[key]:
+                        results[i] = {'description': acl_definitions[i].get('description', f'ACL definition #{i+1}'), 'success': False, 'error': str(e)}
+        return results, pending
+
+    def _collect_batch(self, acl_definitions, results, pending, action):
+        """Waits on all pending futures concurrently and fills in the per-definition results."""
+        concurrent.futures.wait([future for future, _ in pending])
+        for future, indexes in pending:
+            error = future.exception()
+            for i in indexes:
+                description = acl_definitions[i].get('description', f'ACL definition #{i+1}')
+                if error is not None:
+                    logger.error(f"Failed to {action} ACL for '{description}': {error}")
+                    results[i] = {'description': description, 'success': False, 'error': str(error)}
+                else:
+                    result = {'description': description, 'success': True, 'error': None}
+                    if action == 'delete':
+                        result['deleted'] = len(future.result() or [])
+                    results[i] = result
+        return results
+
+    def _binding_from_definition(self, acl_data):
+        missing = missing_create_fields(acl_data)
+        if missing: raise ValueError(f"Missing required fields: {missing}")
+        return self._build_acl_binding(acl_data.get('resource_type'), acl_data.get('resource_name'), acl_data.get('resource_pattern_type'),
+                                       acl_data.get('principal'), acl_data.get('host'), acl_data.get('operation'), acl_data.get('permission_type'))
+
+    def _filter_from_definition(self, acl_data):
+        if not acl_data.get('resource_pattern_type'): raise ValueError("'resource_pattern_type' is required for delete filter")
+        return self._build_acl_filter(acl_data.get('resource_type'), acl_data.get('resource_name'), acl_data.get('resource_pattern_type'),
+                                      acl_data.get('principal'), acl_data.get('host'), acl_data.get('operation'), acl_data.get('permission_type'))
+
+    def submit_acls_batch(self, action, acl_definitions, batch_size=500, request_timeout=15.0):
+        """
+        Submits the bindings (CREATE) or filters (DELETE) of many definitions without waiting.
+        Returns a handle to pass to collect_acls_batch.
+        """
+        if action == "CREATE": build, submit = self._binding_from_definition, self.admin_client.create_acls
+        elif action == "DELETE": build, submit = self._filter_from_definition, self.admin_client.delete_acls
+        else: raise ValueError(f"Batched action must be CREATE or DELETE, got '{action}'")
+        results, pending = self._submit_batch(acl_definitions, build, submit, batch_size, request_timeout)
+        logger.debug(f"Submitted {len(pending)} ACL {action} request item(s) in {-(-len(pending) // batch_size) if pending else 0} request(s).")
+        return action, acl_definitions, results, pending
+
+    def collect_acls_batch(self, handle):
+        """Waits for a submitted batch. Returns a list aligned with its definitions of {'description', 'success', 'error'[, 'deleted']}."""
+        action, acl_definitions, results, pending = handle
+        return self._collect_batch(acl_definitions, results, pending, action.lower())
+
+    def create_acls_batch(self, acl_definitions, batch_size=500, request_timeout=15.0):
+        """
+        Creates the ACLs of many CREATE definitions with chunked create_acls calls.
+        Returns a list aligned with acl_definitions of {'description', 'success', 'error'}.
+        """
+        return self.collect_acls_batch(self.submit_acls_batch("CREATE", acl_definitions, batch_size, request_timeout))
+
+    def delete_acls_batch(self, acl_definitions, batch_size=500, request_timeout=15.0):
+        """
+        Deletes the ACLs matching many DELETE definitions with chunked delete_acls calls.
+        Returns a list aligned with acl_definitions of {'description', 'success', 'error', 'deleted'}.
+        """
+        return self.collect_acls_batch(self.submit_acls_batch("DELETE", acl_definitions, batch_size, request_timeout))
+
 
     def describe_acls(self, resource_type_str=None, resource_name=None, resource_pattern_type_str=None,
                       principal=None, host=None, operation_str=None, permission_type_str=None,
@@ -143,12 +388,8 @@ class KafkaACLManager:
         # (Content unchanged)
         acl_filter = None
         try:
-            res_type = self._to_enum(ResourceType, resource_type_str, allow_any=True)
-            res_pattern_type = self._to_enum(ResourcePatternType, resource_pattern_type_str, allow_any=True)
-            op = self._to_enum(AclOperation, operation_str, allow_any=True)
-            perm_type = self._to_enum(AclPermissionType, permission_type_str, allow_any=True)
-            res_name = parse_nullable_string(resource_name); filt_principal = parse_nullable_string(principal); filt_host = parse_nullable_string(host)
-            acl_filter = AclBindingFilter(res_type, res_name, res_pattern_type, filt_principal, filt_host, op, perm_type)
+            acl_filter = self._build_acl_filter(resource_type_str, resource_name, resource_pattern_type_str,
+                                                principal, host, operation_str, permission_type_str)
             logger.info(f"Attempting to describe ACLs matching filter: {acl_filter}")
             future = self.admin_client.describe_acls(acl_filter, request_timeout=request_timeout)
             results = future.result(); logger.info(f"Found {len(results)} ACL(s) matching filter.")
@@ -160,24 +401,24 @@ class KafkaACLManager:
         except Exception as e: logger.error(f"An unexpected error occurred during ACL description: {e}"); return None
 
 
+    def list_all_acls(self, request_timeout=30.0):
+        """Fetches every ACL of the cluster with a single wildcard describe_acls call. Returns None on failure."""
+        logger.info("Fetching all ACLs with a wildcard filter...")
+        return self.describe_acls(request_timeout=request_timeout)
+
+
     def delete_acl(self, resource_type_str=None, resource_name=None, resource_pattern_type_str=None,
                    principal=None, host=None, operation_str=None, permission_type_str=None,
                    request_timeout=15.0):
         # (Content unchanged)
         acl_filter = None
         try:
-            res_type = self._to_enum(ResourceType, resource_type_str, allow_any=True)
-            res_pattern_type = self._to_enum(ResourcePatternType, resource_pattern_type_str, allow_any=True)
-            op = self._to_enum(AclOperation, operation_str, allow_any=True)
-            perm_type = self._to_enum(AclPermissionType, permission_type_str, allow_any=True)
-            res_name = parse_nullable_string(resource_name); filt_principal = parse_nullable_string(principal); filt_host = parse_nullable_string(host)
-            acl_filter = AclBindingFilter(res_type, res_name, res_pattern_type, filt_principal, filt_host, op, perm_type)
+            acl_filter = self._build_acl_filter(resource_type_str, resource_name, resource_pattern_type_str,
+                                                principal, host, operation_str, permission_type_str)
             logger.info(f"Attempting to delete ACLs matching filter: {acl_filter}")
             fs = self.admin_client.delete_acls([acl_filter], request_timeout=request_timeout)
-            future = fs[acl_filter]; results_wrapper = future.result()
-            filter_result = results_wrapper[0]
-            if filter_result.exception is not None: raise filter_result.exception
-            deleted_bindings = filter_result.bindings
+            # The future resolves to the list of deleted AclBindings, or raises KafkaException
+            future = fs[acl_filter]; deleted_bindings = future.result()
             logger.info(f"Successfully requested deletion, {len(deleted_bindings)} ACL(s) matched filter.")
             return deleted_bindings
         # (Error handling unchanged)
@@ -187,17 +428,120 @@ class KafkaACLManager:
         except Exception as e: logger.error(f"An unexpected error occurred during ACL deletion: {e}"); return None
 
 
-def process_acls_from_file(acl_manager, file_path):
-    # (Content unchanged from previous version)
-    try:
-        with open(file_path, 'r') as f: acl_definitions = json.load(f)
-    except FileNotFoundError: logger.error(f"Error: JSON file not found at '{file_path}'"); return False
-    except json.JSONDecodeError as e: logger.error(f"Error: Could not decode JSON file '{file_path}': {e}"); return False
-    except Exception as e: logger.error(f"Error reading file '{file_path}': {e}"); return False
-    if not isinstance(acl_definitions, list): logger.error(f"Error: JSON content in '{file_path}' must be a list of ACL objects."); return False
-    logger.info(f"Processing {len(acl_definitions)} ACL definitions from '{file_path}'...")
+def process_acls_batched(acl_manager, acl_definitions, batch_size):
+    """
+    Processes ACL definitions with batched CREATE/DELETE requests.
+    Consecutive definitions with the same action form one run; a run is flushed before the
+    action changes, so the file order of creates, deletes and describes is preserved.
+    """
     overall_success = True
+    run_action, run = None, []
+
+    def flush():
+        nonlocal overall_success
+        if not run: return
+        logger.info(f"\n--- Processing {len(run)} {run_action} definition(s) in batches of {batch_size} ---")
+        if run_action == "CREATE": results = acl_manager.create_acls_batch(run, batch_size=batch_size)
+        else: results = acl_manager.delete_acls_batch(run, batch_size=batch_size)
+        for result in results:
+            if not result['success']: logger.warning(f"Action '{run_action}' for '{result['description']}' failed: {result['error']}"); overall_success = False
+            elif run_action == "DELETE": print(f"  {result['description']}: deletion request sent. Matched {result['deleted']} ACLs for deletion.")
+        failed = sum(1 for result in results if not result['success'])
+        logger.info(f"{run_action} run finished: {len(results) - failed} succeeded, {failed} failed.")
+        run.clear()
+
     for i, acl_data in enumerate(acl_definitions):
+        if not isinstance(acl_data, dict): logger.warning(f"Skipping item #{i+1}: Not a valid dictionary object."); overall_success = False; continue
+        action = acl_data.get('action')
+        if action in ("CREATE", "DELETE"):
+            if action != run_action: flush(); run_action = action
+            acl_data = dict(acl_data); acl_data.setdefault('description', f'ACL definition #{i+1}')
+            run.append(acl_data)
+            continue
+        flush(); run_action = None
+        if action == "DESCRIBE":
+            if not process_acls_serial(acl_manager, [acl_data], offset=i): overall_success = False
+        else: logger.warning(f"Skipping item #{i+1}: Unknown or missing action '{action}'"); overall_success = False
+    flush()
+    return overall_success
+
+
+def process_acls_streaming(acl_manager, acl_definitions, batch_size=500, max_in_flight=4,
+                           journal=None, rate_limiter=None, progress_interval=30):
+    """
+    Processes an iterable of ACL definitions (e.g. iter_acl_definitions) with flat memory.
+
+    Consecutive CREATE or DELETE definitions are cut into batches of batch_size and submitted
+    without waiting, so the next batch is parsed and validated while the broker works on the
+    previous ones. At most max_in_flight batches are outstanding. A change of action (or a
+    DESCRIBE) first waits for every outstanding batch, so file order is preserved.
+
+    With an AclJournal, definitions an earlier run of the same file applied at the same position
+    are skipped and each completed batch is checkpointed; a RateLimiter caps the operations per second.
+    """
+    in_flight = collections.deque()
+    counts = {'succeeded': 0, 'failed': 0, 'skipped': 0}
+    run_action, run, run_keys = None, [], []
+    progress = ProgressReporter(progress_interval)
+
+    def collect_oldest():
+        handle, keys = in_flight.popleft()
+        applied = []
+        for key, result in zip(keys, acl_manager.collect_acls_batch(handle)):
+            if result['success']:
+                counts['succeeded'] += 1
+                if journal: applied.append(key)
+            else: counts['failed'] += 1; logger.warning(f"Action for '{result['description']}' failed: {result['error']}")
+        if journal: journal.record(applied)
+        progress.maybe_report(counts)
+
+    def drain():
+        while in_flight: collect_oldest()
+
+    def submit_run():
+        nonlocal run, run_keys
+        if not run: return
+        while len(in_flight) >= max_in_flight: collect_oldest()
+        if rate_limiter: rate_limiter.acquire(len(run))
+        in_flight.append((acl_manager.submit_acls_batch(run_action, run, batch_size=batch_size), run_keys))
+        run, run_keys = [], []
+
+    processed = 0
+    try:
+        for i, acl_data in enumerate(acl_definitions):
+            processed = i + 1
+            if not isinstance(acl_data, dict): logger.warning(f"Skipping item #{i+1}: Not a valid dictionary object."); counts['failed'] += 1; continue
+            action = acl_data.get('action')
+            if action in ("CREATE", "DELETE"):
+                key = journal.key(i, acl_data) if journal else None
+                if journal and journal.is_applied(key):
+                    counts['skipped'] += 1; progress.maybe_report(counts); continue
+                if action != run_action: submit_run(); drain(); run_action = action
+                if 'description' not in acl_data: acl_data['description'] = f'ACL definition #{i+1}'
+                run.append(acl_data); run_keys.append(key)
+                if len(run) >= batch_size: submit_run()
+            else:
+                submit_run(); drain(); run_action = None
+                if action == "DESCRIBE":
+                    if process_acls_serial(acl_manager, [acl_data], offset=i): counts['succeeded'] += 1
+                    else: counts['failed'] += 1
+                else: logger.warning(f"Skipping item #{i+1}: Unknown or missing action '{action}'"); counts['failed'] += 1
+    except (OSError, ValueError) as e:
+        # Invalid input after some definitions were applied: finish what was sent, then report
+        logger.error(f"Stopped reading ACL definitions: {e}")
+        counts['failed'] += 1
+    submit_run(); drain()
+
+    progress.maybe_report(counts, force=True)
+    logger.info(f"Streamed {processed} definition(s): {counts['succeeded']} succeeded, {counts['failed']} failed, "
+                f"{counts['skipped']} skipped (already in journal).")
+    return counts['failed'] == 0
+
+
+def process_acls_serial(acl_manager, acl_definitions, offset=0):
+    """Processes ACL definitions one request at a time."""
+    overall_success = True
+    for i, acl_data in enumerate(acl_definitions, start=offset):
         if not isinstance(acl_data, dict): logger.warning(f"Skipping item #{i+1}: Not a valid dictionary object."); overall_success = False; continue
         action = acl_data.get('action'); description = acl_data.get('description', f'ACL definition #{i+1}')
         logger.info(f"\n--- Processing Action: {action} ({description}) ---")
@@ -205,9 +549,7 @@ def process_acls_from_file(acl_manager, file_path):
         principal = acl_data.get('principal'); host = acl_data.get('host'); operation = acl_data.get('operation'); permission_type = acl_data.get('permission_type')
         success = False
         if action == "CREATE":
-            required_create = ['resource_type', 'resource_pattern_type', 'principal', 'host', 'operation', 'permission_type']
-            if resource_type != 'CLUSTER' and 'resource_name' not in acl_data: required_create.append('resource_name')
-            missing = [field for field in required_create if field not in acl_data or acl_data.get(field) is None]
+            missing = missing_create_fields(acl_data)
             if missing: logger.error(f"Skipping CREATE: Missing required fields: {missing} in definition: {acl_data}"); overall_success = False; continue
             success = acl_manager.create_acl(resource_type, resource_name, resource_pattern_type, principal, host, operation, permission_type)
         elif action == "DELETE":
@@ -226,6 +568,147 @@ def process_acls_from_file(acl_manager, file_path):
     return overall_success
 
 
+def reconcile_acls(acl_manager, acl_definitions, dry_run=False, prune_all=False, batch_size=500):
+    """
+    Makes the cluster ACLs match the CREATE definitions, which are read as the desired state.
+
+    The current ACLs are fetched once and indexed by their full binding tuple, so the diff is
+    two set differences. Only missing bindings are created and only extra bindings are deleted;
+    a converged cluster gets no mutating call. Extra bindings are only deleted for principals
+    that appear in the desired state, unless prune_all is set.
+    """
+    desired = {}
+    overall_success = True
+    for i, acl_data in enumerate(acl_definitions):
+        if not isinstance(acl_data, dict): logger.warning(f"Skipping item #{i+1}: Not a valid dictionary object."); overall_success = False; continue
+        if acl_data.get('action', 'CREATE') != 'CREATE': logger.warning(f"Ignoring item #{i+1}: reconcile only reads CREATE definitions, got '{acl_data.get('action')}'."); continue
+        try:
+            binding = acl_manager._binding_from_definition(acl_data)
+        except ValueError as e:
+            # An incomplete desired state would prune live ACLs; refuse to go on
+            logger.error(f"Invalid definition #{i+1} ({acl_data.get('description', '')}): {e}. Nothing was changed.")
+            return False
+        desired.setdefault(acl_binding_key(binding), (binding, acl_data))
+
+    current_bindings = acl_manager.list_all_acls()
+    if current_bindings is None: logger.error("Could not fetch the current ACLs. Nothing was changed."); return False
+    current = {acl_binding_key(binding): binding for binding in current_bindings}
+
+    managed_principals = {key[3] for key in desired}
+    create_keys = sorted(desired.keys() - current.keys(), key=str)
+    extra_keys = sorted(current.keys() - desired.keys(), key=str)
+    delete_keys = [key for key in extra_keys if prune_all or key[3] in managed_principals]
+    logger.info(f"Reconcile plan: {len(desired)} desired, {len(current)} current, {len(create_keys)} to create, "
+                f"{len(delete_keys)} to delete, {len(extra_keys) - len(delete_keys)} left alone (unmanaged principals).")
+    for key in create_keys: logger.info(f"  + {desired[key][0]}")
+    for key in delete_keys: logger.info(f"  - {current[key]}")
+    if dry_run: logger.info("Dry run: no changes were made."); return overall_success
+
+    # Deleting exact (LITERAL/PREFIXED) filters built from live bindings only removes those bindings
+    to_create = [desired[key][1] for key in create_keys]
+    to_delete = [dict(binding_to_definition(current[key], action="DELETE"), description=str(current[key])) for key in delete_keys]
+    for action, definitions, run in (("CREATE", to_create, acl_manager.create_acls_batch), ("DELETE", to_delete, acl_manager.delete_acls_batch)):
+        if not definitions: continue
+        results = run(definitions, batch_size=batch_size)
+        failed = [result for result in results if not result['success']]
+        for result in failed: logger.warning(f"Reconcile {action} for '{result['description']}' failed: {result['error']}")
+        logger.info(f"Reconcile {action}: {len(results) - len(failed)} succeeded, {len(failed)} failed.")
+        if failed: overall_success = False
+    return overall_success
+
+
+def export_snapshot(acl_manager, file_path):
+    """Writes every ACL of the cluster to a JSON lines snapshot for offline queries (see acl_snapshot.py)."""
+    bindings = acl_manager.list_all_acls()
+    if bindings is None: logger.error("Could not fetch the current ACLs. No snapshot was written."); return False
+    definitions = sorted((binding_to_definition(binding) for binding in bindings), key=lambda d: [str(v) for v in d.values()])
+    return write_snapshot(definitions, file_path) is not None
+
+
+def iter_acl_definitions(file_path, read_size=1 << 16, max_item_size=1 << 22):
+    """
+    Yields the ACL definitions of a file without loading it whole.
+
+    A file starting with '[' is parsed incrementally as one JSON array; anything else is read
+    as NDJSON (one JSON object per line, blank lines ignored). Raises ValueError on invalid input.
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path, 'r') as f:
+        buf = ''
+        while not buf.strip():
+            chunk = f.read(read_size)
+            if not chunk: return
+            buf += chunk
+        buf = buf.lstrip()
+
+        if not buf.startswith('['):
+            f.seek(0)
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip(): continue
+                try: yield json.loads(line)
+                except json.JSONDecodeError as e: raise ValueError(f"Invalid JSON on line {line_number} of '{file_path}': {e}")
+            return
+
+        pos, expect_value, item = 1, True, 0
+        while True:
+            # Skip whitespace, reading more as needed
+            while pos < len(buf) and buf[pos].isspace(): pos += 1
+            if pos == len(buf):
+                chunk = f.read(read_size)
+                if not chunk: raise ValueError(f"Unexpected end of file in the JSON array of '{file_path}' after item #{item}")
+                buf, pos = buf[pos:] + chunk, 0
+                continue
+            char = buf[pos]
+            if char == ']' and (not expect_value or item == 0):
+                # As json.load, accept only whitespace after the array
+                rest = buf[pos + 1:]
+                while True:
+                    if rest.strip(): raise ValueError(f"Unexpected data after the JSON array of '{file_path}'")
+                    rest = f.read(read_size)
+                    if not rest: return
+            if char == ',' and not expect_value: pos += 1; expect_value = True; continue
+            if not expect_value: raise ValueError(f"Expected ',' or ']' after item #{item} in '{file_path}'")
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError as e:
+                # The item may continue in the next block; only fail at end of file or on absurdly large items
+                chunk = f.read(read_size) if len(buf) - pos < max_item_size else ''
+                if not chunk: raise ValueError(f"Invalid JSON in item #{item + 1} of '{file_path}': {e}")
+                buf, pos = buf[pos:] + chunk, 0
+                continue
+            if not isinstance(value, (dict, list)) and (end == len(buf) or buf[end] not in ' \t\r\n,]'):
+                # A bare number cut by the block boundary decodes early ('2.' of '2.5'); read on before accepting it
+                chunk = f.read(read_size)
+                if chunk: buf, pos = buf[pos:] + chunk, 0; continue
+            item += 1
+            expect_value = False
+            pos = end
+            yield value
+
+
+def load_acl_definitions(file_path):
+    """Reads the list of ACL definitions from a JSON file. Returns None on failure."""
+    try:
+        with open(file_path, 'r') as f: acl_definitions = json.load(f)
+    except FileNotFoundError: logger.error(f"Error: JSON file not found at '{file_path}'"); return None
+    except json.JSONDecodeError as e: logger.error(f"Error: Could not decode JSON file '{file_path}': {e}"); return None
+    except Exception as e: logger.error(f"Error reading file '{file_path}': {e}"); return None
+    if not isinstance(acl_definitions, list): logger.error(f"Error: JSON content in '{file_path}' must be a list of ACL objects."); return None
+    return acl_definitions
+
+
+def process_acls_from_file(acl_manager, file_path, batch_size=0):
+    """
+    Applies the ACL definitions of a JSON file. With batch_size > 0, CREATE and DELETE
+    definitions are sent in batched requests; otherwise each definition is its own request.
+    """
+    acl_definitions = load_acl_definitions(file_path)
+    if acl_definitions is None: return False
+    logger.info(f"Processing {len(acl_definitions)} ACL definitions from '{file_path}'...")
+    if batch_size: return process_acls_batched(acl_manager, acl_definitions, batch_size)
+    return process_acls_serial(acl_manager, acl_definitions)
+
+
 # --- Main Execution ---
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="Manage Kafka ACLs from JSON with OAUTHBEARER support for GCP.")
@@ -235,45 +718,52 @@ if __name__ == '__main__':
                         help="Additional client configuration properties ('prop=val'). "
                              "Use this for SSL settings (e.g., ssl.ca.location) or other librdkafka options. "
                              "Do NOT use for OAUTHBEARER-specific Java properties.")
+    parser.add_argument("--batch_size", type=int, default=0,
+                        help="Send CREATE/DELETE definitions in batches of this many bindings per request. "
+                             "0 (default) processes one definition per request.")
+    parser.add_argument("--acl_template",
+                        help="Path to a JSON (array or NDJSON) file of ACL matrix templates (principals x resources x operations), "
+                             "expanded lazily and applied in batches like --stream. Combine with --reconcile to use it as the desired state.")
+    parser.add_argument("--stream", action='store_true', default=False,
+                        help="Stream --acl_file (a JSON array or NDJSON) in batches of --batch_size (default 500) "
+                             "instead of loading it whole. CREATE/DELETE batches overlap with parsing.")
+    parser.add_argument("--max_in_flight", type=int, default=4,
+                        help="With --stream, maximum number of batches awaiting the broker (default: 4).")
+    parser.add_argument("--journal", metavar="PATH",
+                        help="Append-only journal of applied definitions (implies --stream). A rerun of the same file with the same "
+                             "journal skips what was already applied and resumes from the last completed batch.")
+    parser.add_argument("--ops_per_second", type=float, default=0,
+                        help="With --stream/--journal/--acl_template, limit ACL operations per second (default: unlimited).")
+    parser.add_argument("--progress_interval", type=int, default=30,
+                        help="With --stream/--journal/--acl_template, seconds between progress and throughput reports (default: 30).")
+    parser.add_argument("--token_refresh_margin", type=int, default=300,
+                        help="Refresh the cached GCP OAuth token this many seconds before it expires (default: 300).")
+    parser.add_argument("--export_snapshot", metavar="PATH",
+                        help="Write every ACL of the cluster to a JSON lines snapshot at PATH and exit (no --acl_file needed).")
+    parser.add_argument("--reconcile", action='store_true', default=False,
+                        help="Treat the CREATE definitions as the desired state: create only the missing ACLs "
+                             "and delete the extra ACLs of the principals the file manages.")
+    parser.add_argument("--prune_all", action='store_true', default=False,
+                        help="With --reconcile, delete extra ACLs of every principal, not only the managed ones.")
+    parser.add_argument("--dry_run", action='store_true', default=False,
+                        help="With --reconcile, only print the planned changes.")
 
     args = parser.parse_args()
 
-    # --- Core OAUTHBEARER Configuration ---
-    admin_conf = {
-        'bootstrap.servers': args.bootstrap_servers,
-        'security.protocol': 'SASL_SSL', # Required for OAUTHBEARER typically
-        'sasl.mechanism': 'OAUTHBEARER',
-        # 'debug': 'security,broker,protocol' # Optional: Enable verbose debugging if needed
-    }
-    # --- End Core OAUTHBEARER Configuration ---
+    token_provider = GcpOAuthTokenProvider(refresh_margin_seconds=args.token_refresh_margin)
 
-    # Parse and add additional configuration properties (-X args)
-    # Useful for SSL CA location, timeouts, etc.
-    for conf_item in args.config:
-        try:
-            key, value = conf_item.split('=', 1)
-            conf_key = key.strip()
-            conf_value = value.strip()
-            # Avoid overriding core OAUTHBEARER settings unless explicitly intended
-            if conf_key in ['security.protocol', 'sasl.mechanism', 'oauth_cb']:
-                 logger.warning(f"Attempting to override core auth setting '{conf_key}' via -X. Ensure this is intended.")
-            # Reject incompatible Java settings
-            if conf_key in ['sasl.login.callback.handler.class', 'sasl.jaas.config']:
-                 logger.error(f"Ignoring incompatible Java configuration key '{conf_key}' from -X arguments. Use the Python OAUTHBEARER callback.")
-                 continue # Skip adding this key
-
-            admin_conf[conf_key] = conf_value
-            logger.info(f"Adding config from -X: {conf_key} = {conf_value}")
-        except ValueError:
-            logger.error(f"Ignoring invalid configuration item: '{conf_item}'. Expected format 'prop=val'.")
-            sys.exit(1)
+    try:
+        admin_conf = build_admin_config(args.bootstrap_servers, args.config)
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(1)
 
     # Example SSL config using -X:
     # python kafka_acl_tool.py <servers> acls.json -X ssl.ca.location=./ca.pem
 
     try:
         # The KafkaACLManager __init__ will now automatically set the oauth_cb
-        acl_manager = KafkaACLManager(admin_conf)
+        acl_manager = KafkaACLManager(admin_conf, token_provider=token_provider)
     except KafkaException as e:
         logger.error(f"KafkaException during AdminClient initialization: {e}")
         if e.args[0].code() == KafkaError._AUTHENTICATION:
@@ -284,8 +774,40 @@ if __name__ == '__main__':
         sys.exit(1)
 
     # Process ACLs defined in the JSON file
-    operation_status = process_acls_from_file(acl_manager, args.acl_file)
+    streaming_options = dict(batch_size=args.batch_size or 500, max_in_flight=args.max_in_flight,
+                             rate_limiter=RateLimiter(args.ops_per_second) if args.ops_per_second > 0 else None,
+                             progress_interval=args.progress_interval)
+    if args.export_snapshot:
+        operation_status = export_snapshot(acl_manager, args.export_snapshot)
+    elif args.acl_template and args.reconcile:
+        try:
+            acl_definitions = list(expand_templates(iter_acl_definitions(args.acl_template)))
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not expand ACL templates from '{args.acl_template}': {e}"); acl_definitions = None
+        operation_status = acl_definitions is not None and reconcile_acls(acl_manager, acl_definitions, dry_run=args.dry_run,
+                                                                          prune_all=args.prune_all, batch_size=args.batch_size or 500)
+    elif args.reconcile:
+        acl_definitions = load_acl_definitions(args.acl_file)
+        operation_status = acl_definitions is not None and reconcile_acls(acl_manager, acl_definitions, dry_run=args.dry_run,
+                                                                          prune_all=args.prune_all, batch_size=args.batch_size or 500)
+    elif args.acl_template or args.stream or args.journal:
+        try:
+            # Entries are keyed by the source file's digest, so only a rerun of the same file resumes
+            journal = AclJournal(args.journal, file_digest(args.acl_template or args.acl_file)).open() if args.journal else None
+        except OSError as e:
+            logger.error(f"Could not open journal '{args.journal}': {e}"); sys.exit(1)
+        template_stats = {}
+        if args.acl_template: acl_definitions = expand_templates(iter_acl_definitions(args.acl_template), template_stats)
+        else: acl_definitions = iter_acl_definitions(args.acl_file)
+        try:
+            operation_status = process_acls_streaming(acl_manager, acl_definitions, journal=journal, **streaming_options)
+        finally:
+            if journal: journal.close()
+        if args.acl_template: logger.info(f"ACL templates: {template_stats}")
+    else:
+        operation_status = process_acls_from_file(acl_manager, args.acl_file, batch_size=args.batch_size)
 
+    logger.info(f"OAUTHBEARER token provider: {token_provider.stats()}")
     if operation_status:
         logger.info("\n--- Finished processing ACL definitions from JSON file. Check logs for details. ---")
         sys.exit(0)
@@ -0,0 +1,19 @@
+from acl_consolidate import AclConsolidator
+
+
+def _acl(action, name):
+    return {'action': action, 'resource_type': 'TOPIC', 'resource_name': name, 'resource_pattern_type': 'LITERAL',
+            'principal': 'User:a', 'host': '*', 'operation': 'READ', 'permission_type': 'ALLOW'}
+
+
+def test_creates_merge_into_prefix():
+    rewritten, proposals = AclConsolidator().consolidate([_acl('CREATE', 'orders-a'), _acl('CREATE', 'orders-b')])
+    assert [p['prefix'] for p in proposals] == ['orders-']
+    assert [(d['resource_name'], d['resource_pattern_type']) for d in rewritten] == [('orders-', 'PREFIXED')]
+
+
+def test_deleted_name_is_not_covered_by_a_prefix():
+    definitions = [_acl('CREATE', 'orders-a'), _acl('CREATE', 'orders-b'), _acl('DELETE', 'orders-a')]
+    rewritten, proposals = AclConsolidator().consolidate(definitions)
+    assert proposals == []
+    assert rewritten == definitions
@@ -0,0 +1,41 @@
+import json
+
+from acl_journal import AclJournal, file_digest
+from fake_admin import FakeAdminClient
+from kafka_acls import KafkaACLManager, iter_acl_definitions, process_acls_streaming
+
+
+def _acl(action):
+    return {'action': action, 'resource_type': 'TOPIC', 'resource_name': 'orders', 'resource_pattern_type': 'LITERAL',
+            'principal': 'User:a', 'host': '*', 'operation': 'READ', 'permission_type': 'ALLOW'}
+
+
+def _apply(manager, acl_file, journal_file):
+    journal = AclJournal(str(journal_file), file_digest(str(acl_file))).open()
+    try:
+        return process_acls_streaming(manager, iter_acl_definitions(str(acl_file)), journal=journal)
+    finally:
+        journal.close()
+
+
+def test_repeated_definition_is_applied_each_time(tmp_path):
+    acl_file = tmp_path / "acls.json"
+    acl_file.write_text(json.dumps([_acl('CREATE'), _acl('DELETE'), _acl('CREATE')]))
+    admin = FakeAdminClient()
+    manager = KafkaACLManager(None, admin_client=admin)
+
+    assert _apply(manager, acl_file, tmp_path / "journal")
+    assert len(admin.acls) == 1
+    # A rerun of the same file resumes: nothing is applied again
+    assert _apply(manager, acl_file, tmp_path / "journal")
+    assert len(admin.acls) == 1
+
+
+def test_later_file_with_same_definition_is_applied(tmp_path):
+    admin = FakeAdminClient()
+    manager = KafkaACLManager(None, admin_client=admin)
+    for action in ('CREATE', 'DELETE', 'CREATE'):
+        acl_file = tmp_path / f"{action.lower()}.json"
+        acl_file.write_text(json.dumps([_acl(action)]))
+        assert _apply(manager, acl_file, tmp_path / "journal")
+    assert len(admin.acls) == 1
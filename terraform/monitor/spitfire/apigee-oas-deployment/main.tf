@@ -13,7 +13,8 @@ locals {
         --base_sf_pre ${var.base_sf_pre} \
         --base_sf_post ${var.base_sf_post} \
         --override_sf_pre ${var.override_sf_pre} \
-        --override_sf_post ${var.override_sf_post}
+        --override_sf_post ${var.override_sf_post} \
+        --build_profile ${var.build_profile}
       EOF
     :
     <<EOF
@@ -26,7 +27,8 @@ locals {
         --oas_file_location ${var.oas_file_location} \
         --oas_file_name ${var.oas_file_name} \
         --base_sf_pre ${var.base_sf_pre} \
-        --base_sf_post ${var.base_sf_post}
+        --base_sf_post ${var.base_sf_post} \
+        --build_profile ${var.build_profile}
       EOF
   )
 
@@ -120,6 +122,7 @@ resource "null_resource" "prepare_apigee_bundle" {
     oas_file_sha      = var.oas_file_sha
     base_sf_pre       = var.base_sf_pre
     base_sf_post      = var.base_sf_post
+    build_profile     = var.build_profile
   }
 
   provisioner "local-exec" {
@@ -0,0 +1,87 @@
+import datetime
+import logging
+import threading
+
+import google.auth
+import google.auth.transport.requests
+from google.auth.exceptions import DefaultCredentialsError, RefreshError
+
+CLOUD_PLATFORM_SCOPE = "https://www.googleapis.com/auth/cloud-platform"
+
+
+class AdcTokenProvider:
+    """
+    In-process access token source built on Application Default Credentials.
+
+    Credential discovery runs once; the access token is cached and refreshed
+    shortly before it expires, so long batch runs never hold an expired token
+    and never spawn gcloud. Safe to share between threads: concurrent callers
+    wait for a single refresh.
+    """
+
+    def __init__(self, refresh_margin_seconds=300, scopes=(CLOUD_PLATFORM_SCOPE,)):
+        """
+        Parameters:
+            refresh_margin_seconds (int): Refresh the token when it expires within this many seconds.
+            scopes (tuple): OAuth scopes requested from ADC.
+        """
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.scopes = list(scopes)
+        self.refreshes = 0
+        self._lock = threading.Lock()
+        self._credentials = None
+        self._request = None
+
+    def token(self):
+        """
+        Returns a valid access token, refreshing it if needed.
+
+        Returns:
+            str: The access token, or None if ADC is not configured or the refresh failed.
+        """
+        if self._fresh():
+            return self._credentials.token
+        with self._lock:
+            # Another thread may have refreshed while this one waited
+            if self._fresh():
+                return self._credentials.token
+            try:
+                if self._credentials is None:
+                    self._credentials, project = google.auth.default(scopes=self.scopes)
+                    self._request = google.auth.transport.requests.Request()
+                self._credentials.refresh(self._request)
+                self.refreshes += 1
+                logging.info(f" Refreshed ADC access token, expires at {self._credentials.expiry} UTC ")
+                return self._credentials.token
+            except DefaultCredentialsError as e:
+                logging.error(f" Application Default Credentials not found: {e}. Run 'gcloud auth application-default login' "
+                              "or set GOOGLE_APPLICATION_CREDENTIALS. ")
+                return None
+            except RefreshError as e:
+                logging.error(f" Failed to refresh the ADC access token: {e} ")
+                return None
+
+    def _fresh(self):
+        credentials = self._credentials
+        if credentials is None or not credentials.token:
+            return False
+        if credentials.expiry is None:
+            return True
+        # google-auth keeps expiry as a naive UTC datetime
+        remaining = credentials.expiry - datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        return remaining.total_seconds() > self.refresh_margin_seconds
+
+
+_shared_provider = None
+_shared_lock = threading.Lock()
+
+
+def shared_token_provider(refresh_margin_seconds=300):
+    """
+    Returns the process-wide AdcTokenProvider, creating it on first use.
+    """
+    global _shared_provider
+    with _shared_lock:
+        if _shared_provider is None:
+            _shared_provider = AdcTokenProvider(refresh_margin_seconds=refresh_margin_seconds)
+        return _shared_provider
@@ -0,0 +1,185 @@
+import logging
+import os
+import re
+import xml.etree.ElementTree as ET
+
+from bundle_utils import BUNDLE_ROOTS, FLOW_DIRS
+
+BUILD_PROFILES = ("dev", "prod")
+
+# Policies whose <Description> contains this marker only run in dev builds
+DEBUG_ONLY_MARKER = "[debug-only]"
+
+# Resource references inside policies, e.g. <ResourceURL>jsc://debug1.js</ResourceURL>
+RESOURCE_REF_RE = re.compile(r'\b(jsc|xsl|java|py|node|hosted|wsdl|xsd|oas|graphql|properties)://([^\s<"\']+)')
+
+
+def apply_build_profile(bundle_dir, profile="dev", debug_policies=()):
+    """
+    Applies a build profile to an extracted proxy or sharedflow bundle in place.
+
+    The 'dev' profile leaves the bundle untouched. The 'prod' profile removes
+    the steps running debug-only policies, drops policies no step references
+    and resources no remaining policy references (keeping the bundle manifest
+    in sync) and strips formatting whitespace and comments from the XML files.
+
+    Parameters:
+        bundle_dir (str): Directory containing 'apiproxy' or 'sharedflowbundle'.
+        profile (str): 'dev' or 'prod'.
+        debug_policies (list): Additional policy names to treat as debug-only.
+
+    Returns:
+        dict: Summary of the removed steps, policies and resources and of the
+            byte savings, or None if the profile could not be applied.
+    """
+    if profile not in BUILD_PROFILES:
+        logging.error(f" Invalid build profile: {profile}. Must be one of {BUILD_PROFILES}. ")
+        return None
+
+    summary = {"profile": profile, "removed_steps": 0, "removed_policies": [],
+               "removed_resources": [], "bytes_before": 0, "bytes_after": 0}
+    if profile == "dev":
+        return summary
+
+    root_dir = next((os.path.join(bundle_dir, r) for r in BUNDLE_ROOTS
+                     if os.path.isdir(os.path.join(bundle_dir, r))), None)
+    if root_dir is None:
+        logging.error(f" Error: No {BUNDLE_ROOTS} folder found in {bundle_dir} ")
+        return None
+
+    try:
+        summary["bytes_before"] = _tree_size(root_dir)
+        policies_dir = os.path.join(root_dir, "policies")
+        policy_files = {os.path.splitext(f)[0]: os.path.join(policies_dir, f)
+                        for f in os.listdir(policies_dir) if f.endswith(".xml")} if os.path.isdir(policies_dir) else {}
+
+        debug_only = set(debug_policies)
+        for policy_name, policy_path in policy_files.items():
+            description = ET.parse(policy_path).getroot().findtext("Description") or ""
+            if DEBUG_ONLY_MARKER in description:
+                debug_only.add(policy_name)
+
+        # Remove debug-only steps and collect every policy still referenced by a step
+        referenced = set()
+        for flow_path in _flow_files(root_dir):
+            tree = ET.parse(flow_path)
+            for parent in list(tree.getroot().iter()):
+                for step in list(parent.findall("Step")):
+                    name = (step.findtext("Name") or "").strip()
+                    if name in debug_only:
+                        parent.remove(step)
+                        summary["removed_steps"] += 1
+                    elif name:
+                        referenced.add(name)
+            tree.write(flow_path, encoding="UTF-8", xml_declaration=True)
+
+        for policy_name, policy_path in policy_files.items():
+            if policy_name not in referenced:
+                os.remove(policy_path)
+                summary["removed_policies"].append(policy_name)
+
+        # Drop resources that no remaining policy references
+        used_resources = set()
+        for policy_name in referenced & set(policy_files):
+            with open(policy_files[policy_name], "r") as f:
+                used_resources.update(f"{kind}://{name}" for kind, name in RESOURCE_REF_RE.findall(f.read()))
+        resources_dir = os.path.join(root_dir, "resources")
+        kept_resources = []
+        if os.path.isdir(resources_dir):
+            for kind in sorted(os.listdir(resources_dir)):
+                kind_dir = os.path.join(resources_dir, kind)
+                for file_name in sorted(os.listdir(kind_dir)):
+                    resource = f"{kind}://{file_name}"
+                    if resource in used_resources:
+                        kept_resources.append(resource)
+                    else:
+                        os.remove(os.path.join(kind_dir, file_name))
+                        summary["removed_resources"].append(resource)
+                if not os.listdir(kind_dir):
+                    os.rmdir(kind_dir)
+
+        _update_manifest(root_dir, sorted(referenced & set(policy_files)), kept_resources)
+
+        for xml_path in _xml_files(root_dir):
+            minify_xml_file(xml_path)
+
+        summary["bytes_after"] = _tree_size(root_dir)
+        logging.info(f" Applied '{profile}' build profile to {root_dir}: removed {summary['removed_steps']} debug step(s), "
+                     f"policies {summary['removed_policies']}, resources {summary['removed_resources']}; "
+                     f"{summary['bytes_before']} -> {summary['bytes_after']} bytes ")
+        return summary
+
+    except Exception as e:
+        logging.exception(f" An error occurred while applying the '{profile}' build profile ")
+        return None
+
+
+def minify_xml_file(xml_path):
+    """
+    Rewrites an XML file without comments and formatting whitespace.
+
+    Text of leaf elements is kept as is, so payload templates and other
+    whitespace-sensitive values are preserved. Files declaring XML namespaces
+    are left untouched to avoid prefix rewriting.
+    """
+    with open(xml_path, "rb") as f:
+        content = f.read()
+    if b"xmlns" in content:
+        return
+    root = ET.fromstring(content)
+    for element in root.iter():
+        if len(element) and element.text is not None and not element.text.strip():
+            element.text = None
+        if element.tail is not None and not element.tail.strip():
+            element.tail = None
+    with open(xml_path, "wb") as f:
+        f.write(ET.tostring(root, encoding="UTF-8", xml_declaration=True))
+
+
+def _update_manifest(root_dir, policies, resources):
+    """
+    Rewrites the <Policies> and <Resources> lists of the bundle manifest.
+    """
+    manifests = [f for f in os.listdir(root_dir) if f.endswith(".xml") and os.path.isfile(os.path.join(root_dir, f))]
+    if len(manifests) != 1:
+        logging.warning(f" Expected one bundle manifest in {root_dir}, found {manifests}. Skipping manifest update. ")
+        return
+    manifest_path = os.path.join(root_dir, manifests[0])
+    tree = ET.parse(manifest_path)
+    for tag, child_tag, values in (("Policies", "Policy", policies), ("Resources", "Resource", resources)):
+        element = tree.getroot().find(tag)
+        if element is None:
+            continue
+        for child in list(element):
+            element.remove(child)
+        for value in values:
+            ET.SubElement(element, child_tag).text = value
+    tree.write(manifest_path, encoding="UTF-8", xml_declaration=True)
+
+
+def _flow_files(root_dir):
+    for flow_dir in FLOW_DIRS:
+        path = os.path.join(root_dir, flow_dir)
+        if os.path.isdir(path):
+            for file_name in sorted(os.listdir(path)):
+                if file_name.endswith(".xml"):
+                    yield os.path.join(path, file_name)
+
+
+def _xml_files(root_dir):
+    """
+    Yields the manifest, policy and flow XML files (resources are left alone).
+    """
+    for file_name in sorted(os.listdir(root_dir)):
+        if file_name.endswith(".xml"):
+            yield os.path.join(root_dir, file_name)
+    policies_dir = os.path.join(root_dir, "policies")
+    if os.path.isdir(policies_dir):
+        for file_name in sorted(os.listdir(policies_dir)):
+            if file_name.endswith(".xml"):
+                yield os.path.join(policies_dir, file_name)
+    yield from _flow_files(root_dir)
+
+
+def _tree_size(path):
+    return sum(os.path.getsize(os.path.join(dirpath, f)) for dirpath, _, files in os.walk(path) for f in files)
@@ -0,0 +1,194 @@
+import os
+import zipfile
+import xmltodict
+
+BUNDLE_ROOTS = ("apiproxy", "sharedflowbundle")
+
+# Directories (below the bundle root) holding endpoint / sharedflow definitions
+FLOW_DIRS = ("proxies", "targets", "sharedflows")
+
+# Default location of the sharedflows checked into this repository
+DEFAULT_SHAREDFLOWS_DIR = os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "..", "..", "sharedflows"))
+
+
+def as_list(value):
+    """
+    Normalizes an xmltodict value that may be missing, a single item or a list.
+    """
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    return [value]
+
+
+def parse_xml(content):
+    """
+    Parses XML content (str or bytes) with xmltodict.
+    """
+    return xmltodict.parse(content)
+
+
+def sharedflow_dir(sharedflows_dir, sharedflow_name):
+    """
+    Returns the path of a sharedflow in a 'sharedflows/' style directory.
+    """
+    return os.path.join(sharedflows_dir, sharedflow_name)
+
+
+class BundleFiles:
+    """
+    Read-only view over the files of an API proxy or sharedflow bundle.
+
+    The bundle can be an extracted directory (containing 'apiproxy' or
+    'sharedflowbundle', or being that folder itself) or a ZIP file. Paths are
+    always relative to the bundle root and use '/' as separator.
+    """
+
+    def __init__(self, path):
+        """
+        Parameters:
+            path (str): Bundle directory or ZIP file.
+
+        Raises:
+            FileNotFoundError: If the path does not exist.
+            ValueError: If no 'apiproxy' or 'sharedflowbundle' root can be found.
+        """
+        self.path = path
+        self._files = {}
+
+        if os.path.isfile(path):
+            with zipfile.ZipFile(path, 'r') as zip_ref:
+                for info in zip_ref.infolist():
+                    if not info.is_dir():
+                        self._files[info.filename] = zip_ref.read(info)
+        elif os.path.isdir(path):
+            base = path
+            if os.path.basename(os.path.normpath(path)) in BUNDLE_ROOTS:
+                base = os.path.dirname(os.path.normpath(path))
+            for dirpath, _, filenames in os.walk(base):
+                for filename in filenames:
+                    full_path = os.path.join(dirpath, filename)
+                    rel_path = os.path.relpath(full_path, base).replace(os.sep, "/")
+                    if rel_path.split("/", 1)[0] in BUNDLE_ROOTS:
+                        with open(full_path, "rb") as f:
+                            self._files[rel_path] = f.read()
+        else:
+            raise FileNotFoundError(f"Bundle not found: {path}")
+
+        roots = {name.split("/", 1)[0] for name in self._files} & set(BUNDLE_ROOTS)
+        if len(roots) != 1:
+            raise ValueError(f"Expected exactly one of {BUNDLE_ROOTS} in {path}, found {sorted(roots)}")
+        self.root = roots.pop()
+        self.kind = "proxy" if self.root == "apiproxy" else "sharedflow"
+        prefix = self.root + "/"
+        self._files = {name[len(prefix):]: data for name, data in self._files.items() if name.startswith(prefix)}
+
+    def names(self):
+        """
+        Returns all file paths relative to the bundle root.
+        """
+        return sorted(self._files)
+
+    def exists(self, rel_path):
+        return rel_path in self._files
+
+    def read(self, rel_path):
+        """
+        Returns the raw bytes of a file relative to the bundle root.
+        """
+        return self._files[rel_path]
+
+    def parse(self, rel_path):
+        """
+        Returns a file relative to the bundle root parsed with xmltodict.
+        """
+        return parse_xml(self._files[rel_path])
+
+    def manifest_name(self):
+        """
+        Returns the path of the top level bundle manifest (e.g. 'SF-spitfire-pre.xml'), or None.
+        """
+        manifests = [name for name in self._files if "/" not in name and name.endswith(".xml")]
+        return manifests[0] if len(manifests) == 1 else None
+
+    def flow_files(self, flow_dir=None):
+        """
+        Returns the XML files holding endpoints or sharedflows.
+
+        Parameters:
+            flow_dir (str, optional): Restrict to one of 'proxies', 'targets' or 'sharedflows'.
+        """
+        dirs = (flow_dir,) if flow_dir else FLOW_DIRS
+        return [name for name in self.names()
+                if name.endswith(".xml") and name.split("/", 1)[0] in dirs and name.count("/") == 1]
+
+    def policy_files(self):
+        """
+        Returns a dict of policy file name (without '.xml') to path.
+        """
+        return {os.path.splitext(name.split("/", 1)[1])[0]: name for name in self.names()
+                if name.startswith("policies/") and name.endswith(".xml") and name.count("/") == 1}
+
+    def read_policy(self, policy_name):
+        """
+        Reads a policy by name.
+
+        Returns:
+            tuple: (policy type, policy dict), or (None, None) if the policy file does not exist.
+        """
+        rel_path = f"policies/{policy_name}.xml"
+        if rel_path not in self._files:
+            return None, None
+        policy_dict = self.parse(rel_path)
+        policy_type = next(iter(policy_dict))
+        return policy_type, policy_dict[policy_type] or {}
+
+
+def flow_steps(flow_element, phase=None):
+    """
+    Returns the steps of a PreFlow/Flow/PostFlow element or of a SharedFlow.
+
+    Parameters:
+        flow_element (dict): The xmltodict element.
+        phase (str, optional): 'Request' or 'Response'. None for SharedFlow elements,
+            which hold their steps directly.
+
+    Returns:
+        list: A list of (step name, condition or None) tuples in document order.
+    """
+    if not flow_element:
+        return []
+    container = flow_element if phase is None else (flow_element.get(phase) or {})
+    if not isinstance(container, dict):
+        return []
+    return [(step.get('Name'), step.get('Condition')) for step in as_list(container.get('Step')) if step]
+
+
+def iter_step_names(element):
+    """
+    Yields every step name referenced anywhere in an xmltodict element
+    (flows, fault rules, default fault rules, ...).
+    """
+    if isinstance(element, dict):
+        for key, value in element.items():
+            if key == 'Step':
+                for step in as_list(value):
+                    if isinstance(step, dict) and step.get('Name'):
+                        yield step['Name']
+            else:
+                yield from iter_step_names(value)
+    elif isinstance(element, list):
+        for item in element:
+            yield from iter_step_names(item)
+
+
+def flow_callout_target(policy_dict):
+    """
+    Returns the sharedflow name referenced by a FlowCallout policy dict.
+    """
+    target = policy_dict.get('SharedFlowBundle') if policy_dict else None
+    if isinstance(target, dict):
+        target = target.get('#text')
+    return target.strip() if target else None
@@ -0,0 +1,148 @@
+import argparse
+import json
+import logging
+import os
+import sys
+
+from xml.parsers.expat import ExpatError
+
+from bundle_utils import BundleFiles, DEFAULT_SHAREDFLOWS_DIR, as_list, flow_callout_target, iter_step_names
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,  # Set default log level (can be changed)
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+
+def local_sharedflows(sharedflows_dir=DEFAULT_SHAREDFLOWS_DIR):
+    """
+    Returns the names of the sharedflows in a 'sharedflows/' style directory.
+    """
+    if not sharedflows_dir or not os.path.isdir(sharedflows_dir):
+        return set()
+    return {name for name in os.listdir(sharedflows_dir)
+            if os.path.isdir(os.path.join(sharedflows_dir, name, "sharedflowbundle"))}
+
+
+def _parse_all(bundle, errors):
+    """
+    Parses every XML file of the bundle, recording the malformed ones.
+
+    Returns:
+        dict: Path to parsed xmltodict document, for the well-formed files.
+    """
+    parsed = {}
+    for name in bundle.names():
+        if not name.endswith(".xml"):
+            continue
+        try:
+            parsed[name] = bundle.parse(name)
+        except ExpatError as e:
+            errors.append(f"{name}: malformed XML: {e}")
+    return parsed
+
+
+def validate_bundle(bundle_path, known_sharedflows=None):
+    """
+    Checks a proxy or sharedflow bundle locally, reporting every problem in one pass: malformed
+    XML, policies whose name differs from their file or is declared twice, steps naming a missing
+    policy, route rules naming a missing target endpoint and FlowCallouts to unknown sharedflows.
+
+    Parameters:
+        bundle_path (str): Bundle directory or ZIP file.
+        known_sharedflows (set, optional): Sharedflow names FlowCallouts may reference. None skips
+            the FlowCallout check.
+
+    Returns:
+        list: Error messages, empty if the bundle is valid, or None if the bundle could not be read.
+    """
+    try:
+        bundle = BundleFiles(bundle_path)
+    except (FileNotFoundError, ValueError, OSError) as e:
+        logging.error(f" Error: Cannot read bundle {bundle_path}: {e} ")
+        return None
+
+    errors = []
+    parsed = _parse_all(bundle, errors)
+
+    declared = {}
+    policy_types = {}
+    for policy_name, path in sorted(bundle.policy_files().items()):
+        if path not in parsed:
+            policy_types[policy_name] = None
+            continue
+        policy_type, policy = next(iter(parsed[path].items()), (None, None))
+        policy_types[policy_name] = policy_type
+        declared_name = (policy or {}).get('@name') if isinstance(policy, dict) else None
+        if declared_name is None:
+            errors.append(f"{path}: {policy_type} policy has no name attribute")
+            continue
+        if declared_name != policy_name:
+            errors.append(f"{path}: policy name '{declared_name}' does not match the file name")
+        if declared_name in declared:
+            errors.append(f"{path}: duplicate policy name '{declared_name}' (also in {declared[declared_name]})")
+        else:
+            declared[declared_name] = path
+
+    targets = {os.path.splitext(name.split("/", 1)[1])[0] for name in bundle.flow_files("targets")}
+    referenced = set()
+    for flow_file in bundle.flow_files():
+        if flow_file not in parsed:
+            continue
+        for step_name in iter_step_names(parsed[flow_file]):
+            referenced.add(step_name)
+            if step_name not in policy_types:
+                errors.append(f"{flow_file}: step references missing policy '{step_name}'")
+        endpoint = parsed[flow_file].get('ProxyEndpoint') or {}
+        for rule in as_list(endpoint.get('RouteRule')):
+            target = rule.get('TargetEndpoint') if isinstance(rule, dict) else None
+            if target and target not in targets:
+                errors.append(f"{flow_file}: route rule '{rule.get('@name')}' references missing target endpoint '{target}'")
+
+    if known_sharedflows is not None:
+        for policy_name in sorted(referenced):
+            if policy_types.get(policy_name) != 'FlowCallout':
+                continue
+            policy = parsed[bundle.policy_files()[policy_name]]['FlowCallout']
+            target = flow_callout_target(policy)
+            if not target:
+                errors.append(f"policies/{policy_name}.xml: FlowCallout has no SharedFlowBundle")
+            elif target not in known_sharedflows:
+                errors.append(f"policies/{policy_name}.xml: FlowCallout references unknown sharedflow '{target}'")
+    return errors
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Validate a proxy or sharedflow bundle locally, without the Apigee validate API.")
+    parser.add_argument("--bundle", required=True, help="Bundle directory or ZIP file")
+    parser.add_argument("--sharedflows_dir", default=DEFAULT_SHAREDFLOWS_DIR,
+                        help="Directory of the sharedflows FlowCallouts may reference (default: the repository's sharedflows)")
+    parser.add_argument("--sharedflows", default="", help="Comma separated list of further sharedflow names deployed in the org")
+    parser.add_argument("--skip_sharedflow_check", action='store_true', default=False, help="Do not check FlowCallout targets")
+    parser.add_argument("--output", default="", help="Write the errors as JSON to this file")
+
+    args = parser.parse_args()
+
+    known_sharedflows = None
+    if not args.skip_sharedflow_check:
+        known_sharedflows = local_sharedflows(args.sharedflows_dir) | {name.strip() for name in args.sharedflows.split(",") if name.strip()}
+
+    errors = validate_bundle(args.bundle, known_sharedflows)
+    if errors is None:
+        sys.exit(1)
+    for error in errors:
+        logging.error(error)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"bundle": args.bundle, "errors": errors}, f, indent=2)
+        logging.info(f"Report written to {args.output}")
+    if errors:
+        logging.error(f"Bundle validation found {len(errors)} error(s).")
+        sys.exit(1)
+    logging.info("Bundle is valid.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+import argparse
+import csv
+import functools
+import json
+import logging
+import os
+import sys
+
+import xmltodict
+
+from bundle_utils import as_list
+from latency_model import ConditionError, parse_condition
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,  # Set default log level (can be changed)
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+# Accepted column names of the traffic profile CSV (case-insensitive)
+OPERATION_COLUMNS = ("operation", "operationid", "flow", "flow_name", "proxy_flow_name", "api_operation")
+COUNT_COLUMNS = ("count", "request_count", "requests", "message_count", "sum(message_count)", "traffic")
+
+PATH_OPS = ("matchespath", "~/")
+VERB_OPS = ("=", "==", "equals", "is", ":=", "equalsignorecase")
+
+
+def load_traffic_profile(csv_path):
+    """
+    Reads an analytics export of operation (flow name) and request count.
+
+    The columns are found by name (e.g. 'operation'/'flow_name' and 'count'/'request_count');
+    without a recognized header the first two columns are used. Repeated operations are summed.
+
+    Returns:
+        dict: Operation name to request count.
+
+    Raises:
+        ValueError: If a count is not a number.
+    """
+    with open(csv_path, "r", newline="") as f:
+        rows = [row for row in csv.reader(f) if row and any(cell.strip() for cell in row)]
+    if not rows:
+        return {}
+    header = [cell.strip().lower() for cell in rows[0]]
+    name_col = next((header.index(c) for c in OPERATION_COLUMNS if c in header), None)
+    count_col = next((header.index(c) for c in COUNT_COLUMNS if c in header), None)
+    if name_col is None or count_col is None:
+        name_col, count_col = 0, 1
+        try:
+            float(rows[0][1])
+        except (IndexError, ValueError):
+            rows = rows[1:]  # An unrecognized header
+    else:
+        rows = rows[1:]
+
+    traffic = {}
+    for row in rows:
+        try:
+            count = float(row[count_col].replace(",", "")) if row[count_col].strip() else 0.0
+        except (IndexError, ValueError):
+            raise ValueError(f"Invalid request count in traffic profile row: {row}")
+        name = row[name_col].strip()
+        traffic[name] = traffic.get(name, 0.0) + count
+    return traffic
+
+
+def flow_route(condition):
+    """
+    Reduces a flow condition to the request paths and verb it can match.
+
+    Returns:
+        tuple: (path segments or None for any path, verb or None for any verb), or None if the
+        condition uses anything other than an and-ed proxy.pathsuffix MatchesPath and request.verb
+        check. Such flows are treated as overlapping every other flow.
+    """
+    if not condition or not condition.strip():
+        return (None, None)  # No condition: matches every request
+    try:
+        node = parse_condition(condition)
+    except ConditionError:
+        return None
+    terms = node[1] if node[0] == "and" else [node]
+    path, verb = None, None
+    for term in terms:
+        if term[0] != "cmp":
+            return None
+        _, op, left, right = term
+        if left[0] == "lit" and right[0] == "var":
+            left, right = right, left
+        if left[0] != "var" or right[0] != "lit":
+            return None
+        if left[1].lower() == "proxy.pathsuffix" and op in PATH_OPS and path is None:
+            path = tuple(segment for segment in right[1].strip().split("/") if segment)
+        elif left[1].lower() == "request.verb" and op in VERB_OPS and verb is None:
+            verb = right[1].upper()
+        else:
+            return None
+    return (path, verb)
+
+
+def _segment(segment):
+    # Partial wildcards such as 'v*' are treated as '*'
+    return "*" if "*" in segment and segment != "**" else segment
+
+
+def paths_overlap(a, b):
+    """
+    Returns True if some request path matches both MatchesPath patterns, given as segments,
+    where '*' matches one segment and '**' any number of segments.
+    """
+    a, b = tuple(map(_segment, a)), tuple(map(_segment, b))
+
+    @functools.lru_cache(maxsize=None)
+    def match(i, j):
+        if i == len(a) and j == len(b):
+            return True
+        if i < len(a) and a[i] == "**":
+            return match(i + 1, j) or (j < len(b) and match(i, j + 1))
+        if j < len(b) and b[j] == "**":
+            return match(i, j + 1) or (i < len(a) and match(i + 1, j))
+        if i == len(a) or j == len(b):
+            return False
+        return (a[i] == "*" or b[j] == "*" or a[i] == b[j]) and match(i + 1, j + 1)
+
+    return match(0, 0)
+
+
+def routes_overlap(route_a, route_b):
+    """
+    Returns True if a request could match both flows, so their relative order matters.
+    """
+    if route_a is None or route_b is None:
+        return True
+    (path_a, verb_a), (path_b, verb_b) = route_a, route_b
+    if verb_a and verb_b and verb_a != verb_b:
+        return False
+    if path_a is None or path_b is None:
+        return True
+    return paths_overlap(path_a, path_b)
+
+
+def expected_evaluations(order, traffic):
+    """
+    Expected number of flow conditions evaluated per request: a request for the flow at
+    position p evaluates p conditions; requests for operations without a flow evaluate all.
+    """
+    total = sum(traffic.values())
+    if not total:
+        return 0.0
+    positions = {name: i + 1 for i, name in enumerate(order)}
+    return sum(count * positions.get(name, len(order)) for name, count in traffic.items()) / total
+
+
+def plan_order(flows, traffic):
+    """
+    Greedy topological reorder. Flows whose patterns can match the same request keep their
+    relative order, so routing is unchanged. Each step picks the unplaced flow whose
+    not-yet-placed overlapping predecessors, together with the flow itself, carry the most
+    requests per flow, and places that group in document order. A hot flow stuck behind a
+    cold overlapping one thus moves up together with it.
+
+    Parameters:
+        flows (list): (flow name, condition) tuples in document order.
+        traffic (dict): Flow name to request count.
+
+    Returns:
+        list: Indexes into flows in the new order.
+    """
+    routes = [flow_route(condition) for _, condition in flows]
+    blockers = [{j for j in range(i) if routes_overlap(routes[j], routes[i])} for i in range(len(flows))]
+    weights = [traffic.get(name, 0.0) for name, _ in flows]
+    placed, order = set(), []
+
+    def closure(i):
+        group, pending = {i}, [i]
+        while pending:
+            for j in blockers[pending.pop()] - placed - group:
+                group.add(j)
+                pending.append(j)
+        return group
+
+    while len(order) < len(flows):
+        best_group, best_key = None, None
+        for i in range(len(flows)):
+            if i in placed:
+                continue
+            group = closure(i)
+            key = (sum(weights[j] for j in group) / len(group), -min(group))
+            if best_key is None or key > best_key:
+                best_group, best_key = group, key
+        order.extend(sorted(best_group))
+        placed |= best_group
+    return order
+
+
+def reorder_proxy_flows(bundle_dir, traffic, dry_run=False):
+    """
+    Reorders the conditional flows of every proxy endpoint of an extracted bundle by traffic.
+
+    Parameters:
+        bundle_dir (str): Path to the extracted bundle directory.
+        traffic (dict): Operation (flow) name to request count.
+        dry_run (bool): Only compute the report.
+
+    Returns:
+        dict: Per endpoint file {'before', 'after', 'order', 'moved', 'unmatched_traffic'}, or None on error.
+    """
+    proxies_dir = os.path.join(bundle_dir, "apiproxy", "proxies")
+    report = {}
+    try:
+        for file_name in sorted(os.listdir(proxies_dir)):
+            if not file_name.endswith(".xml"):
+                continue
+            proxy_xml_path = os.path.join(proxies_dir, file_name)
+            with open(proxy_xml_path, "r") as f:
+                proxy_dict = xmltodict.parse(f.read())
+            endpoint = proxy_dict.get('ProxyEndpoint') or {}
+            flows = as_list((endpoint.get('Flows') or {}).get('Flow'))
+            if len(flows) < 2:
+                continue
+            names = [flow.get('@name') for flow in flows]
+            order = plan_order([(flow.get('@name'), flow.get('Condition')) for flow in flows], traffic)
+            new_names = [names[i] for i in order]
+            report[file_name] = {
+                "before": round(expected_evaluations(names, traffic), 3),
+                "after": round(expected_evaluations(new_names, traffic), 3),
+                "order": new_names,
+                "moved": sum(1 for i, j in enumerate(order) if i != j),
+                "unmatched_traffic": sorted(name for name in traffic if name not in names),
+            }
+            if dry_run or order == list(range(len(flows))):
+                continue
+            endpoint['Flows']['Flow'] = [flows[i] for i in order]
+            with open(proxy_xml_path, "w") as f:
+                f.write(xmltodict.unparse(proxy_dict, pretty=True))
+            logging.info(f" Reordered {report[file_name]['moved']} flow(s) in {proxy_xml_path} ")
+        return report
+    except FileNotFoundError:
+        logging.error(f" Error: Proxy directory not found: {proxies_dir} ")
+        return None
+    except Exception as e:
+        logging.exception(" An error occurred while reordering flows ")
+        return None
+
+
+def print_report(report):
+    for file_name, result in report.items():
+        print(f"{file_name}: expected condition evaluations per request {result['before']:.2f} -> {result['after']:.2f} "
+              f"({result['moved']} flow(s) moved)")
+        if result["unmatched_traffic"]:
+            print(f"  traffic for operations without a flow (evaluates every condition): {result['unmatched_traffic']}")
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Reorder the conditional flows of an extracted proxy bundle by traffic.")
+    parser.add_argument("--bundle_dir", required=True, help="Extracted proxy bundle directory (containing 'apiproxy')")
+    parser.add_argument("--traffic_profile", required=True, help="Analytics CSV of operation (flow name) and request count")
+    parser.add_argument("--dry_run", action='store_true', default=False, help="Only report the expected evaluations, do not rewrite")
+    parser.add_argument("--output", default="", help="Write the JSON report to this file")
+
+    args = parser.parse_args()
+
+    try:
+        traffic = load_traffic_profile(args.traffic_profile)
+    except (OSError, ValueError) as e:
+        logging.error(f"Could not read traffic profile: {e}")
+        sys.exit(1)
+
+    report = reorder_proxy_flows(args.bundle_dir, traffic, dry_run=args.dry_run)
+    if report is None:
+        sys.exit(1)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        logging.info(f"Report written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,544 @@
+import argparse
+import itertools
+import json
+import logging
+import os
+import re
+import sys
+
+from bundle_utils import (BundleFiles, DEFAULT_SHAREDFLOWS_DIR, as_list, flow_callout_target,
+                          flow_steps, sharedflow_dir)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,  # Set default log level (can be changed)
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+# Estimated cost (ms) of executing one policy of a given type. Override with --costs.
+DEFAULT_POLICY_COSTS_MS = {
+    "ServiceCallout": 40.0,
+    "Javascript": 3.0,
+    "JavaCallout": 3.0,
+    "Script": 3.0,
+    "KeyValueMapOperations": 2.0,
+    "LookupCache": 1.5,
+    "PopulateCache": 1.5,
+    "InvalidateCache": 1.5,
+    "VerifyJWT": 2.0,
+    "DecodeJWT": 0.5,
+    "FlowCallout": 0.2,
+    "AssignMessage": 0.2,
+    "ExtractVariables": 0.2,
+    "RaiseFault": 0.2,
+    "CORS": 0.2,
+}
+DEFAULT_COST_MS = 0.5
+
+# Policy types reported as separate counters
+COUNTED_TYPES = {
+    "service_callouts": ("ServiceCallout",),
+    "javascript": ("Javascript", "JavaCallout", "Script"),
+    "kvm_reads": ("KeyValueMapOperations",),
+}
+
+# Operators whose truth only depends on the variable being equal to a literal
+EQUALITY_OPS = {"=": "eq", "==": "eq", "equals": "eq", "is": "eq",
+                "!=": "ne", "notequals": "ne", "isnot": "ne",
+                ":=": "ieq", "equalsignorecase": "ieq"}
+OTHER_OPS = {"~/", "matchespath", "~", "matches", "like", "~~", "javaregex", "=|", "startswith",
+             ">", "<", ">=", "<=", "greaterthan", "lessthan", "greaterthanorequals", "lessthanorequals"}
+KEYWORDS = {"and": "and", "&&": "and", "or": "or", "||": "or", "not": "not", "!": "not"}
+
+TOKEN_RE = re.compile(r'\s*(?:("(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\')|(\(|\))|(!=|==|:=|>=|<=|=\||~~|~/|&&|\|\||[=~<>!])|([^\s()"\'=!<>~:|&]+))')
+
+
+class ConditionError(ValueError):
+    pass
+
+
+def parse_condition(text):
+    """
+    Parses an Apigee flow condition into a small AST.
+
+    Nodes are tuples: ('and', [nodes]), ('or', [nodes]), ('not', node),
+    ('cmp', op, left, right) and ('truthy', operand), where operands are
+    ('var', name) or ('lit', value).
+
+    Raises:
+        ConditionError: If the condition cannot be parsed.
+    """
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = TOKEN_RE.match(text, pos)
+        if not match or match.end() == pos:
+            raise ConditionError(f"Cannot tokenize condition at offset {pos}: {text!r}")
+        pos = match.end()
+        string, paren, symbol, word = match.groups()
+        if string is not None:
+            tokens.append(("lit", string[1:-1]))
+        elif paren is not None:
+            tokens.append(("paren", paren))
+        elif symbol is not None:
+            tokens.append(("op", symbol))
+        elif word is not None:
+            tokens.append(("word", word))
+
+    parser = _ConditionParser(tokens, text)
+    node = parser.parse_or()
+    if parser.pos != len(tokens):
+        raise ConditionError(f"Unexpected token {tokens[parser.pos][1]!r} in condition: {text!r}")
+    return node
+
+
+class _ConditionParser:
+
+    def __init__(self, tokens, text):
+        self.tokens = tokens
+        self.text = text
+        self.pos = 0
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def _keyword(self):
+        kind, value = self._peek()
+        if kind in ("word", "op"):
+            return KEYWORDS.get(value.lower())
+        return None
+
+    def parse_or(self):
+        nodes = [self.parse_and()]
+        while self._keyword() == "or":
+            self.pos += 1
+            nodes.append(self.parse_and())
+        return nodes[0] if len(nodes) == 1 else ("or", nodes)
+
+    def parse_and(self):
+        nodes = [self.parse_not()]
+        while self._keyword() == "and":
+            self.pos += 1
+            nodes.append(self.parse_not())
+        return nodes[0] if len(nodes) == 1 else ("and", nodes)
+
+    def parse_not(self):
+        if self._keyword() == "not":
+            self.pos += 1
+            return ("not", self.parse_not())
+        return self.parse_primary()
+
+    def parse_primary(self):
+        kind, value = self._peek()
+        if kind == "paren" and value == "(":
+            self.pos += 1
+            node = self.parse_or()
+            if self._peek() != ("paren", ")"):
+                raise ConditionError(f"Missing ')' in condition: {self.text!r}")
+            self.pos += 1
+            return node
+
+        left = self._operand()
+        kind, value = self._peek()
+        op = value.lower() if kind in ("op", "word") and value is not None else None
+        if op in EQUALITY_OPS or op in OTHER_OPS:
+            self.pos += 1
+            return ("cmp", op, left, self._operand())
+        return ("truthy", left)
+
+    def _operand(self):
+        kind, value = self._peek()
+        if kind == "lit":
+            self.pos += 1
+            return ("lit", value)
+        if kind == "word":
+            self.pos += 1
+            if value.lower() in ("true", "false", "null") or re.fullmatch(r"-?\d+(\.\d+)?", value):
+                return ("lit", value.lower() if value.lower() in ("true", "false", "null") else value)
+            return ("var", value)
+        raise ConditionError(f"Expected operand, found {value!r} in condition: {self.text!r}")
+
+
+def _atom_key(node):
+    return repr(node)
+
+
+def collect_domains(node, variables, atoms):
+    """
+    Collects the literals each variable is compared with (variables) and the
+    keys of conditions that are treated as free booleans (atoms).
+    """
+    kind = node[0]
+    if kind in ("and", "or"):
+        for child in node[1]:
+            collect_domains(child, variables, atoms)
+    elif kind == "not":
+        collect_domains(node[1], variables, atoms)
+    elif kind == "cmp":
+        _, op, left, right = node
+        if left[0] == "lit" and right[0] == "var":
+            left, right = right, left
+        if op in EQUALITY_OPS and left[0] == "var" and right[0] == "lit":
+            variables.setdefault(left[1], set()).add(right[1])
+        else:
+            atoms.add(_atom_key(node))
+    elif kind == "truthy":
+        if node[1][0] == "var":
+            variables.setdefault(node[1][1], set()).add("true")
+        else:
+            atoms.add(_atom_key(node))
+
+
+def evaluate(node, scenario):
+    """
+    Evaluates a condition AST against a scenario.
+
+    Parameters:
+        node (tuple): The condition AST.
+        scenario (dict): {'vars': {name: value or None}, 'atoms': {key: bool}}.
+            Unset variables compare unequal to every literal, unknown atoms are False.
+    """
+    kind = node[0]
+    if kind == "and":
+        return all(evaluate(child, scenario) for child in node[1])
+    if kind == "or":
+        return any(evaluate(child, scenario) for child in node[1])
+    if kind == "not":
+        return not evaluate(node[1], scenario)
+    if kind == "cmp":
+        _, op, left, right = node
+        if left[0] == "lit" and right[0] == "var":
+            left, right = right, left
+        if op in EQUALITY_OPS and left[0] == "var" and right[0] == "lit":
+            value = scenario['vars'].get(left[1])
+            mode = EQUALITY_OPS[op]
+            if mode == "ieq":
+                return value is not None and value.lower() == right[1].lower()
+            equal = value is not None and value == right[1]
+            return equal if mode == "eq" else not equal
+        return scenario['atoms'].get(_atom_key(node), False)
+    if kind == "truthy":
+        if node[1][0] == "var":
+            value = scenario['vars'].get(node[1][1])
+            return value not in (None, "", "false")
+        return scenario['atoms'].get(_atom_key(node), False)
+    raise ConditionError(f"Unknown condition node: {node!r}")
+
+
+class LatencyCostModel:
+    """
+    Static per-request cost model for API proxies and sharedflows.
+
+    Expands every proxy flow into the ordered list of policies a request can run
+    (proxy and target PreFlow/Flow/PostFlow and the sharedflows pulled in by
+    FlowCallouts, recursively) and evaluates the step conditions to get the
+    'typical' path (for a set of assumed variable values) and the worst-case
+    path (the most expensive consistent assignment of the condition variables).
+    """
+
+    def __init__(self, sharedflows_dir=DEFAULT_SHAREDFLOWS_DIR, costs=None, max_scenarios=4096):
+        """
+        Parameters:
+            sharedflows_dir (str): Directory holding '<sharedflow>/sharedflowbundle' folders.
+            costs (dict, optional): {'types': {policy type: ms}, 'policies': {policy name: ms},
+                'default': ms} overriding the default costs.
+            max_scenarios (int): Upper bound on condition assignments enumerated per flow.
+                Beyond it every conditional step is counted for the worst case.
+        """
+        self.sharedflows_dir = sharedflows_dir
+        costs = costs or {}
+        self.type_costs = dict(DEFAULT_POLICY_COSTS_MS, **costs.get('types', {}))
+        self.policy_costs = dict(costs.get('policies', {}))
+        self.default_cost = costs.get('default', DEFAULT_COST_MS)
+        self.max_scenarios = max_scenarios
+        self._sharedflows = {}
+
+    def analyze(self, bundle_path, assumptions=None):
+        """
+        Analyzes a built proxy bundle or a sharedflow.
+
+        Parameters:
+            bundle_path (str): Bundle directory or ZIP file.
+            assumptions (dict, optional): Variable values of the typical request.
+
+        Returns:
+            dict: {'bundle': name, 'kind': kind, 'flows': {flow: {'typical': {...}, 'worst_case': {...}}}}
+        """
+        bundle = BundleFiles(bundle_path)
+        if bundle.kind == "sharedflow":
+            flows = {"default": self._expand_steps(bundle, flow_steps(self._sharedflow_root(bundle)), (), set())}
+        else:
+            flows = self._expand_proxy(bundle)
+
+        manifest = bundle.manifest_name()
+        report = {
+            "bundle": os.path.splitext(manifest)[0] if manifest else os.path.basename(os.path.normpath(bundle_path)),
+            "kind": bundle.kind,
+            "flows": {},
+        }
+        for flow_name, steps in flows.items():
+            report["flows"][flow_name] = {
+                "typical": self._run(steps, {'vars': dict(assumptions or {}), 'atoms': {}}),
+                "worst_case": self._worst_case(steps),
+            }
+        return report
+
+    def _expand_proxy(self, bundle):
+        """
+        Returns {flow name: expanded steps} for every conditional flow of every proxy endpoint.
+        """
+        target_steps = self._expand_target(bundle)
+        flows = {}
+        for proxy_file in bundle.flow_files("proxies"):
+            endpoint = bundle.parse(proxy_file).get('ProxyEndpoint') or {}
+            pre, post = endpoint.get('PreFlow'), endpoint.get('PostFlow')
+            post_client = endpoint.get('PostClientFlow')
+            conditional_flows = as_list((endpoint.get('Flows') or {}).get('Flow'))
+            if not conditional_flows:
+                conditional_flows = [{'@name': '(no conditional flow)'}]
+
+            for flow in conditional_flows:
+                raw = (flow_steps(pre, 'Request') + flow_steps(flow, 'Request') + flow_steps(post, 'Request'))
+                steps = self._expand_steps(bundle, raw, (), set())
+                steps += target_steps
+                raw = (flow_steps(pre, 'Response') + flow_steps(flow, 'Response')
+                       + flow_steps(post, 'Response') + flow_steps(post_client, 'Response'))
+                steps += self._expand_steps(bundle, raw, (), set())
+                name = flow.get('@name')
+                if len(bundle.flow_files("proxies")) > 1:
+                    name = f"{os.path.splitext(os.path.basename(proxy_file))[0]}/{name}"
+                flows[name] = steps
+        return flows
+
+    def _expand_target(self, bundle):
+        """
+        Expands the request and response steps of the default target endpoint.
+        """
+        targets = bundle.flow_files("targets")
+        if not targets:
+            return []
+        target_file = "targets/default.xml" if "targets/default.xml" in targets else targets[0]
+        endpoint = bundle.parse(target_file).get('TargetEndpoint') or {}
+        pre, post = endpoint.get('PreFlow'), endpoint.get('PostFlow')
+        raw = (flow_steps(pre, 'Request') + flow_steps(post, 'Request')
+               + flow_steps(pre, 'Response') + flow_steps(post, 'Response'))
+        return self._expand_steps(bundle, raw, (), set())
+
+    def _sharedflow_root(self, bundle):
+        flow_file = "sharedflows/default.xml"
+        if not bundle.exists(flow_file):
+            flow_file = bundle.flow_files("sharedflows")[0]
+        return bundle.parse(flow_file).get('SharedFlow') or {}
+
+    def _load_sharedflow(self, name):
+        if name not in self._sharedflows:
+            try:
+                self._sharedflows[name] = BundleFiles(sharedflow_dir(self.sharedflows_dir, name))
+            except (FileNotFoundError, ValueError) as e:
+                logging.warning(f" Sharedflow '{name}' could not be resolved in {self.sharedflows_dir}: {e} ")
+                self._sharedflows[name] = None
+        return self._sharedflows[name]
+
+    def _expand_steps(self, bundle, raw_steps, parent_conditions, visiting):
+        """
+        Resolves policies and FlowCallouts into a flat list of step dicts.
+
+        Each step dict holds 'name', 'type', 'cost', 'conditions' (ASTs that must all hold)
+        and 'source' (the bundle it comes from).
+        """
+        expanded = []
+        source = os.path.splitext(bundle.manifest_name() or bundle.root)[0]
+        for name, condition in raw_steps:
+            conditions = parent_conditions
+            if condition:
+                try:
+                    conditions = parent_conditions + (parse_condition(condition),)
+                except ConditionError as e:
+                    logging.warning(f" {e}. Treating it as an independent condition. ")
+                    conditions = parent_conditions + (("cmp", "~", ("lit", condition), ("lit", "")),)
+
+            policy_type, policy = bundle.read_policy(name)
+            if policy_type is None:
+                logging.warning(f" Policy '{name}' referenced in {source} does not exist ")
+                continue
+            enabled = str(policy.get('@enabled', 'true')).lower() != 'false'
+            cost = self.policy_costs.get(name, self.type_costs.get(policy_type, self.default_cost))
+            expanded.append({
+                "name": name,
+                "type": policy_type,
+                "cost": cost if enabled else 0.0,
+                "enabled": enabled,
+                "conditions": conditions,
+                "source": source,
+            })
+
+            if policy_type == "FlowCallout" and enabled:
+                target = flow_callout_target(policy)
+                if target in visiting:
+                    logging.warning(f" Circular FlowCallout to '{target}' ignored ")
+                    continue
+                sharedflow = self._load_sharedflow(target) if target else None
+                if sharedflow is not None:
+                    expanded.extend(self._expand_steps(
+                        sharedflow, flow_steps(self._sharedflow_root(sharedflow)),
+                        conditions, visiting | {target}))
+        return expanded
+
+    def _run(self, steps, scenario):
+        """
+        Walks the steps for one scenario and sums up the executed policies.
+        """
+        result = {"steps": 0, "latency_ms": 0.0, "faulted": False, "policies": []}
+        for key in COUNTED_TYPES:
+            result[key] = 0
+        for step in steps:
+            if not step["enabled"] or not all(evaluate(c, scenario) for c in step["conditions"]):
+                continue
+            result["steps"] += 1
+            result["latency_ms"] += step["cost"]
+            result["policies"].append(step["name"])
+            for key, types in COUNTED_TYPES.items():
+                if step["type"] in types:
+                    result[key] += 1
+            if step["type"] == "RaiseFault":
+                result["faulted"] = True
+                break
+        result["latency_ms"] = round(result["latency_ms"], 3)
+        return result
+
+    def _worst_case(self, steps):
+        """
+        Returns the most expensive path over all consistent condition assignments.
+        """
+        variables, atoms = {}, set()
+        for step in steps:
+            for condition in step["conditions"]:
+                collect_domains(condition, variables, atoms)
+
+        names = sorted(variables)
+        domains = [sorted(variables[name]) + [None] for name in names]
+        atom_keys = sorted(atoms)
+        total = 1
+        for domain in domains:
+            total *= len(domain)
+        total *= 2 ** len(atom_keys)
+
+        if total > self.max_scenarios:
+            logging.warning(f" {total} condition assignments exceed --max_scenarios {self.max_scenarios}; "
+                            "counting every conditional step for the worst case ")
+            return self._run([dict(step, conditions=()) for step in steps if step["type"] != "RaiseFault"],
+                             {'vars': {}, 'atoms': {}})
+
+        worst = None
+        for values in itertools.product(*domains, *([False, True] for _ in atom_keys)):
+            scenario = {
+                'vars': dict(zip(names, values[:len(names)])),
+                'atoms': dict(zip(atom_keys, values[len(names):])),
+            }
+            result = self._run(steps, scenario)
+            if worst is None or (result["latency_ms"], result["steps"]) > (worst["latency_ms"], worst["steps"]):
+                worst = result
+                worst["assumptions"] = {k: v for k, v in scenario['vars'].items() if v is not None}
+        return worst
+
+
+def check_budget(report, max_latency_ms=None, max_service_callouts=None, baseline=None, tolerance_pct=10.0):
+    """
+    Checks a report against absolute limits and an optional baseline report.
+
+    Returns:
+        list: Violation messages. Empty if the budget holds.
+    """
+    violations = []
+    baseline_flows = (baseline or {}).get("flows", {})
+    for flow_name, flow in report["flows"].items():
+        worst = flow["worst_case"]
+        if max_latency_ms is not None and worst["latency_ms"] > max_latency_ms:
+            violations.append(f"{flow_name}: worst-case latency {worst['latency_ms']} ms exceeds {max_latency_ms} ms")
+        if max_service_callouts is not None and worst["service_callouts"] > max_service_callouts:
+            violations.append(f"{flow_name}: {worst['service_callouts']} ServiceCallouts exceed {max_service_callouts}")
+        if flow_name in baseline_flows:
+            for path in ("typical", "worst_case"):
+                before = baseline_flows[flow_name][path]["latency_ms"]
+                after = flow[path]["latency_ms"]
+                if after > before * (1 + tolerance_pct / 100.0):
+                    violations.append(f"{flow_name}: {path} latency regressed from {before} ms to {after} ms "
+                                      f"(tolerance {tolerance_pct}%)")
+    return violations
+
+
+def print_report(report):
+    print(f"Latency budget for {report['kind']} '{report['bundle']}'")
+    header = f"{'Flow':<40} {'path':<10} {'SC':>3} {'JS':>3} {'KVM':>4} {'steps':>6} {'ms':>9}"
+    print(header)
+    print("-" * len(header))
+    for flow_name, flow in report["flows"].items():
+        for path in ("typical", "worst_case"):
+            r = flow[path]
+            print(f"{flow_name:<40} {path:<10} {r['service_callouts']:>3} {r['javascript']:>3} "
+                  f"{r['kvm_reads']:>4} {r['steps']:>6} {r['latency_ms']:>9.1f}")
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Estimate the per-request policy cost of an Apigee proxy or sharedflow.")
+    parser.add_argument("--bundle", required=True, help="Built proxy bundle (directory or ZIP) or sharedflow directory")
+    parser.add_argument("--sharedflows_dir", default=DEFAULT_SHAREDFLOWS_DIR, help="Directory holding the sharedflows resolved by FlowCallouts")
+    parser.add_argument("--costs", default="", help="JSON file with {'types': {...}, 'policies': {...}, 'default': ms} cost overrides")
+    parser.add_argument("--assume", action='append', default=[], help="Variable value of the typical request ('var=value'), repeatable")
+    parser.add_argument("--max_scenarios", type=int, default=4096, help="Maximum condition assignments enumerated per flow")
+    parser.add_argument("--output", default="", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", default="", help="Previous JSON report to compare against")
+    parser.add_argument("--tolerance_pct", type=float, default=10.0, help="Allowed latency increase over the baseline in percent")
+    parser.add_argument("--max_latency_ms", type=float, default=None, help="Fail if any flow's worst-case latency exceeds this")
+    parser.add_argument("--max_service_callouts", type=int, default=None, help="Fail if any flow's worst case runs more ServiceCallouts")
+
+    args = parser.parse_args()
+
+    costs = None
+    if args.costs:
+        with open(args.costs, "r") as f:
+            costs = json.load(f)
+
+    assumptions = {}
+    for item in args.assume:
+        try:
+            key, value = item.split('=', 1)
+            assumptions[key.strip()] = value.strip()
+        except ValueError:
+            logging.error(f"Invalid --assume value: '{item}'. Expected format 'var=value'.")
+            sys.exit(1)
+
+    model = LatencyCostModel(args.sharedflows_dir, costs=costs, max_scenarios=args.max_scenarios)
+    try:
+        report = model.analyze(args.bundle, assumptions)
+    except (FileNotFoundError, ValueError) as e:
+        logging.error(f"Could not analyze bundle: {e}")
+        sys.exit(1)
+
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        logging.info(f"Report written to {args.output}")
+
+    baseline = None
+    if args.baseline:
+        try:
+            with open(args.baseline, "r") as f:
+                baseline = json.load(f)
+        except FileNotFoundError:
+            logging.warning(f"Baseline {args.baseline} not found, skipping regression check.")
+
+    violations = check_budget(report, args.max_latency_ms, args.max_service_callouts, baseline, args.tolerance_pct)
+    if violations:
+        for violation in violations:
+            logging.error(violation)
+        sys.exit(1)
+    logging.info("Latency budget check passed.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,481 @@
+import argparse
+import concurrent.futures
+import csv
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from urllib.parse import quote
+
+import requests
+
+from bundle_utils import BundleFiles, as_list
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,  # Set default log level (can be changed)
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+# The mock/ tooling of this repository (JWT minting, OAS example synthesis)
+DEFAULT_MOCK_DIR = os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "..", "..", "mock"))
+
+HTTP_METHODS = ("get", "put", "post", "delete", "patch", "head", "options")
+
+PERCENTILES = (50, 95, 99)
+
+# Only MatchesPath patterns translate into a request path; JavaRegex (~~) flows are reported as not probed
+MATCHES_PATH_RE = re.compile(r'proxy\.pathsuffix\s+(?:MatchesPath|~/)\s+"([^"]+)"', re.IGNORECASE)
+VERB_RE = re.compile(r'request\.verb\s*(?:=|==|equals)\s*"([^"]+)"', re.IGNORECASE)
+
+
+def import_mock_tooling(mock_dir=DEFAULT_MOCK_DIR):
+    """
+    Makes the mock/ scripts importable.
+
+    Returns:
+        module: The oas_backend module (OAS loading and example synthesis).
+    """
+    if mock_dir not in sys.path:
+        sys.path.insert(0, mock_dir)
+    import oas_backend
+    return oas_backend
+
+
+def _parameter_value(oas, spec, parameter):
+    parameter = oas.resolve_ref(spec, parameter)
+    if "example" in parameter:
+        return parameter["example"]
+    if parameter.get("examples"):
+        example = oas.resolve_ref(spec, next(iter(parameter["examples"].values())))
+        return example.get("value", example)
+    return oas.synthesize(spec, parameter.get("schema", {}), parameter.get("name", "value"))
+
+
+def load_operations(oas_path, mock_dir=DEFAULT_MOCK_DIR):
+    """
+    Builds one probe request per OAS operation, with path, required query and header
+    parameters and request bodies filled from examples or synthesized from schemas.
+
+    Returns:
+        dict: Operation (flow) name to {'method', 'path', 'headers', 'body', 'source'}.
+    """
+    oas = import_mock_tooling(mock_dir)
+    spec = oas.load_oas(oas_path)
+    operations = {}
+    for path, path_item in (spec.get("paths") or {}).items():
+        path_item = oas.resolve_ref(spec, path_item)
+        for method in HTTP_METHODS:
+            operation = path_item.get(method)
+            if not isinstance(operation, dict):
+                continue
+            name = operation.get("operationId") or f"{method.upper()} {path}"
+            concrete_path, query, headers = path, [], {}
+            for parameter in as_list(path_item.get("parameters")) + as_list(operation.get("parameters")):
+                parameter = oas.resolve_ref(spec, parameter)
+                value = _parameter_value(oas, spec, parameter)
+                if parameter.get("in") == "path":
+                    concrete_path = concrete_path.replace("{" + parameter["name"] + "}", quote(str(value), safe=""))
+                elif parameter.get("in") == "query" and parameter.get("required"):
+                    query.append(f"{quote(parameter['name'])}={quote(str(value))}")
+                elif parameter.get("in") == "header" and parameter.get("required") \
+                        and parameter["name"].lower() != "authorization":
+                    headers[parameter["name"]] = str(value)
+            concrete_path = re.sub(r"\{[^}]+\}", "1", concrete_path)
+            body = None
+            content = oas.resolve_ref(spec, operation.get("requestBody", {})).get("content", {})
+            if content:
+                content_type = next((t for t in content if "json" in t), next(iter(content)))
+                media = content[content_type] or {}
+                body = media.get("example")
+                if body is None:
+                    body = oas.synthesize(spec, media.get("schema", {}))
+                headers["Content-Type"] = content_type if "*" not in content_type else "application/json"
+            operations[name] = {"method": method.upper(), "path": concrete_path + ("?" + "&".join(query) if query else ""),
+                                "headers": headers, "body": body, "source": "oas"}
+    return operations
+
+
+def flow_operations(runner, bundle_dir):
+    """
+    Derives probe requests from the conditions of the proxy flows returned by get_all_flows,
+    for flows that have no OAS operation of the same name.
+
+    Returns:
+        tuple: (dict of flow name to operation, list of flow names whose path could not be derived)
+    """
+    flow_names = runner.get_all_flows(bundle_dir)
+    if flow_names is None:
+        return {}, []
+    proxy = BundleFiles(bundle_dir).parse("proxies/default.xml").get("ProxyEndpoint", {})
+    conditions = {flow.get("@name"): flow.get("Condition") or "" for flow in as_list((proxy.get("Flows") or {}).get("Flow"))}
+    operations, unresolved = {}, []
+    for flow_name in flow_names:
+        path_match = MATCHES_PATH_RE.search(conditions.get(flow_name, ""))
+        verb_match = VERB_RE.search(conditions.get(flow_name, ""))
+        if not path_match:
+            unresolved.append(flow_name)
+            continue
+        path = path_match.group(1).replace("**", "1").replace("*", "1")
+        operations[flow_name] = {"method": verb_match.group(1).upper() if verb_match else "GET", "path": path,
+                                 "headers": {}, "body": None, "source": "flow"}
+    return operations, unresolved
+
+
+def load_tokens(tokens_file):
+    """
+    Reads bearer tokens from a generate_signed_jwt.py bulk output (NDJSON or CSV with a
+    'token' column) or a file with one token per line.
+    """
+    with open(tokens_file, "r", newline="") as f:
+        if tokens_file.endswith(".csv"):
+            return [row["token"] for row in csv.DictReader(f)]
+        tokens = []
+        for line in f:
+            line = line.strip()
+            if line:
+                tokens.append(json.loads(line)["token"] if line.startswith("{") else line)
+        return tokens
+
+
+def mint_tokens(private_key_file, count, claims, lifetime_seconds=3600, mock_dir=DEFAULT_MOCK_DIR):
+    """
+    Mints count distinct tokens with the mock/ JWT tooling, loading the key once.
+    """
+    import_mock_tooling(mock_dir)
+    import jwt
+    from generate_signed_jwt import load_signing_key
+    private_key, key_id, algorithm = load_signing_key(private_key_file)
+    now = int(time.time())
+    tokens = []
+    for i in range(count):
+        payload = dict(claims, iat=now, exp=now + lifetime_seconds, jti=f"probe-{now}-{i}")
+        payload = {key: value.format(n=i) if isinstance(value, str) else value for key, value in payload.items()}
+        tokens.append(jwt.encode(payload, private_key, algorithm=algorithm, headers={"kid": key_id}))
+    return tokens
+
+
+def parse_ok_statuses(spec):
+    """
+    Parses '2xx,304' into status patterns. Raises ValueError on anything but codes and Nxx classes.
+    """
+    patterns = tuple(item.strip().lower() for item in spec.split(",") if item.strip())
+    if not patterns or not all(re.fullmatch(r"[1-5](\d\d|xx)", pattern) for pattern in patterns):
+        raise ValueError(f"Invalid status list: '{spec}'. Expected codes or classes such as '2xx,304'.")
+    return patterns
+
+
+def status_ok(status, ok_statuses=("2xx",)):
+    return any(status == pattern or (pattern.endswith("xx") and status[:1] == pattern[0]) for pattern in ok_statuses)
+
+
+def percentile(samples, pct):
+    if not samples:
+        return None
+    samples = sorted(samples)
+    return round(samples[min(len(samples) - 1, int(len(samples) * pct / 100.0))], 2)
+
+
+def run_probe(base_url, operations, tokens, requests_per_operation=50, concurrency=8, mix=None, warmup=5,
+              timeout=30.0, seed=None, ok_statuses=("2xx",)):
+    """
+    Fires a concurrent, weighted request mix at base_url.
+
+    Parameters:
+        base_url (str): Deployed proxy base path (https://host/basepath) or a local stand-in.
+        operations (dict): Operation name to request, as returned by load_operations.
+        tokens (list): Bearer tokens, used round-robin. May be empty.
+        requests_per_operation (int): Average number of measured requests per operation.
+        concurrency (int): Concurrent connections.
+        mix (dict, optional): Operation name to relative weight (default: equal weights).
+        warmup (int): Unmeasured requests per operation sent first, to warm caches and connections.
+        ok_statuses (tuple): Status patterns (parse_ok_statuses) that are measured; any other status
+            or a timeout counts as an error, so e.g. a wrong base path answering 404 fails the probe.
+
+    Returns:
+        dict: Operation name to {'requests', 'errors', 'statuses', 'p50_ms', 'p95_ms', 'p99_ms', 'mean_ms',
+        'samples_ms'}. The raw samples let later revisions test their percentiles for significance.
+    """
+    names = [name for name in operations if (mix or {}).get(name, 1) > 0]
+    weights = [(mix or {}).get(name, 1) for name in names]
+    rng = random.Random(seed)
+    plan = [name for name in names for _ in range(warmup)]
+    plan += rng.choices(names, weights=weights, k=requests_per_operation * len(names))
+    warmup_count = warmup * len(names)
+    results = {name: {"latencies": [], "statuses": {}, "errors": 0} for name in names}
+    lock = threading.Lock()
+    local = threading.local()
+
+    def send(index, name):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        operation = operations[name]
+        headers = dict(operation["headers"])
+        if tokens:
+            headers["Authorization"] = f"Bearer {tokens[index % len(tokens)]}"
+        body = None if operation["body"] is None else json.dumps(operation["body"])
+        start = time.perf_counter()
+        try:
+            response = session.request(operation["method"], base_url.rstrip("/") + operation["path"], headers=headers,
+                                       data=body, timeout=timeout)
+            response.content
+            status = str(response.status_code)
+        except requests.exceptions.RequestException as e:
+            logging.debug(f"{name}: {e}")
+            status = "error"
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if index < warmup_count:
+            return
+        with lock:
+            result = results[name]
+            result["statuses"][status] = result["statuses"].get(status, 0) + 1
+            if status == "error" or not status_ok(status, ok_statuses):
+                result["errors"] += 1
+            else:
+                result["latencies"].append(elapsed_ms)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        # Warm-up first, then the measured mix
+        list(executor.map(lambda item: send(*item), enumerate(plan[:warmup_count])))
+        list(executor.map(lambda item: send(*item), [(warmup_count + i, name) for i, name in enumerate(plan[warmup_count:])]))
+
+    report = {}
+    for name, result in results.items():
+        latencies = result["latencies"]
+        report[name] = {"requests": len(latencies) + result["errors"], "errors": result["errors"],
+                        "statuses": dict(sorted(result["statuses"].items())),
+                        "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else None}
+        for pct in PERCENTILES:
+            report[name][f"p{pct}_ms"] = percentile(latencies, pct)
+        report[name]["samples_ms"] = [round(latency, 2) for latency in latencies]
+    return report
+
+
+def result_path(results_dir, api_name, revision):
+    # find_baseline only reads <revision>.json; failed runs are stored as <revision>.failed.json
+    return os.path.join(results_dir, api_name, f"{revision}.json")
+
+
+def find_baseline(results_dir, api_name, revision):
+    """
+    Returns the stored results of the closest earlier revision, or None.
+    """
+    api_dir = os.path.join(results_dir, api_name)
+    if not os.path.isdir(api_dir):
+        return None
+    earlier = []
+    for file_name in os.listdir(api_dir):
+        stem = os.path.splitext(file_name)[0]
+        if file_name.endswith(".json") and stem.isdigit() and (not str(revision).isdigit() or int(stem) < int(revision)):
+            earlier.append(int(stem))
+    if not earlier:
+        return None
+    with open(os.path.join(api_dir, f"{max(earlier)}.json"), "r") as f:
+        return json.load(f)
+
+
+def bootstrap_delta(before, after, pct, confidence=0.95, resamples=1000, seed=0):
+    """
+    Bootstrap confidence interval of percentile(after) - percentile(before).
+
+    Returns:
+        tuple: (low, high) bounds of the two-sided interval in ms.
+    """
+    rng = random.Random(seed)
+    deltas = sorted(percentile(rng.choices(after, k=len(after)), pct) - percentile(rng.choices(before, k=len(before)), pct)
+                    for _ in range(resamples))
+    alpha = (1 - confidence) / 2
+    return deltas[int(alpha * resamples)], deltas[min(resamples - 1, int((1 - alpha) * resamples))]
+
+
+def check_regressions(operations, baseline=None, metric="p95_ms", tolerance_pct=20.0, min_delta_ms=5.0, max_error_rate=0.01,
+                      min_samples=30, confidence=0.95):
+    """
+    Compares per-operation latency against the baseline revision and checks error rates.
+
+    A regression needs at least min_samples latencies on both sides, and the lower bound of the
+    bootstrap confidence interval of the percentile increase must exceed both the relative
+    tolerance and min_delta_ms. A single noisy run thus does not fail the pipeline.
+
+    Parameters:
+        operations (dict): Operation name to probe result, as returned by run_probe.
+        baseline (dict, optional): Stored report of the earlier revision.
+
+    Returns:
+        list: (operation name, violation message) tuples. Empty if the probe passed.
+    """
+    violations = []
+    baseline_ops = (baseline or {}).get("operations", {})
+    pct = int(metric[1:-3])
+    for name, result in operations.items():
+        if result["requests"] and result["errors"] / result["requests"] > max_error_rate:
+            violations.append((name, f"{name}: {result['errors']}/{result['requests']} requests failed "
+                                     f"(max error rate {max_error_rate:.1%})"))
+        before = baseline_ops.get(name, {}).get("samples_ms") or []
+        after = result.get("samples_ms") or []
+        if name not in baseline_ops:
+            continue
+        if len(before) < min_samples or len(after) < min_samples:
+            logging.info(f"{name}: fewer than {min_samples} samples ({len(before)} before, {len(after)} now), not compared.")
+            continue
+        before_value = percentile(before, pct)
+        low, high = bootstrap_delta(before, after, pct, confidence)
+        if low > max(min_delta_ms, before_value * tolerance_pct / 100.0):
+            violations.append((name, f"{name}: {metric} regressed from {before_value} ms (revision {baseline.get('revision')}) "
+                                     f"to {percentile(after, pct)} ms, increase {low:.1f}..{high:.1f} ms at {confidence:.0%} "
+                                     f"confidence (tolerance {tolerance_pct}%, {min_delta_ms} ms)"))
+    return violations
+
+
+def print_report(report, baseline=None, metric="p95_ms"):
+    baseline_ops = (baseline or {}).get("operations", {})
+    print(f"Latency probe of {report['api_name']} revision {report['revision']} at {report['base_url']}")
+    header = f"{'Operation':<45} {'req':>5} {'err':>4} {'p50':>8} {'p95':>8} {'p99':>8} {'base ' + metric[:3]:>9}"
+    print(header)
+    print("-" * len(header))
+    fmt = lambda value: f"{value:>8.1f}" if value is not None else f"{'-':>8}"
+    for name, r in report["operations"].items():
+        before = baseline_ops.get(name, {}).get(metric)
+        print(f"{name:<45} {r['requests']:>5} {r['errors']:>4} {fmt(r['p50_ms'])} {fmt(r['p95_ms'])} {fmt(r['p99_ms'])} "
+              f"{fmt(before):>9}")
+    for name in report.get("unprobed_flows", []):
+        print(f"{name:<45} (no OAS operation and no MatchesPath condition, e.g. JavaRegex, not probed)")
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Probe the latency of every operation of a deployed proxy revision.")
+    parser.add_argument("--base_url", required=True, help="Proxy URL including the base path, or a local stand-in (mock/oas_backend.py)")
+    parser.add_argument("--oas_file_location", required=True, help="OAS file location")
+    parser.add_argument("--oas_file_name", required=True, help="OAS file name")
+    parser.add_argument("--bundle_dir", default="", help="Extracted proxy bundle; its flows (get_all_flows) are probed too")
+    parser.add_argument("--api_name", required=True, help="API proxy name")
+    parser.add_argument("--api_revision", required=True, help="Apigee Proxy Revision being probed")
+    parser.add_argument("--methods", default="GET", help="Comma separated HTTP methods to probe (default: GET, no side effects)")
+    parser.add_argument("--mix", default="", help="Weighted operation mix 'operationId:weight,...' (default: equal weights)")
+    parser.add_argument("--requests", type=int, default=50, help="Average measured requests per operation (default: 50)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent connections (default: 8)")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured warm-up requests per operation (default: 5)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Request timeout in seconds")
+    parser.add_argument("--tokens_file", default="", help="Bearer tokens (generate_signed_jwt.py bulk NDJSON/CSV, or one per line)")
+    parser.add_argument("--private_key_file", default="", help="Mint tokens with this key via the mock/ JWT tooling instead")
+    parser.add_argument("--token_count", type=int, default=20, help="Number of tokens to mint (default: 20)")
+    parser.add_argument("--claims", default='{"iss": "ExchangeTokens", "sub": "probe{n}", "email": "probe{n}@example.com"}',
+                        help="JSON claims of minted tokens; '{n}' is replaced by the token number")
+    parser.add_argument("--mock_dir", default=DEFAULT_MOCK_DIR, help="Location of the repository's mock/ tooling")
+    parser.add_argument("--results_dir", default="probe_results", help="Results are stored as <results_dir>/<api_name>/<revision>.json")
+    parser.add_argument("--metric", default="p95_ms", choices=[f"p{pct}_ms" for pct in PERCENTILES], help="Percentile compared to the baseline")
+    parser.add_argument("--tolerance_pct", type=float, default=20.0, help="Allowed latency increase over the previous revision in percent")
+    parser.add_argument("--min_delta_ms", type=float, default=5.0, help="Ignore regressions smaller than this many ms")
+    parser.add_argument("--ok_statuses", default="2xx", help="Comma separated statuses measured as successes, e.g. '2xx,304' (default: 2xx)")
+    parser.add_argument("--max_error_rate", type=float, default=0.01,
+                        help="Fail if an operation's error rate (statuses outside --ok_statuses, timeouts) exceeds this")
+    parser.add_argument("--min_samples", type=int, default=30, help="Latencies needed per operation and revision before comparing (default: 30)")
+    parser.add_argument("--confidence", type=float, default=0.95, help="Confidence level of the bootstrap interval (default: 0.95)")
+    parser.add_argument("--reprobe", type=int, default=1,
+                        help="Re-probe flagged operations this many times; fail only if every re-probe confirms the violation (default: 1)")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the request mix")
+
+    args = parser.parse_args()
+
+    try:
+        operations = load_operations(os.path.join(args.oas_file_location, args.oas_file_name), args.mock_dir)
+    except Exception as e:
+        logging.error(f"Could not read operations from {args.oas_file_name}: {e}")
+        sys.exit(1)
+
+    unprobed_flows = []
+    if args.bundle_dir:
+        from prepare_bundle import ApigeeCliRunner
+        flow_ops, unresolved = flow_operations(ApigeeCliRunner(None), args.bundle_dir)
+        for flow_name, operation in flow_ops.items():
+            operations.setdefault(flow_name, operation)
+        unprobed_flows = [name for name in unresolved if name not in operations]
+
+    try:
+        ok_statuses = parse_ok_statuses(args.ok_statuses)
+    except ValueError as e:
+        logging.error(e)
+        sys.exit(1)
+
+    methods = {method.strip().upper() for method in args.methods.split(",") if method.strip()}
+    operations = {name: op for name, op in operations.items() if op["method"] in methods}
+    if not operations:
+        logging.error(f"No operations with methods {sorted(methods)} to probe.")
+        sys.exit(1)
+
+    mix = {}
+    for item in filter(None, (item.strip() for item in args.mix.split(","))):
+        name, _, weight = item.rpartition(":")
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            logging.error(f"Invalid --mix entry: '{item}'. Expected format 'operationId:weight'.")
+            sys.exit(1)
+        if name not in operations:
+            logging.warning(f"--mix names unknown operation '{name}'.")
+
+    tokens = []
+    try:
+        if args.tokens_file:
+            tokens = load_tokens(args.tokens_file)
+        elif args.private_key_file:
+            tokens = mint_tokens(args.private_key_file, args.token_count, json.loads(args.claims), mock_dir=args.mock_dir)
+    except Exception as e:
+        logging.error(f"Could not load or mint tokens: {e}")
+        sys.exit(1)
+    if not tokens:
+        logging.warning("Probing without bearer tokens.")
+
+    logging.info(f"Probing {len(operations)} operation(s) with {args.concurrency} connection(s).")
+    start = time.time()
+    results = run_probe(args.base_url, operations, tokens, args.requests, args.concurrency, mix, args.warmup,
+                        args.timeout, args.seed, ok_statuses)
+    report = {"api_name": args.api_name, "revision": args.api_revision, "base_url": args.base_url,
+              "started": start, "duration_seconds": round(time.time() - start, 1), "operations": results,
+              "unprobed_flows": unprobed_flows}
+
+    baseline = find_baseline(args.results_dir, args.api_name, args.api_revision)
+    print_report(report, baseline, args.metric)
+
+    if baseline is None:
+        logging.info("No results of an earlier revision found, skipping regression check.")
+    check = lambda results: check_regressions(results, baseline, args.metric, args.tolerance_pct, args.min_delta_ms,
+                                              args.max_error_rate, args.min_samples, args.confidence)
+    violations = check(results)
+    for attempt in range(args.reprobe):
+        if not violations:
+            break
+        flagged = sorted({name for name, _ in violations})
+        for _, violation in violations:
+            logging.warning(violation)
+        logging.info(f"Re-probing {len(flagged)} flagged operation(s) ({attempt + 1}/{args.reprobe}): {flagged}")
+        reprobe = run_probe(args.base_url, {name: operations[name] for name in flagged}, tokens, args.requests,
+                            args.concurrency, None, args.warmup, args.timeout, args.seed, ok_statuses)
+        # Only the violations the re-probe repeats remain
+        violations = check(reprobe)
+
+    # A failing run is kept for inspection but never becomes the baseline of a later revision
+    output_path = result_path(args.results_dir, args.api_name, args.api_revision)
+    if violations:
+        output_path = os.path.splitext(output_path)[0] + ".failed.json"
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "w") as f:
+        json.dump(report, f, indent=2)
+    logging.info(f"Results written to {output_path}")
+
+    if violations:
+        for _, violation in violations:
+            logging.error(violation)
+        sys.exit(1)
+    logging.info("Latency probe passed.")
+
+if __name__ == "__main__":
+    main()
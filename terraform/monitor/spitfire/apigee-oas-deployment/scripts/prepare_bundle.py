@@ -11,6 +11,10 @@ import json
 import xmltodict
 from google.cloud import storage
 from google.cloud.exceptions import NotFound
+from adc_token import shared_token_provider
+from build_profiles import BUILD_PROFILES, apply_build_profile
+from bundle_validator import local_sharedflows, validate_bundle
+from flow_ordering import load_traffic_profile, reorder_proxy_flows
 
 # Configure logging
 logging.basicConfig(
@@ -42,6 +46,7 @@ class ApigeeCliRunner:
             import_api=False,    # Boolean parameter, renamed to avoid clash with import keyword
             validate=True,      # Boolean parameter
             skip_policy=True,     # Boolean parameter
+            token_provider=None,
             ):
         """
         Initializes the ApigeeCliRunner with the specified parameters.
@@ -57,6 +62,7 @@ class ApigeeCliRunner:
                              to avoid keyword clash.
             validate (bool): Whether to validate the OpenAPI specification.
             skip_policy (bool): Whether to skip policy attachment.
+            token_provider (AdcTokenProvider): Token source used when no access_token is given.
             output_dir (str): The directory where the generated bundle should be created.
         """
         self.basepath = basepath
@@ -69,8 +75,23 @@ class ApigeeCliRunner:
         self.import_api = import_api
         self.validate = validate
         self.skip_policy = skip_policy
+        self.token_provider = token_provider
         self.access_token = access_token
 
+    @property
+    def access_token(self):
+        """
+        The static access token if one was given, otherwise a fresh token from the token provider.
+        """
+        if self._access_token:
+            return self._access_token
+        if self.token_provider is not None:
+            return self.token_provider.token()
+        return None
+
+    @access_token.setter
+    def access_token(self, value):
+        self._access_token = value
 
     def create_bundle(self):
         """
@@ -374,6 +395,54 @@ class ApigeeCliRunner:
             logging.exception(" An error occurred during proxy validation ")
             return None
 
+    def import_proxy(self, proxy_name, zip_file_path):
+        """
+        Imports the API proxy ZIP file as a new revision by calling the Apigee API.
+
+        Args:
+            proxy_name (str): The name of the API proxy.
+            zip_file_path (str): The path to the API proxy ZIP file.
+
+        Returns:
+            dict: The JSON response from the Apigee API (holding 'revision'), or None if the import failed.
+        """
+
+        if not self.access_token:
+            logging.error(" Access token is missing.  Cannot import proxy. ")
+            return None
+
+        api_url = f"https://apigee.googleapis.com/v1/organizations/{self.org}/apis?name={proxy_name}&action=import"
+
+        headers = {
+            "Authorization": f"Bearer {self.access_token}",
+            "Content-Type": "application/octet-stream",
+        }
+
+        try:
+            with open(zip_file_path, "rb") as f:
+                response = requests.post(api_url, headers=headers, data=f)
+            response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
+
+            response_json = response.json()
+            logging.info(f" Proxy import successful, revision {response_json.get('revision')} ")
+            logging.debug(f"Import response: {json.dumps(response_json, indent=2)}") # Log with indent for readability
+            return response_json
+
+        except requests.exceptions.HTTPError as e:
+            logging.error(" Proxy import failed (HTTP Error) ")
+            logging.error(f"Status code: {e.response.status_code}")
+            try:
+              logging.error(f"Response body: {json.dumps(e.response.json(), indent=2)}") # Attempt to log the response body as JSON
+            except json.JSONDecodeError:
+              logging.error(f"Response body: {e.response.text}") # If JSON decode fails, log as text.
+            return None
+        except FileNotFoundError:
+            logging.error(f" Error: ZIP file not found: {zip_file_path} ")
+            return None
+        except Exception as e:
+            logging.exception(" An error occurred during proxy import ")
+            return None
+
     def deploy_proxy(self, proxy_name, env_name, revision):
         """
         Deploys the API proxy revision by calling the Apigee API.
@@ -596,7 +665,10 @@ def main():
 
     parser = argparse.ArgumentParser(description="Create and modify Apigee API proxies.")
     parser.add_argument("--apigee_org", required=True, help="Apigee organization")
-    parser.add_argument("--access_token", required=True, help="GCP access token")
+    parser.add_argument("--access_token", help="GCP access token")
+    parser.add_argument('--use_adc', action='store_true', dest='use_adc',
+                    default=False,
+                    help='Get access tokens in-process from Application Default Credentials, refreshed before expiry (default: disabled)')
     parser.add_argument("--api_name", required=True, help="API proxy name")
     parser.add_argument("--api_base_path", required=True, help="API base path")
     parser.add_argument("--target_url", required=True, help="OAS Target URL")
@@ -623,8 +695,17 @@ def main():
                     help='Explicitly enable GCS persistence (default: disabled)')
     parser.add_argument("--apigee_env", help="Apigee Env Name")
     parser.add_argument("--api_revision", help="Apigee Proxy Revision")
+    parser.add_argument("--build_profile", default="dev", choices=BUILD_PROFILES,
+                    help="Build profile. 'prod' strips debug-only and unused policies/resources and minifies XML (default: dev)")
+    parser.add_argument("--debug_policies", default="", help="Comma separated list of extra policies to strip in the prod profile")
+    parser.add_argument("--remote_validate", default="on_success", choices=["on_success", "always", "never"],
+                        help="When to call the Apigee validate API: after the local validation passes (default), even if it fails, or never")
+    parser.add_argument("--traffic_profile", default="", help="Analytics CSV of operation and request count; reorders the flows so the most requested are evaluated first")
 
     args = parser.parse_args()
+    if not args.access_token and not args.use_adc:
+        logging.error("Please provide --access_token or --use_adc")
+        sys.exit(1)
     apigee_org = args.apigee_org
     target_url = args.target_url
     api_name = args.api_name
@@ -654,6 +735,7 @@ def main():
         import_api=False, # Set to False,
         validate=True,
         skip_policy=True,
+        token_provider=shared_token_provider() if args.use_adc else None,
     )
 
     if args.gcs_pull:
@@ -794,12 +876,44 @@ def main():
                     flow_type="Response"
                 )
 
+            if args.traffic_profile:
+                try:
+                    traffic = load_traffic_profile(args.traffic_profile)
+                except (OSError, ValueError) as e:
+                    logging.error(f"Could not read traffic profile: {e}")
+                    sys.exit(1)
+                ordering = reorder_proxy_flows(proxy_path, traffic)
+                if ordering is None:
+                    logging.error("Reordering flows by traffic failed.")
+                    sys.exit(1)
+                for endpoint_file, result in ordering.items():
+                    logging.info(f"{endpoint_file}: expected condition evaluations per request "
+                                 f"{result['before']:.2f} -> {result['after']:.2f} ({result['moved']} flow(s) moved)")
+
+            debug_policies = [p.strip() for p in args.debug_policies.split(',') if p.strip()]
+            if apply_build_profile(proxy_path, args.build_profile, debug_policies) is None:
+                logging.error(f"Applying build profile '{args.build_profile}' failed.")
+                sys.exit(1)
+
             api1.zip_bundle(
                 proxy_path,
                 f"{api_name}.zip"
             )
 
-            if api1.validate_proxy(api_name, f"{api_name}.zip") is not None:
+            # FlowCallouts may reference the repository's sharedflows and the ones given on the command line
+            known_sharedflows = local_sharedflows() | {name for name in (args.base_sf_pre, args.base_sf_post,
+                                                                        args.override_sf_pre, args.override_sf_post) if name}
+            local_errors = validate_bundle(f"{api_name}.zip", known_sharedflows)
+            if local_errors is None:
+                local_errors = ["Bundle could not be read."]
+            for error in local_errors:
+                logging.error(error)
+            if local_errors and args.remote_validate != "always":
+                logging.error(f"Local bundle validation found {len(local_errors)} error(s), skipping the remote validation.")
+                sys.exit(1)
+            logging.info("Local bundle validation passed." if not local_errors else "Local bundle validation failed.")
+
+            if args.remote_validate == "never" or api1.validate_proxy(api_name, f"{api_name}.zip") is not None:
                 logging.info("Bundle validated successful.")
                 if args.use_gcs:
                     logging.info("Uploading bundle to GCS.")
@@ -0,0 +1,338 @@
+import argparse
+import concurrent.futures
+import copy
+import hashlib
+import json
+import logging
+import os
+import re
+import shlex
+import subprocess
+import sys
+
+import yaml
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,  # Set default log level (can be changed)
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+PREPARE_BUNDLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prepare_bundle.py")
+
+HTTP_METHODS = ("get", "put", "post", "delete", "options", "head", "patch", "trace")
+
+# Top level keys copied into every shard as they are (OAS 3, then Swagger 2 only)
+SHARED_KEYS = ("openapi", "servers", "security", "externalDocs",
+               "swagger", "host", "basePath", "schemes", "consumes", "produces")
+
+# Arguments of prepare_bundle.py that are set per shard
+SHARD_ARGS = ("--api_name", "--api_base_path", "--target_url", "--oas_file_location", "--oas_file_name")
+
+
+def slugify(value):
+    return re.sub(r"[^a-z0-9]+", "-", value.lower()).strip("-") or "default"
+
+
+def operation_id(method, path, operation):
+    return operation.get("operationId") or f"{method.upper()} {path}"
+
+
+def shard_key(path, operation, by="prefix", prefix_depth=1):
+    """
+    Returns the shard an operation belongs to: its first tag, or the first prefix_depth
+    segments of its path (path parameters end the prefix).
+    """
+    if by == "tag":
+        tags = operation.get("tags") or ["default"]
+        return slugify(tags[0])
+    segments = []
+    for segment in path.strip("/").split("/"):
+        if not segment or segment.startswith("{") or len(segments) == prefix_depth:
+            break
+        segments.append(segment)
+    return "/" + "/".join(segments)
+
+
+def _collect_refs(node, refs):
+    if isinstance(node, dict):
+        ref = node.get("$ref")
+        if isinstance(ref, str) and ref.startswith("#/"):
+            refs.add(ref)
+        for value in node.values():
+            _collect_refs(value, refs)
+    elif isinstance(node, list):
+        for item in node:
+            _collect_refs(item, refs)
+
+
+def _resolve_pointer(spec, ref):
+    node = spec
+    for part in ref[2:].split("/"):
+        part = part.replace("~1", "/").replace("~0", "~")
+        if not isinstance(node, dict) or part not in node:
+            return None
+        node = node[part]
+    return node
+
+
+def ref_closure(spec, node):
+    """
+    Returns every local $ref reachable from node, following references inside referenced
+    components too.
+    """
+    pending, closure = set(), set()
+    _collect_refs(node, pending)
+    while pending:
+        ref = pending.pop()
+        if ref in closure:
+            continue
+        closure.add(ref)
+        target = _resolve_pointer(spec, ref)
+        if target is not None:
+            _collect_refs(target, pending)
+    return closure
+
+
+def _copy_refs(spec, refs):
+    """
+    Builds the component sections (OAS 3 'components' or Swagger 2 'definitions', ...) holding
+    exactly the referenced entries.
+    """
+    result = {}
+    for ref in sorted(refs):
+        parts = [part.replace("~1", "/").replace("~0", "~") for part in ref[2:].split("/")]
+        value = _resolve_pointer(spec, ref)
+        if value is None or parts[0] == "paths":
+            continue
+        node = result
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        node[parts[-1]] = copy.deepcopy(value)
+    return result
+
+
+def split_spec(spec, by="prefix", prefix_depth=1):
+    """
+    Splits an OAS into sub-specs, one per tag or path prefix, each with the closure of the
+    components its operations reference.
+
+    Returns:
+        dict: Shard key to {'spec', 'operations', 'prefix'}. In prefix mode the shard's paths are
+        relative to its prefix, so the shard proxy's base path and target URL carry the prefix.
+    """
+    shards = {}
+    for path, path_item in (spec.get("paths") or {}).items():
+        for method in HTTP_METHODS:
+            operation = path_item.get(method)
+            if not isinstance(operation, dict):
+                continue
+            key = shard_key(path, operation, by, prefix_depth)
+            shard = shards.setdefault(key, {"paths": {}, "operations": []})
+            shard_path = path[len(key):] or "/" if by == "prefix" and key != "/" else path
+            item = shard["paths"].setdefault(shard_path, {k: copy.deepcopy(v) for k, v in path_item.items()
+                                                          if k not in HTTP_METHODS})
+            item[method] = copy.deepcopy(operation)
+            shard["operations"].append(operation_id(method, path, operation))
+
+    result = {}
+    for key, shard in shards.items():
+        sub_spec = {k: copy.deepcopy(spec[k]) for k in SHARED_KEYS if k in spec}
+        sub_spec["info"] = dict(spec.get("info") or {})
+        sub_spec["info"]["title"] = f"{sub_spec['info'].get('title', 'API')} ({key})"
+        sub_spec["paths"] = shard["paths"]
+        # Security schemes are small and referenced by name, not $ref; keep them all
+        refs = ref_closure(spec, shard["paths"]) | ref_closure(spec, spec.get("security") or [])
+        sub_spec.update(_copy_refs(spec, refs))
+        if "securitySchemes" in (spec.get("components") or {}):
+            sub_spec.setdefault("components", {})["securitySchemes"] = copy.deepcopy(spec["components"]["securitySchemes"])
+        if "securityDefinitions" in spec:
+            sub_spec["securityDefinitions"] = copy.deepcopy(spec["securityDefinitions"])
+        used_tags = {tag for item in shard["paths"].values() for method in HTTP_METHODS
+                     for tag in (item.get(method) or {}).get("tags", [])}
+        if spec.get("tags"):
+            sub_spec["tags"] = [tag for tag in spec["tags"] if tag.get("name") in used_tags]
+        result[key] = {"spec": sub_spec, "operations": shard["operations"], "prefix": key.rstrip("/") if by == "prefix" else ""}
+    return result
+
+
+def spec_sha(content):
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def plan_shards(spec, api_name, api_base_path, target_url, by="prefix", prefix_depth=1, output_format="yaml"):
+    """
+    Splits the spec and derives each shard's proxy name, base path, target URL, file name and
+    content sha (over the sub-spec and its build inputs).
+
+    Returns:
+        dict: Shard name to its manifest entry plus the serialized 'content'.
+
+    Raises:
+        ValueError: If two shards get the same proxy name.
+    """
+    plan = {}
+    for key, shard in sorted(split_spec(spec, by, prefix_depth).items()):
+        slug = slugify(key)
+        name = f"{api_name}-{slug}"
+        if by == "prefix":
+            # The prefix moves from the paths into the base path and target URL: client URLs stay the same
+            base_path = api_base_path.rstrip("/") + shard["prefix"]
+            shard_target = target_url.rstrip("/") + shard["prefix"]
+        else:
+            base_path = f"{api_base_path.rstrip('/')}/{slug}"
+            shard_target = target_url
+        if output_format == "json":
+            content = json.dumps(shard["spec"], indent=2, sort_keys=True)
+        else:
+            content = yaml.safe_dump(shard["spec"], sort_keys=True, allow_unicode=True)
+        if name in plan:
+            raise ValueError(f"Shards {plan[name]['key']} and {key} both map to proxy {name}")
+        inputs = json.dumps([name, base_path, shard_target], separators=(",", ":"))
+        plan[name] = {"key": key, "api_name": name, "api_base_path": base_path, "target_url": shard_target,
+                      "oas_file_name": f"{name}.{output_format}", "operations": shard["operations"],
+                      "sha": spec_sha(inputs + "\n" + content), "content": content}
+    return plan
+
+
+def check_collisions(plan):
+    """
+    Returns error messages for shards sharing a base path.
+    """
+    errors, seen = [], {}
+    for name, shard in plan.items():
+        other = seen.setdefault(shard["api_base_path"], name)
+        if other != name:
+            errors.append(f"Shards {other} and {name} both map to base path {shard['api_base_path']}")
+    return errors
+
+
+def load_manifest(manifest_path):
+    if not manifest_path or not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, "r") as f:
+        return json.load(f)
+
+
+def build_shard(shard, spec_dir, work_dir, prepare_args, dry_run=False):
+    """
+    Runs prepare_bundle.py for one shard.
+
+    Returns:
+        tuple: (shard api name, True if the build succeeded)
+    """
+    command = [sys.executable, PREPARE_BUNDLE, *prepare_args,
+               "--api_name", shard["api_name"], "--api_base_path", shard["api_base_path"],
+               "--target_url", shard["target_url"], "--oas_file_location", os.path.abspath(spec_dir),
+               "--oas_file_name", shard["oas_file_name"]]
+    logging.info(f"[{shard['api_name']}] {shlex.join(command)}")
+    if dry_run:
+        return shard["api_name"], True
+    os.makedirs(work_dir, exist_ok=True)
+    log_path = os.path.join(work_dir, f"{shard['api_name']}.log")
+    with open(log_path, "w") as log_file:
+        result = subprocess.run(command, cwd=work_dir, stdout=log_file, stderr=subprocess.STDOUT)
+    if result.returncode != 0:
+        logging.error(f"[{shard['api_name']}] prepare_bundle.py failed with exit code {result.returncode}, see {log_path}")
+    return shard["api_name"], result.returncode == 0
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description="Split an OAS into several proxies by tag or path prefix and build the changed ones with prepare_bundle.py. "
+                    "Unrecognized arguments (--apigee_org, --use_adc, --base_sf_pre, ...) are passed to prepare_bundle.py.")
+    parser.add_argument("--oas_file_location", required=True, help="OAS file location")
+    parser.add_argument("--oas_file_name", required=True, help="OAS file name")
+    parser.add_argument("--api_name", required=True, help="API proxy name; shards are named <api_name>-<shard>")
+    parser.add_argument("--api_base_path", required=True, help="API base path")
+    parser.add_argument("--target_url", required=True, help="OAS Target URL")
+    parser.add_argument("--shard_by", default="prefix", choices=["prefix", "tag"],
+                        help="'prefix' keeps client URLs (the prefix moves into each base path); 'tag' adds /<tag> to the base path")
+    parser.add_argument("--prefix_depth", type=int, default=1, help="Path segments forming a shard prefix (default: 1)")
+    parser.add_argument("--max_operations", type=int, default=0, help="Warn about shards with more operations than this")
+    parser.add_argument("--spec_dir", default="shards", help="Directory for the sub-specs and the manifest (default: shards)")
+    parser.add_argument("--work_dir", default="", help="Working directory of the builds (default: the spec directory)")
+    parser.add_argument("--manifest", default="", help="Manifest path (default: <spec_dir>/manifest.json)")
+    parser.add_argument("--parallel", type=int, default=4, help="Shards built at once (default: 4)")
+    parser.add_argument("--force", action='store_true', default=False, help="Rebuild every shard, changed or not")
+    parser.add_argument("--dry_run", action='store_true', default=False, help="Write the sub-specs and print the build plan only")
+
+    args, prepare_args = parser.parse_known_args()
+    if any(arg.split("=", 1)[0] in SHARD_ARGS for arg in prepare_args):
+        logging.error(f"{SHARD_ARGS} are set per shard and cannot be passed through.")
+        sys.exit(1)
+
+    source_path = os.path.join(args.oas_file_location, args.oas_file_name)
+    try:
+        with open(source_path, "r") as f:
+            spec = yaml.safe_load(f)
+    except (OSError, yaml.YAMLError) as e:
+        logging.error(f"Could not read {source_path}: {e}")
+        sys.exit(1)
+
+    output_format = "json" if args.oas_file_name.endswith(".json") else "yaml"
+    try:
+        plan = plan_shards(spec, args.api_name, args.api_base_path, args.target_url, args.shard_by, args.prefix_depth, output_format)
+    except ValueError as e:
+        logging.error(e)
+        sys.exit(1)
+    errors = check_collisions(plan)
+    if errors:
+        for error in errors:
+            logging.error(error)
+        sys.exit(1)
+    for name, shard in plan.items():
+        if args.max_operations and len(shard["operations"]) > args.max_operations:
+            logging.warning(f"Shard {name} has {len(shard['operations'])} operations (more than {args.max_operations}); "
+                            f"consider a deeper --prefix_depth.")
+
+    manifest_path = args.manifest or os.path.join(args.spec_dir, "manifest.json")
+    previous = load_manifest(manifest_path).get("shards", {})
+    os.makedirs(args.spec_dir, exist_ok=True)
+    changed = []
+    for name, shard in plan.items():
+        with open(os.path.join(args.spec_dir, shard["oas_file_name"]), "w") as f:
+            f.write(shard["content"])
+        if args.force or previous.get(name, {}).get("sha") != shard["sha"]:
+            changed.append(name)
+    removed = sorted(set(previous) - set(plan))
+    logging.info(f"{len(plan)} shard(s) from {len(spec.get('paths') or {})} path(s); {len(changed)} changed: {changed}")
+    if removed:
+        logging.warning(f"Shard(s) no longer in the spec (undeploy them): {removed}")
+
+    results = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, args.parallel)) as executor:
+        futures = [executor.submit(build_shard, plan[name], args.spec_dir, args.work_dir or args.spec_dir, prepare_args, args.dry_run)
+                   for name in changed]
+        for future in concurrent.futures.as_completed(futures):
+            name, ok = future.result()
+            results[name] = ok
+
+    if not args.dry_run:
+        shards = {}
+        for name, shard in plan.items():
+            entry = {k: v for k, v in shard.items() if k != "content"}
+            if not results.get(name, True):
+                # Keep the previous sha, so the failed shard is rebuilt on the next run
+                entry["sha"] = previous.get(name, {}).get("sha")
+            shards[name] = entry
+        manifest = {"source": args.oas_file_name,
+                    "source_sha": spec_sha(json.dumps(spec, sort_keys=True, default=str)),
+                    "shard_by": args.shard_by, "prefix_depth": args.prefix_depth, "shards": shards,
+                    "operations": {op: name for name, shard in plan.items() for op in shard["operations"]},
+                    "last_build": {"changed": changed, "failed": sorted(n for n, ok in results.items() if not ok),
+                                   "removed": removed}}
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        logging.info(f"Manifest written to {manifest_path}")
+
+    failed = [name for name, ok in results.items() if not ok]
+    if failed:
+        logging.error(f"Build failed for shard(s): {sorted(failed)}")
+        sys.exit(1)
+    logging.info("Shard builds finished.")
+
+if __name__ == "__main__":
+    main()
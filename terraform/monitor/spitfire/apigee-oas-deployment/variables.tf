@@ -78,4 +78,10 @@ variable "override_sf_pre" {
 variable "override_sf_post" {
   type    = string
   default = ""
+}
+
+variable "build_profile" {
+  description = "Bundle build profile ('dev' or 'prod'). 'prod' strips debug-only and unused policies."
+  type        = string
+  default     = "dev"
 }
\ No newline at end of file
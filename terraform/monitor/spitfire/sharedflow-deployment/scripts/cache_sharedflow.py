@@ -0,0 +1,344 @@
+import argparse
+import logging
+import os
+import shutil
+import sys
+import xmltodict
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,  # Set default log level (can be changed)
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+
+def lookup_cache_template(lc_name, cache_prefix, key_fragments, assign_to, scope="Exclusive", cache_resource="") -> str:
+    fragments = "\n".join(f'    <KeyFragment ref="{ref}"/>' for ref in key_fragments)
+    resource = f"\n<CacheResource>{cache_resource}</CacheResource>" if cache_resource else ""
+    return f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<LookupCache continueOnError="true" enabled="true" name="{lc_name}">
+<DisplayName>{lc_name}</DisplayName>
+<CacheKey>
+    <Prefix>{cache_prefix}</Prefix>
+{fragments}
+</CacheKey>{resource}
+<Scope>{scope}</Scope>
+<AssignTo>{assign_to}</AssignTo>
+</LookupCache>
+"""
+
+
+def populate_cache_template(pc_name, cache_prefix, key_fragments, source, ttl, scope="Exclusive", cache_resource="") -> str:
+    fragments = "\n".join(f'    <KeyFragment ref="{ref}"/>' for ref in key_fragments)
+    resource = f"\n<CacheResource>{cache_resource}</CacheResource>" if cache_resource else ""
+    return f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<PopulateCache continueOnError="true" enabled="true" name="{pc_name}">
+<DisplayName>{pc_name}</DisplayName>
+<CacheKey>
+    <Prefix>{cache_prefix}</Prefix>
+{fragments}
+</CacheKey>{resource}
+<Scope>{scope}</Scope>
+<ExpirySettings>
+    <TimeoutInSec>{ttl}</TimeoutInSec>
+</ExpirySettings>
+<Source>{source}</Source>
+</PopulateCache>
+"""
+
+
+def restore_response_template(am_name, cached_variable, response_variable) -> str:
+    return f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<AssignMessage continueOnError="false" enabled="true" name="{am_name}">
+<DisplayName>{am_name}</DisplayName>
+<Set>
+    <Payload contentType="application/json">{{{cached_variable}}}</Payload>
+    <StatusCode>200</StatusCode>
+</Set>
+<IgnoreUnresolvedVariables>true</IgnoreUnresolvedVariables>
+<AssignTo createNew="true" transport="http" type="response">{response_variable}</AssignTo>
+</AssignMessage>
+"""
+
+
+class SharedFlowCacheGenerator:
+    """
+    Generates a cached variant of a sharedflow bundle.
+
+    Every step that runs one of the configured ServiceCallouts is wrapped so that
+    a LookupCache runs first, the callout only runs on a cache miss, a
+    successful (200) callout response is written back with a PopulateCache and a
+    cache hit rebuilds the callout response message with an AssignMessage.
+    Downstream steps that read the callout response keep working unchanged.
+    """
+
+    def __init__(
+            self,
+            source_dir,
+            callouts=("SC-UserLookup",),
+            key_fragments=("email", "externalOrgId"),
+            ttl=300,
+            scope="Exclusive",
+            cache_resource="",
+            ):
+        """
+        Initializes the generator.
+
+        Parameters:
+            source_dir (str): Sharedflow directory containing 'sharedflowbundle'
+                (e.g. 'sharedflows/SF-spitfire-pre').
+            callouts (list): Names of the ServiceCallout policies to cache.
+            key_fragments (list): Flow variables used as cache key fragments.
+            ttl (int): Time to live of a cache entry in seconds.
+            scope (str): Cache key scope (Exclusive, Proxy, Application, Global).
+            cache_resource (str): Optional environment cache resource name.
+        """
+        self.source_dir = source_dir
+        self.callouts = list(callouts)
+        self.key_fragments = list(key_fragments)
+        self.ttl = ttl
+        self.scope = scope
+        self.cache_resource = cache_resource
+
+    def generate(self, output_dir, output_name):
+        """
+        Writes the cached sharedflow to '<output_dir>/<output_name>/sharedflowbundle'.
+
+        Parameters:
+            output_dir (str): Directory where the cached sharedflow is written.
+            output_name (str): Name of the generated sharedflow.
+
+        Returns:
+            str: Path to the generated sharedflow directory, or None if generation failed.
+        """
+        source_bundle = os.path.join(self.source_dir, "sharedflowbundle")
+        target_dir = os.path.join(output_dir, output_name)
+        target_bundle = os.path.join(target_dir, "sharedflowbundle")
+
+        if not os.path.isdir(source_bundle):
+            logging.error(f" Error: sharedflowbundle not found in {self.source_dir} ")
+            return None
+
+        try:
+            if os.path.exists(target_dir):
+                shutil.rmtree(target_dir)
+            shutil.copytree(source_bundle, target_bundle)
+
+            added_policies = []
+            for callout in self.callouts:
+                response_variable = self._get_response_variable(target_bundle, callout)
+                if response_variable is None:
+                    return None
+                added_policies.extend(self._write_cache_policies(target_bundle, callout, response_variable))
+                wrapped = self._wrap_callout_steps(target_bundle, callout, response_variable)
+                if wrapped == 0:
+                    logging.warning(f" No steps reference '{callout}', nothing to cache ")
+
+            self._update_manifest(target_bundle, output_name, added_policies)
+            logging.info(f" Successfully generated cached sharedflow '{output_name}' in: {target_dir} ")
+            return target_dir
+
+        except Exception as e:
+            logging.exception(" An error occurred while generating the cached sharedflow ")
+            return None
+
+    def _get_response_variable(self, bundle_dir, callout):
+        """
+        Reads the <Response> variable of a ServiceCallout policy.
+        """
+        policy_path = os.path.join(bundle_dir, "policies", f"{callout}.xml")
+        try:
+            with open(policy_path, "r") as f:
+                policy_dict = xmltodict.parse(f.read())
+        except FileNotFoundError:
+            logging.error(f" Error: Policy file not found: {policy_path} ")
+            return None
+
+        service_callout = policy_dict.get('ServiceCallout')
+        if service_callout is None:
+            logging.error(f" Error: Policy '{callout}' is not a ServiceCallout ")
+            return None
+        response_variable = service_callout.get('Response')
+        if not response_variable:
+            logging.error(f" Error: ServiceCallout '{callout}' has no <Response> variable to cache ")
+            return None
+        return response_variable
+
+    def _write_cache_policies(self, bundle_dir, callout, response_variable):
+        """
+        Writes the LookupCache, PopulateCache and restore AssignMessage policies for a callout.
+        """
+        names = self._policy_names(callout)
+        cached_variable = f"cache.{callout}.content"
+        policies = {
+            names['lookup']: lookup_cache_template(
+                names['lookup'], callout, self.key_fragments, cached_variable,
+                self.scope, self.cache_resource),
+            names['populate']: populate_cache_template(
+                names['populate'], callout, self.key_fragments, f"{response_variable}.content",
+                self.ttl, self.scope, self.cache_resource),
+            names['restore']: restore_response_template(
+                names['restore'], cached_variable, response_variable),
+        }
+        for policy_name, policy_content in policies.items():
+            with open(os.path.join(bundle_dir, "policies", f"{policy_name}.xml"), "w") as f:
+                f.write(policy_content)
+        return list(policies)
+
+    def _wrap_callout_steps(self, bundle_dir, callout, response_variable):
+        """
+        Surrounds every step running the callout with the cache steps.
+
+        Returns:
+            int: The number of wrapped steps.
+        """
+        names = self._policy_names(callout)
+        cache_hit = f"lookupcache.{names['lookup']}.cachehit"
+        flows_dir = os.path.join(bundle_dir, "sharedflows")
+        wrapped = 0
+
+        for file_name in sorted(os.listdir(flows_dir)):
+            if not file_name.endswith(".xml"):
+                continue
+            flow_path = os.path.join(flows_dir, file_name)
+            with open(flow_path, "r") as f:
+                flow_dict = xmltodict.parse(f.read())
+
+            shared_flow = flow_dict.get('SharedFlow') or {}
+            steps = shared_flow.get('Step', [])
+            if isinstance(steps, dict):
+                steps = [steps]
+
+            new_steps, wrapped_in_file = [], 0
+            for step in steps:
+                if step.get('Name') != callout:
+                    new_steps.append(step)
+                    continue
+                condition = step.get('Condition')
+                new_steps.append(self._step(names['lookup'], condition))
+                new_steps.append(self._step(names['restore'], condition, f'{cache_hit} = true'))
+                new_steps.append(self._step(callout, condition, f'{cache_hit} != true'))
+                new_steps.append(self._step(
+                    names['populate'], condition,
+                    f'{cache_hit} != true', f'{response_variable}.status.code = "200"'))
+                wrapped_in_file += 1
+
+            # Only rewrite the files that changed
+            if wrapped_in_file:
+                wrapped += wrapped_in_file
+                shared_flow['Step'] = new_steps
+                with open(flow_path, "w") as f:
+                    f.write(xmltodict.unparse(flow_dict, pretty=True))
+
+        logging.info(f" Wrapped {wrapped} step(s) running '{callout}' with cache lookups ")
+        return wrapped
+
+    def _update_manifest(self, bundle_dir, output_name, added_policies):
+        """
+        Renames the bundle manifest and registers the generated policies.
+        """
+        manifests = [f for f in os.listdir(bundle_dir) if f.endswith(".xml")]
+        if len(manifests) != 1:
+            logging.warning(f" Expected one bundle manifest in {bundle_dir}, found {manifests}. Skipping manifest update. ")
+            return
+
+        with open(os.path.join(bundle_dir, manifests[0]), "r") as f:
+            manifest_dict = xmltodict.parse(f.read())
+        os.remove(os.path.join(bundle_dir, manifests[0]))
+
+        bundle = manifest_dict['SharedFlowBundle']
+        bundle['@name'] = output_name
+        bundle['Description'] = f"{output_name} (generated with response caching)"
+        if not bundle.get('Policies'):
+            bundle['Policies'] = {}
+        policies = bundle['Policies'].get('Policy', [])
+        if not isinstance(policies, list):
+            policies = [policies]
+        policies.extend(p for p in added_policies if p not in policies)
+        bundle['Policies']['Policy'] = policies
+
+        with open(os.path.join(bundle_dir, f"{output_name}.xml"), "w") as f:
+            f.write(xmltodict.unparse(manifest_dict, pretty=True))
+
+    @staticmethod
+    def _policy_names(callout):
+        return {
+            'lookup': f"LC-{callout}",
+            'populate': f"PC-{callout}",
+            'restore': f"AM-Restore-{callout}",
+        }
+
+    @staticmethod
+    def _step(name, *conditions):
+        """
+        Builds a step dict, AND-ing all non-empty conditions together.
+        """
+        conditions = [c for c in conditions if c]
+        step = {'Name': name}
+        if len(conditions) == 1:
+            step['Condition'] = conditions[0]
+        elif conditions:
+            step['Condition'] = " and ".join(_parenthesize(c) for c in conditions)
+        return step
+
+
+def _parenthesize(condition):
+    """
+    Wraps a condition in parentheses unless it already is a single parenthesized group.
+    """
+    depth = 0
+    for i, char in enumerate(condition):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+            if depth == 0 and i != len(condition) - 1:
+                break
+        elif depth == 0:
+            break
+    else:
+        if condition.startswith('(') and depth == 0:
+            return condition
+    return f"({condition})"
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Generate a sharedflow variant that caches ServiceCallout responses.")
+    parser.add_argument("--sharedflow_dir", required=True, help="Source sharedflow directory (e.g. sharedflows/SF-spitfire-pre)")
+    parser.add_argument("--output_dir", required=True, help="Directory where the cached sharedflow is written")
+    parser.add_argument("--output_name", default="", help="Name of the cached sharedflow (default: <source name>-cached)")
+    parser.add_argument("--callouts", default="SC-UserLookup", help="Comma separated list of ServiceCallout policies to cache")
+    parser.add_argument("--key_fragments", default="email,externalOrgId", help="Comma separated list of flow variables used as cache key")
+    parser.add_argument("--ttl", type=int, default=300, help="Cache entry time to live in seconds")
+    parser.add_argument("--scope", default="Exclusive", help="Cache key scope")
+    parser.add_argument("--cache_resource", default="", help="Optional Apigee environment cache resource")
+    parser.add_argument('--zip', action='store_true', dest='zip_bundle',
+                    default=False,
+                    help='Also zip the generated sharedflow (default: disabled)')
+
+    args = parser.parse_args()
+    sharedflow_dir = os.path.normpath(args.sharedflow_dir)
+    output_name = args.output_name or f"{os.path.basename(sharedflow_dir)}-cached"
+
+    generator = SharedFlowCacheGenerator(
+        sharedflow_dir,
+        callouts=[c.strip() for c in args.callouts.split(',') if c.strip()],
+        key_fragments=[k.strip() for k in args.key_fragments.split(',') if k.strip()],
+        ttl=args.ttl,
+        scope=args.scope,
+        cache_resource=args.cache_resource,
+    )
+
+    target_dir = generator.generate(args.output_dir, output_name)
+    if target_dir is None:
+        logging.error("Cached sharedflow generation failed.")
+        sys.exit(1)
+
+    if args.zip_bundle:
+        zip_path = shutil.make_archive(target_dir, 'zip', target_dir)
+        logging.info(f"Cached sharedflow zipped to: {zip_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+import argparse
+import concurrent.futures
+import logging
+import os
+import sys
+import time
+
+# Reuse the bundle tooling that lives next to prepare_bundle.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", "..", "apigee-oas-deployment", "scripts"))
+
+from adc_token import shared_token_provider  # noqa: E402
+from build_profiles import BUILD_PROFILES  # noqa: E402
+from bundle_utils import BundleFiles, DEFAULT_SHAREDFLOWS_DIR, flow_callout_target, sharedflow_dir  # noqa: E402
+from package_sharedflows import DeploymentState, SharedFlowPackager, SharedFlowRunner  # noqa: E402
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,  # Set default log level (can be changed)
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+SHAREDFLOW = "sharedflow"
+PROXY = "proxy"
+
+
+class DependencyError(ValueError):
+    pass
+
+
+def bundle_dependencies(bundle):
+    """
+    Returns the sharedflows referenced by the FlowCallout policies of a bundle.
+
+    Parameters:
+        bundle (BundleFiles): The proxy or sharedflow bundle.
+
+    Returns:
+        set: Sharedflow names.
+    """
+    dependencies = set()
+    for policy_name in bundle.policy_files():
+        policy_type, policy = bundle.read_policy(policy_name)
+        if policy_type == "FlowCallout":
+            target = flow_callout_target(policy)
+            if target:
+                dependencies.add(target)
+    return dependencies
+
+
+class DependencyGraph:
+    """
+    DAG of deployable artifacts (sharedflows and proxies).
+
+    Nodes are (kind, name) tuples. An edge means the node needs its
+    dependencies deployed first.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+        self.external = set()
+
+    def add(self, kind, name, dependencies, payload=None):
+        """
+        Adds an artifact.
+
+        Parameters:
+            kind (str): 'sharedflow' or 'proxy'.
+            name (str): Artifact name.
+            dependencies (set): Names of the sharedflows it calls.
+            payload: Anything the deploy function needs (e.g. the bundle path).
+        """
+        self.nodes[(kind, name)] = {"deps": {(SHAREDFLOW, d) for d in dependencies}, "payload": payload}
+
+    def mark_external(self, names):
+        """
+        Registers sharedflows that are already deployed outside of this run.
+        """
+        self.external.update(names)
+
+    def validate(self):
+        """
+        Checks for dangling references and cycles.
+
+        Raises:
+            DependencyError: Listing every missing reference, or the first cycle found.
+        """
+        missing = []
+        for node, data in sorted(self.nodes.items()):
+            for dep in sorted(data["deps"]):
+                if dep not in self.nodes and dep[1] not in self.external:
+                    missing.append(f"{node[0]} '{node[1]}' references unknown sharedflow '{dep[1]}'")
+        if missing:
+            raise DependencyError("Missing FlowCallout targets:\n  " + "\n  ".join(missing))
+
+        state = {}
+
+        def visit(node, path):
+            state[node] = "visiting"
+            for dep in self._internal_deps(node):
+                if state.get(dep) == "visiting":
+                    cycle = path[path.index(dep):] + [dep]
+                    raise DependencyError("Circular FlowCallout: " + " -> ".join(n[1] for n in cycle))
+                if dep not in state:
+                    visit(dep, path + [dep])
+            state[node] = "done"
+
+        for node in sorted(self.nodes):
+            if node not in state:
+                visit(node, [node])
+
+    def waves(self):
+        """
+        Groups the artifacts into waves; every artifact only depends on earlier waves.
+
+        Returns:
+            list: A list of sorted lists of (kind, name) nodes.
+        """
+        level = {}
+
+        def depth(node):
+            if node not in level:
+                level[node] = 1 + max((depth(d) for d in self._internal_deps(node)), default=-1)
+            return level[node]
+
+        for node in self.nodes:
+            depth(node)
+        waves = [[] for _ in range(max(level.values(), default=-1) + 1)]
+        for node, wave in level.items():
+            waves[wave].append(node)
+        return [sorted(wave) for wave in waves]
+
+    def run(self, deploy_fn, max_workers=4):
+        """
+        Deploys every artifact as soon as all of its dependencies are deployed.
+
+        Parameters:
+            deploy_fn (callable): deploy_fn(kind, name, payload) -> bool.
+            max_workers (int): Number of artifacts deployed in parallel.
+
+        Returns:
+            dict: {(kind, name): 'deployed' | 'failed' | 'skipped'}.
+        """
+        self.validate()
+        results = {}
+        pending = {node: set(self._internal_deps(node)) for node in self.nodes}
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            running = {}
+
+            def submit_ready():
+                for node in sorted(pending):
+                    if not pending[node] and node not in running.values():
+                        running[executor.submit(deploy_fn, node[0], node[1], self.nodes[node]["payload"])] = node
+
+            submit_ready()
+            while running:
+                done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    node = running.pop(future)
+                    del pending[node]
+                    try:
+                        ok = future.result()
+                    except Exception as e:
+                        logging.exception(f" Deployment of {node[0]} '{node[1]}' raised an error ")
+                        ok = False
+                    results[node] = "deployed" if ok else "failed"
+                    for other in list(pending):
+                        if other in pending and node in pending[other]:
+                            if ok:
+                                pending[other].discard(node)
+                            else:
+                                self._skip(other, node, pending, results)
+                submit_ready()
+        return results
+
+    def _skip(self, node, failed, pending, results):
+        if node not in pending:
+            return
+        logging.error(f" Skipping {node[0]} '{node[1]}': dependency {failed[0]} '{failed[1]}' failed ")
+        del pending[node]
+        results[node] = "skipped"
+        for other in list(pending):
+            if node in pending.get(other, ()):
+                self._skip(other, node, pending, results)
+
+    def _internal_deps(self, node):
+        return sorted(d for d in self.nodes[node]["deps"] if d in self.nodes)
+
+
+def build_graph(proxy_bundles, sharedflows_dir, sharedflow_names=None, external=()):
+    """
+    Scans proxy bundles and sharedflows for FlowCallout references.
+
+    Parameters:
+        proxy_bundles (list): Built proxy bundles (ZIP files or directories).
+        sharedflows_dir (str): Directory holding '<name>/sharedflowbundle' folders.
+        sharedflow_names (list, optional): Sharedflows to deploy. Defaults to all in the directory.
+        external (list): Sharedflows that are already deployed and may be referenced.
+
+    Returns:
+        DependencyGraph: The validated graph.
+    """
+    graph = DependencyGraph()
+    graph.mark_external(external)
+    if sharedflow_names is None:
+        sharedflow_names = sorted(name for name in os.listdir(sharedflows_dir)
+                                  if os.path.isdir(os.path.join(sharedflows_dir, name, "sharedflowbundle")))
+    for name in sharedflow_names:
+        bundle = BundleFiles(sharedflow_dir(sharedflows_dir, name))
+        graph.add(SHAREDFLOW, name, bundle_dependencies(bundle))
+    for bundle_path in proxy_bundles:
+        bundle = BundleFiles(bundle_path)
+        manifest = bundle.manifest_name()
+        name = os.path.splitext(manifest)[0] if manifest else os.path.splitext(os.path.basename(bundle_path))[0]
+        graph.add(PROXY, name, bundle_dependencies(bundle), payload=bundle_path)
+    graph.validate()
+    return graph
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Deploy sharedflows and proxies in FlowCallout dependency order.")
+    parser.add_argument("--proxy_bundles", default="", help="Comma separated list of built proxy bundle ZIP files")
+    parser.add_argument("--sharedflows_dir", default=DEFAULT_SHAREDFLOWS_DIR, help="Directory holding the sharedflows")
+    parser.add_argument("--sharedflows", default="", help="Comma separated list of sharedflows to deploy (default: all)")
+    parser.add_argument("--external_sharedflows", default="", help="Comma separated list of sharedflows already deployed outside this run")
+    parser.add_argument("--build_dir", default="build", help="Output directory for the packaged sharedflows")
+    parser.add_argument("--build_profile", default="dev", choices=BUILD_PROFILES, help="Sharedflow build profile")
+    parser.add_argument("--apigee_org", help="Apigee organization")
+    parser.add_argument("--apigee_env", help="Apigee Env Name")
+    parser.add_argument("--access_token", help="GCP access token")
+    parser.add_argument('--use_adc', action='store_true', dest='use_adc',
+                    default=False,
+                    help='Get access tokens in-process from Application Default Credentials instead of --access_token')
+    parser.add_argument("--state_file", default=".sharedflow-state.json", help="Local file recording the deployed sharedflow fingerprints")
+    parser.add_argument("--gcs_bucket", default="", help="GCS bucket mirroring the state file (optional)")
+    parser.add_argument("--gcs_state_object", default="sharedflows/state.json", help="GCS object name of the state file")
+    parser.add_argument("--max_workers", type=int, default=4, help="Number of artifacts deployed in parallel")
+    parser.add_argument('--dry_run', action='store_true', dest='dry_run',
+                    default=False,
+                    help='Only print the deployment waves')
+
+    args = parser.parse_args()
+
+    def split(value):
+        return [v.strip() for v in value.split(',') if v.strip()]
+
+    try:
+        graph = build_graph(split(args.proxy_bundles), args.sharedflows_dir,
+                            split(args.sharedflows) or None, split(args.external_sharedflows))
+    except (DependencyError, FileNotFoundError, ValueError) as e:
+        logging.error(f"Dependency resolution failed, nothing was uploaded:\n{e}")
+        sys.exit(1)
+
+    for i, wave in enumerate(graph.waves(), start=1):
+        logging.info(f"Wave {i}: " + ", ".join(f"{kind} {name}" for kind, name in wave))
+    if args.dry_run:
+        return
+
+    if not (args.apigee_org and args.apigee_env and (args.access_token or args.use_adc)):
+        logging.error("--apigee_org, --apigee_env and --access_token (or --use_adc) are required unless --dry_run is set")
+        sys.exit(1)
+
+    runner = SharedFlowRunner(args.access_token, org=args.apigee_org,
+                              token_provider=shared_token_provider() if args.use_adc else None)
+    packager = SharedFlowPackager(args.sharedflows_dir, build_dir=args.build_dir, profile=args.build_profile)
+    state = DeploymentState(args.state_file, runner, args.gcs_bucket, args.gcs_state_object).load()
+    scope = f"organizations/{args.apigee_org}/environments/{args.apigee_env}"
+
+    def deploy(kind, name, payload):
+        if kind == SHAREDFLOW:
+            zip_path, fingerprint = packager.package(name)
+            if zip_path is None:
+                return False
+            previous = state.get(scope, name)
+            if previous and previous.get("fingerprint") == fingerprint:
+                logging.info(f" Sharedflow '{name}' unchanged (revision {previous.get('revision')}), skipping ")
+                return True
+            imported = runner.import_sharedflow(name, zip_path)
+            if not imported or not imported.get("revision"):
+                return False
+            if runner.deploy_sharedflow(name, args.apigee_env, imported["revision"]) is None:
+                return False
+            state.record(scope, name, fingerprint, imported["revision"])
+            return True
+
+        imported = runner.import_proxy(name, payload)
+        if not imported or not imported.get("revision"):
+            return False
+        return runner.deploy_proxy(name, args.apigee_env, imported["revision"]) is not None
+
+    start = time.monotonic()
+    results = graph.run(deploy, max_workers=args.max_workers)
+    if "deployed" in results.values() and not state.save():
+        logging.error("Saving the deployment state failed.")
+        sys.exit(1)
+
+    for (kind, name), result in sorted(results.items()):
+        logging.info(f"  {kind} {name}: {result}")
+    logging.info(f"Deployment finished in {time.monotonic() - start:.1f}s")
+    if any(result != "deployed" for result in results.values()):
+        logging.error("Some artifacts failed to deploy.")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
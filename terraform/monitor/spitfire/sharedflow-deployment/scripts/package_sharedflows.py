@@ -0,0 +1,392 @@
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+import zipfile
+import requests
+
+# Reuse the bundle tooling that lives next to prepare_bundle.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", "..", "apigee-oas-deployment", "scripts"))
+
+from adc_token import shared_token_provider  # noqa: E402
+from build_profiles import BUILD_PROFILES, apply_build_profile  # noqa: E402
+from bundle_utils import DEFAULT_SHAREDFLOWS_DIR  # noqa: E402
+from prepare_bundle import ApigeeCliRunner  # noqa: E402
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,  # Set default log level (can be changed)
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+# Fixed timestamp for ZIP entries so identical content gives identical bytes
+ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
+
+
+def deterministic_zip(source_dir, output_zip_path):
+    """
+    Zips a directory with sorted entries, fixed timestamps and permissions.
+
+    Returns:
+        str: The SHA-256 fingerprint of the created ZIP file.
+    """
+    entries = []
+    for dirpath, dirnames, filenames in os.walk(source_dir):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            full_path = os.path.join(dirpath, filename)
+            entries.append((os.path.relpath(full_path, source_dir).replace(os.sep, "/"), full_path))
+
+    with zipfile.ZipFile(output_zip_path, "w", zipfile.ZIP_DEFLATED) as zip_ref:
+        for arcname, full_path in sorted(entries):
+            info = zipfile.ZipInfo(arcname, date_time=ZIP_EPOCH)
+            info.external_attr = 0o644 << 16
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with open(full_path, "rb") as f:
+                zip_ref.writestr(info, f.read())
+
+    sha = hashlib.sha256()
+    with open(output_zip_path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class SharedFlowRunner(ApigeeCliRunner):
+    """
+    ApigeeCliRunner counterpart for sharedflows.
+
+    Reuses the access token, organization and GCS helpers of ApigeeCliRunner
+    and adds the sharedflow import and deployment API calls.
+    """
+
+    def __init__(self, access_token, org="test-org", token_provider=None):
+        super().__init__(access_token, org=org, token_provider=token_provider)
+
+    def import_sharedflow(self, sharedflow_name, zip_file_path):
+        """
+        Imports a sharedflow ZIP bundle as a new revision.
+
+        Args:
+            sharedflow_name (str): The name of the sharedflow.
+            zip_file_path (str): The path to the sharedflow ZIP file.
+
+        Returns:
+            dict: The JSON response from the Apigee API (holding 'revision'), or None if the import failed.
+        """
+
+        if not self.access_token:
+            logging.error(" Access token is missing.  Cannot import sharedflow. ")
+            return None
+
+        api_url = f"https://apigee.googleapis.com/v1/organizations/{self.org}/sharedflows?name={sharedflow_name}&action=import"
+
+        headers = {
+            "Authorization": f"Bearer {self.access_token}",
+            "Content-Type": "application/octet-stream",
+        }
+
+        try:
+            with open(zip_file_path, "rb") as f:
+                response = requests.post(api_url, headers=headers, data=f)
+            response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
+
+            response_json = response.json()
+            logging.info(f" Sharedflow '{sharedflow_name}' imported as revision {response_json.get('revision')} ")
+            return response_json
+
+        except requests.exceptions.HTTPError as e:
+            logging.error(f" Sharedflow '{sharedflow_name}' import failed (HTTP Error) ")
+            logging.error(f"Status code: {e.response.status_code}")
+            try:
+              logging.error(f"Response body: {json.dumps(e.response.json(), indent=2)}") # Attempt to log the response body as JSON
+            except json.JSONDecodeError:
+              logging.error(f"Response body: {e.response.text}") # If JSON decode fails, log as text.
+            return None
+        except FileNotFoundError:
+            logging.error(f" Error: ZIP file not found: {zip_file_path} ")
+            return None
+        except Exception as e:
+            logging.exception(f" An error occurred during sharedflow '{sharedflow_name}' import ")
+            return None
+
+    def deploy_sharedflow(self, sharedflow_name, env_name, revision):
+        """
+        Deploys a sharedflow revision to an environment.
+
+        Args:
+            sharedflow_name (str): The name of the sharedflow.
+            env_name (str): The apigee env name to deploy the sharedflow.
+            revision (str): The revision of the sharedflow to deploy.
+
+        Returns:
+            dict: The JSON response from the Apigee API, or None if the deployment failed.
+        """
+
+        if not self.access_token:
+            logging.error(" Access token is missing.  Cannot deploy sharedflow. ")
+            return None
+
+        api_url = f"https://apigee.googleapis.com/v1/organizations/{self.org}/environments/{env_name}/sharedflows/{sharedflow_name}/revisions/{revision}/deployments?override=true"
+
+        headers = {
+            "Authorization": f"Bearer {self.access_token}",
+            "Content-Type": "application/json",
+        }
+
+        try:
+            response = requests.post(api_url, headers=headers)
+            response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
+
+            response_json = response.json()
+            logging.info(f" Sharedflow '{sharedflow_name}' revision {revision} deploy successful ")
+            return response_json
+
+        except requests.exceptions.HTTPError as e:
+            logging.error(f" Sharedflow '{sharedflow_name}' deploy failed (HTTP Error) ")
+            logging.error(f"Status code: {e.response.status_code}")
+            try:
+              logging.error(f"Response body: {json.dumps(e.response.json(), indent=2)}") # Attempt to log the response body as JSON
+            except json.JSONDecodeError:
+              logging.error(f"Response body: {e.response.text}") # If JSON decode fails, log as text.
+            return None
+        except Exception as e:
+            logging.exception(f" An error occurred during sharedflow '{sharedflow_name}' deployment ")
+            return None
+
+
+class DeploymentState:
+    """
+    Last deployed fingerprint and revision of every sharedflow per environment.
+
+    Stored as JSON in a local file and, optionally, mirrored to a GCS object.
+    """
+
+    def __init__(self, state_file, runner=None, gcs_bucket="", gcs_object=""):
+        self.state_file = state_file
+        self.runner = runner
+        self.gcs_bucket = gcs_bucket
+        self.gcs_object = gcs_object
+        self.data = {}
+
+    def load(self):
+        if self.gcs_bucket and self.runner is not None:
+            if not self.runner.download_from_gcs(self.gcs_bucket, self.gcs_object, self.state_file):
+                logging.warning(" No deployment state found in GCS, treating every sharedflow as changed ")
+                self.data = {}
+                return self
+        try:
+            with open(self.state_file, "r") as f:
+                self.data = json.load(f)
+        except FileNotFoundError:
+            self.data = {}
+        return self
+
+    def save(self):
+        with open(self.state_file, "w") as f:
+            json.dump(self.data, f, indent=2, sort_keys=True)
+        if self.gcs_bucket and self.runner is not None:
+            return self.runner.upload_to_gcs(self.state_file, self.gcs_bucket, self.gcs_object)
+        return True
+
+    def get(self, scope, name):
+        return self.data.get(scope, {}).get(name)
+
+    def record(self, scope, name, fingerprint, revision):
+        self.data.setdefault(scope, {})[name] = {
+            "fingerprint": fingerprint,
+            "revision": str(revision),
+            "deployed_at": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        }
+
+
+class SharedFlowPackager:
+    """
+    Builds sharedflow ZIP bundles from the 'sharedflows/' folder.
+
+    Each sharedflow is copied to a build directory, the selected build profile
+    is applied to the copy and the result is zipped deterministically as
+    '<name>.zip' with the same layout Terraform's archive_file produces
+    ('sharedflowbundle/...'). The SHA-256 of the ZIP is its fingerprint.
+    """
+
+    def __init__(self, sharedflows_dir=DEFAULT_SHAREDFLOWS_DIR, build_dir="build", profile="dev", debug_policies=()):
+        """
+        Parameters:
+            sharedflows_dir (str): Directory holding '<name>/sharedflowbundle' folders.
+            build_dir (str): Directory where the processed copies and ZIP files are written.
+            profile (str): Build profile ('dev' or 'prod').
+            debug_policies (list): Additional policy names to strip in the prod profile.
+        """
+        self.sharedflows_dir = sharedflows_dir
+        self.build_dir = build_dir
+        self.profile = profile
+        self.debug_policies = list(debug_policies)
+
+    def list_sharedflows(self):
+        """
+        Returns the names of all sharedflows found in the sharedflows directory.
+        """
+        return sorted(name for name in os.listdir(self.sharedflows_dir)
+                      if os.path.isdir(os.path.join(self.sharedflows_dir, name, "sharedflowbundle")))
+
+    def package(self, name):
+        """
+        Builds the ZIP bundle of one sharedflow.
+
+        Parameters:
+            name (str): The sharedflow name (folder name in the sharedflows directory).
+
+        Returns:
+            tuple: (path to the created ZIP file, fingerprint), or (None, None) if packaging failed.
+        """
+        source_dir = os.path.join(self.sharedflows_dir, name)
+        target_dir = os.path.join(self.build_dir, name)
+        try:
+            if os.path.exists(target_dir):
+                shutil.rmtree(target_dir)
+            shutil.copytree(os.path.join(source_dir, "sharedflowbundle"), os.path.join(target_dir, "sharedflowbundle"))
+        except FileNotFoundError:
+            logging.error(f" Error: sharedflowbundle not found in {source_dir} ")
+            return None, None
+
+        if apply_build_profile(target_dir, self.profile, self.debug_policies) is None:
+            return None, None
+
+        try:
+            zip_path = f"{target_dir}.zip"
+            fingerprint = deterministic_zip(target_dir, zip_path)
+            logging.info(f" Successfully packaged sharedflow '{name}' ({self.profile}) to: {zip_path} [{fingerprint[:12]}] ")
+            return zip_path, fingerprint
+        except Exception as e:
+            logging.exception(f" An error occurred while zipping sharedflow '{name}' ")
+            return None, None
+
+
+def deploy_changed(runner, env_name, packaged, state, max_workers=4, force=False):
+    """
+    Imports and deploys the sharedflows whose fingerprint changed, concurrently.
+
+    Args:
+        runner (SharedFlowRunner): Runner holding the token and organization.
+        env_name (str): The apigee env name to deploy to.
+        packaged (dict): {name: (zip path, fingerprint)}.
+        state (DeploymentState): Last deployed fingerprints. Updated for successful deployments.
+        max_workers (int): Number of sharedflows deployed in parallel.
+        force (bool): Deploy every sharedflow even if unchanged.
+
+    Returns:
+        dict: {name: 'unchanged' | 'deployed' | 'failed'}.
+    """
+    scope = f"organizations/{runner.org}/environments/{env_name}"
+    results = {}
+    changed = {}
+    for name, (zip_path, fingerprint) in packaged.items():
+        previous = state.get(scope, name)
+        if not force and previous and previous.get("fingerprint") == fingerprint:
+            logging.info(f" Sharedflow '{name}' unchanged (revision {previous.get('revision')}), skipping ")
+            results[name] = "unchanged"
+        else:
+            changed[name] = (zip_path, fingerprint)
+
+    def import_and_deploy(name, zip_path):
+        imported = runner.import_sharedflow(name, zip_path)
+        if imported is None or not imported.get("revision"):
+            return None
+        revision = imported["revision"]
+        if runner.deploy_sharedflow(name, env_name, revision) is None:
+            return None
+        return revision
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(import_and_deploy, name, zip_path): name
+                   for name, (zip_path, _) in changed.items()}
+        for future in concurrent.futures.as_completed(futures):
+            name = futures[future]
+            revision = future.result()
+            if revision is None:
+                results[name] = "failed"
+            else:
+                state.record(scope, name, changed[name][1], revision)
+                results[name] = "deployed"
+    return results
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Package Apigee sharedflows and deploy the changed ones.")
+    parser.add_argument("--sharedflows_dir", default=DEFAULT_SHAREDFLOWS_DIR, help="Directory holding the sharedflows")
+    parser.add_argument("--sharedflows", default="", help="Comma separated list of sharedflows to package (default: all)")
+    parser.add_argument("--build_dir", default="build", help="Output directory for the packaged sharedflows")
+    parser.add_argument("--build_profile", default="dev", choices=BUILD_PROFILES,
+                    help="Build profile. 'prod' strips debug-only and unused policies/resources and minifies XML (default: dev)")
+    parser.add_argument("--debug_policies", default="", help="Comma separated list of extra policies to strip in the prod profile")
+    parser.add_argument('--deploy', action='store_true', dest='deploy',
+                    default=False,
+                    help='Import and deploy the changed sharedflows (default: package only)')
+    parser.add_argument('--force', action='store_true', dest='force',
+                    default=False,
+                    help='Deploy every sharedflow even if its fingerprint is unchanged')
+    parser.add_argument("--apigee_org", help="Apigee organization")
+    parser.add_argument("--apigee_env", help="Apigee Env Name")
+    parser.add_argument("--access_token", help="GCP access token")
+    parser.add_argument('--use_adc', action='store_true', dest='use_adc',
+                    default=False,
+                    help='Get access tokens in-process from Application Default Credentials instead of --access_token')
+    parser.add_argument("--state_file", default=".sharedflow-state.json", help="Local file recording the deployed fingerprints")
+    parser.add_argument("--gcs_bucket", default="", help="GCS bucket mirroring the state file (optional)")
+    parser.add_argument("--gcs_state_object", default="sharedflows/state.json", help="GCS object name of the state file")
+    parser.add_argument("--max_workers", type=int, default=4, help="Number of sharedflows deployed in parallel")
+
+    args = parser.parse_args()
+
+    packager = SharedFlowPackager(
+        args.sharedflows_dir,
+        build_dir=args.build_dir,
+        profile=args.build_profile,
+        debug_policies=[p.strip() for p in args.debug_policies.split(',') if p.strip()],
+    )
+    names = [n.strip() for n in args.sharedflows.split(',') if n.strip()] or packager.list_sharedflows()
+
+    packaged = {}
+    for name in names:
+        zip_path, fingerprint = packager.package(name)
+        if zip_path is None:
+            logging.error(f"Packaging failed for sharedflow '{name}'.")
+            sys.exit(1)
+        packaged[name] = (zip_path, fingerprint)
+    logging.info(f"Packaged {len(names)} sharedflow(s) into {args.build_dir}")
+
+    if not args.deploy:
+        return
+
+    if not (args.apigee_org and args.apigee_env and (args.access_token or args.use_adc)):
+        logging.error("--apigee_org, --apigee_env and --access_token (or --use_adc) are required with --deploy")
+        sys.exit(1)
+
+    runner = SharedFlowRunner(args.access_token, org=args.apigee_org,
+                              token_provider=shared_token_provider() if args.use_adc else None)
+    state = DeploymentState(args.state_file, runner, args.gcs_bucket, args.gcs_state_object).load()
+
+    start = time.monotonic()
+    results = deploy_changed(runner, args.apigee_env, packaged, state, args.max_workers, args.force)
+    if "deployed" in results.values() and not state.save():
+        logging.error("Saving the sharedflow deployment state failed.")
+        sys.exit(1)
+
+    for name in sorted(results):
+        logging.info(f"  {name}: {results[name]}")
+    logging.info(f"Sharedflow rollout finished in {time.monotonic() - start:.1f}s")
+    if "failed" in results.values():
+        logging.error("Some sharedflows failed to deploy.")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()